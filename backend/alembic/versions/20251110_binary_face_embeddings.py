@@ -0,0 +1,104 @@
+"""
+Store face embeddings as packed float32 bytea (plus pgvector when available) and backfill from JSON
+
+Revision ID: n20251110_binary_face_embeddings
+Revises: n20251103_payload_receipts
+Create Date: 2025-11-10 00:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+import numpy as np
+
+# revision identifiers, used by Alembic.
+revision = 'n20251110_binary_face_embeddings'
+down_revision = 'n20251103_payload_receipts'
+branch_labels = None
+depends_on = None
+
+EMBEDDING_DIM = 512
+BACKFILL_BATCH = 500
+
+
+def _pgvector_version(conn):
+    """Installed (or installable) pgvector version, or None."""
+    if conn.dialect.name != 'postgresql':
+        return None
+    row = conn.execute(sa.text(
+        "SELECT COALESCE(installed_version, default_version) FROM pg_available_extensions WHERE name = 'vector'"
+    )).first()
+    return row[0] if row else None
+
+
+def _supports_hnsw(version):
+    major, minor = (int(part) for part in version.split('.')[:2])
+    return (major, minor) >= (0, 5)
+
+
+def upgrade():
+    conn = op.get_bind()
+
+    # Packed little-endian float32 embedding (2 KB vs ~10 KB of JSON text)
+    op.add_column('students', sa.Column('face_embedding', sa.LargeBinary(), nullable=True))
+
+    vector_version = _pgvector_version(conn)
+    if vector_version:
+        op.execute("CREATE EXTENSION IF NOT EXISTS vector")
+        op.execute(f"ALTER TABLE students ADD COLUMN face_embedding_vector vector({EMBEDDING_DIM})")
+
+    # Backfill from the JSON column in batches
+    students = sa.table(
+        'students',
+        sa.column('id', sa.Integer),
+        sa.column('face_encoding', sa.JSON),
+        sa.column('face_embedding', sa.LargeBinary),
+    )
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            sa.select(students.c.id, students.c.face_encoding)
+            .where(students.c.face_encoding.isnot(None), students.c.id > last_id)
+            .order_by(students.c.id)
+            .limit(BACKFILL_BATCH)
+        ).all()
+        if not rows:
+            break
+        for student_id, encoding in rows:
+            vec = np.asarray(encoding or [], dtype='<f4').reshape(-1)
+            if vec.size != EMBEDDING_DIM:
+                continue
+            conn.execute(
+                students.update().where(students.c.id == student_id).values(face_embedding=vec.tobytes())
+            )
+            if vector_version:
+                conn.execute(
+                    sa.text("UPDATE students SET face_embedding_vector = CAST(:vec AS vector) WHERE id = :id"),
+                    {"vec": "[" + ",".join(f"{x:.7g}" for x in vec) + "]", "id": student_id},
+                )
+        last_id = rows[-1][0]
+
+    # Enrolled students only; speeds up gallery loads
+    op.execute("""
+    CREATE INDEX IF NOT EXISTS ix_students_face_embedding_present
+    ON students (id)
+    WHERE face_embedding IS NOT NULL;
+    """)
+
+    # Approximate nearest-neighbour index for cosine distance
+    if vector_version:
+        if _supports_hnsw(vector_version):
+            op.execute("""
+            CREATE INDEX IF NOT EXISTS ix_students_face_embedding_vector
+            ON students USING hnsw (face_embedding_vector vector_cosine_ops);
+            """)
+        else:
+            op.execute("""
+            CREATE INDEX IF NOT EXISTS ix_students_face_embedding_vector
+            ON students USING ivfflat (face_embedding_vector vector_cosine_ops) WITH (lists = 100);
+            """)
+
+
+def downgrade():
+    op.execute("DROP INDEX IF EXISTS ix_students_face_embedding_vector;")
+    op.execute("DROP INDEX IF EXISTS ix_students_face_embedding_present;")
+    op.execute("ALTER TABLE students DROP COLUMN IF EXISTS face_embedding_vector")
+    op.drop_column('students', 'face_embedding')
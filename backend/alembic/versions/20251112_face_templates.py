@@ -0,0 +1,24 @@
+"""
+Add students.face_templates for multi-template face enrollment
+
+Revision ID: n20251112_face_templates
+Revises: n20251110_binary_face_embeddings
+Create Date: 2025-11-12 00:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'n20251112_face_templates'
+down_revision = 'n20251110_binary_face_embeddings'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Packed float32 (n, 512) matrix; students without it match on face_embedding alone
+    op.add_column('students', sa.Column('face_templates', sa.LargeBinary(), nullable=True))
+
+
+def downgrade():
+    op.drop_column('students', 'face_templates')
@@ -0,0 +1,31 @@
+"""
+Version student face embeddings and stage re-embedded ones for an atomic switch
+
+Revision ID: n20251120_face_embedding_versions
+Revises: n20251112_face_templates
+Create Date: 2025-11-20 00:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'n20251120_face_embedding_versions'
+down_revision = 'n20251112_face_templates'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Model version (pack + detector size) that produced the active embedding; NULL = unknown/legacy
+    op.add_column('students', sa.Column('face_embedding_version', sa.String(), nullable=True))
+    # Written by scripts/reembed_faces.py and swapped into the active columns in one transaction
+    op.add_column('students', sa.Column('face_embedding_staged', sa.LargeBinary(), nullable=True))
+    op.add_column('students', sa.Column('face_templates_staged', sa.LargeBinary(), nullable=True))
+    op.add_column('students', sa.Column('face_embedding_staged_version', sa.String(), nullable=True))
+
+
+def downgrade():
+    op.drop_column('students', 'face_embedding_staged_version')
+    op.drop_column('students', 'face_templates_staged')
+    op.drop_column('students', 'face_embedding_staged')
+    op.drop_column('students', 'face_embedding_version')
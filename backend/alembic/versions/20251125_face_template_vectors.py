@@ -0,0 +1,135 @@
+"""
+Index every enrollment template in pgvector (student_face_templates) instead of one averaged vector per student
+
+Revision ID: n20251125_face_template_vectors
+Revises: n20251120_face_embedding_versions
+Create Date: 2025-11-25 00:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+import numpy as np
+
+# revision identifiers, used by Alembic.
+revision = 'n20251125_face_template_vectors'
+down_revision = 'n20251120_face_embedding_versions'
+branch_labels = None
+depends_on = None
+
+EMBEDDING_DIM = 512
+MAX_TEMPLATES = 5  # settings.face_max_templates default
+BACKFILL_BATCH = 500
+
+
+def _pgvector_version(conn):
+    """Installed pgvector version, or None."""
+    if conn.dialect.name != 'postgresql':
+        return None
+    row = conn.execute(sa.text("SELECT extversion FROM pg_extension WHERE extname = 'vector'")).first()
+    return row[0] if row else None
+
+
+def _supports_hnsw(version):
+    major, minor = (int(part) for part in version.split('.')[:2])
+    return (major, minor) >= (0, 5)
+
+
+def _vector_literal(vec):
+    return "[" + ",".join(f"{x:.7g}" for x in vec) + "]"
+
+
+def _templates(templates_blob, embedding_blob):
+    """Packed (n, 512) templates, else the single embedding, as float32 rows."""
+    for blob in (templates_blob, embedding_blob):
+        if blob and len(blob) % (4 * EMBEDDING_DIM) == 0:
+            return np.frombuffer(blob, dtype='<f4').reshape(-1, EMBEDDING_DIM)[:MAX_TEMPLATES]
+    return None
+
+
+def upgrade():
+    conn = op.get_bind()
+    vector_version = _pgvector_version(conn)
+    if not vector_version:
+        # pgvector was not available when the column was added; nothing to migrate
+        return
+
+    op.execute(f"""
+    CREATE TABLE student_face_templates (
+        student_id INTEGER NOT NULL REFERENCES students(id) ON DELETE CASCADE,
+        template_index SMALLINT NOT NULL,
+        embedding vector({EMBEDDING_DIM}) NOT NULL,
+        PRIMARY KEY (student_id, template_index)
+    )
+    """)
+
+    students = sa.table(
+        'students',
+        sa.column('id', sa.Integer),
+        sa.column('face_templates', sa.LargeBinary),
+        sa.column('face_embedding', sa.LargeBinary),
+    )
+    insert = sa.text(
+        "INSERT INTO student_face_templates (student_id, template_index, embedding) "
+        "VALUES (:student_id, :template_index, CAST(:vec AS vector))"
+    )
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            sa.select(students.c.id, students.c.face_templates, students.c.face_embedding)
+            .where(students.c.face_embedding.isnot(None), students.c.id > last_id)
+            .order_by(students.c.id)
+            .limit(BACKFILL_BATCH)
+        ).all()
+        if not rows:
+            break
+        params = []
+        for student_id, templates_blob, embedding_blob in rows:
+            templates = _templates(templates_blob, embedding_blob)
+            if templates is not None:
+                params.extend({"student_id": student_id, "template_index": index, "vec": _vector_literal(vec)}
+                              for index, vec in enumerate(templates))
+        if params:
+            conn.execute(insert, params)
+        last_id = rows[-1][0]
+
+    # Approximate nearest-neighbour index for cosine distance (built after the backfill)
+    if _supports_hnsw(vector_version):
+        op.execute("""
+        CREATE INDEX ix_student_face_templates_embedding
+        ON student_face_templates USING hnsw (embedding vector_cosine_ops);
+        """)
+    else:
+        op.execute("""
+        CREATE INDEX ix_student_face_templates_embedding
+        ON student_face_templates USING ivfflat (embedding vector_cosine_ops) WITH (lists = 100);
+        """)
+
+    # The averaged per-student vector is no longer searched
+    op.execute("DROP INDEX IF EXISTS ix_students_face_embedding_vector;")
+    op.execute("ALTER TABLE students DROP COLUMN IF EXISTS face_embedding_vector")
+
+
+def downgrade():
+    conn = op.get_bind()
+    vector_version = _pgvector_version(conn)
+    if not vector_version:
+        return
+
+    op.execute(f"ALTER TABLE students ADD COLUMN IF NOT EXISTS face_embedding_vector vector({EMBEDDING_DIM})")
+    rows = conn.execute(sa.text("SELECT id, face_embedding FROM students WHERE face_embedding IS NOT NULL")).all()
+    for student_id, blob in rows:
+        if blob and len(blob) == 4 * EMBEDDING_DIM:
+            conn.execute(
+                sa.text("UPDATE students SET face_embedding_vector = CAST(:vec AS vector) WHERE id = :id"),
+                {"vec": _vector_literal(np.frombuffer(blob, dtype='<f4')), "id": student_id},
+            )
+    if _supports_hnsw(vector_version):
+        op.execute("""
+        CREATE INDEX IF NOT EXISTS ix_students_face_embedding_vector
+        ON students USING hnsw (face_embedding_vector vector_cosine_ops);
+        """)
+    else:
+        op.execute("""
+        CREATE INDEX IF NOT EXISTS ix_students_face_embedding_vector
+        ON students USING ivfflat (face_embedding_vector vector_cosine_ops) WITH (lists = 100);
+        """)
+    op.execute("DROP TABLE IF EXISTS student_face_templates")
@@ -2,7 +2,7 @@ from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
-from sqlalchemy.orm import selectinload
+from sqlalchemy.orm import defer, selectinload
 from app.core.database import get_db
 from app.core.security import verify_token
 from app.models import User, Student, Admin, Teacher
@@ -14,7 +14,10 @@ async def get_current_user(
     db: AsyncSession = Depends(get_db)
 ) -> User:
     """Get current authenticated user."""
-    token = credentials.credentials
+    return await get_user_from_token(credentials.credentials, db)
+
+async def get_user_from_token(token: str, db: AsyncSession) -> User:
+    """Resolve a bearer token to an active user (also used by WebSocket handshakes)."""
     payload = verify_token(token)
 
     user_id_str: str = payload.get("sub")
@@ -92,6 +95,39 @@ async def get_current_student(
     
     return student
 
+# Face payload columns (legacy JSON plus packed blobs, several KB per row)
+FACE_PAYLOAD_COLUMNS = (
+    Student.face_encoding, Student.face_embedding, Student.face_templates,
+    Student.face_embedding_staged, Student.face_templates_staged,
+)
+
+async def get_current_student_for_verification(
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+) -> Student:
+    """Current student without the face payload columns (1:1 checks read the verification cache)."""
+    current_role = current_user.role.value if hasattr(current_user.role, 'value') else str(current_user.role)
+    if current_role != "student":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not enough permissions"
+        )
+    
+    result = await db.execute(
+        select(Student)
+        .where(Student.user_id == current_user.id)
+        .options(*(defer(column) for column in FACE_PAYLOAD_COLUMNS))
+    )
+    student = result.scalar_one_or_none()
+    
+    if student is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Student profile not found"
+        )
+    
+    return student
+
 async def get_current_admin(
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
@@ -1,19 +1,37 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Request, WebSocket
+from starlette.datastructures import UploadFile as StarletteUploadFile
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, Date, and_, func, text
-from sqlalchemy.orm import selectinload
 from datetime import datetime, date, time as time_type
-from typing import List, Optional, Dict, Any
-from app.core.database import get_db
-from app.models import Student, AttendanceRecord, Subject, ClassSchedule, DayOfWeek, AttendanceStatus, AttendanceMethod
+from typing import List, Optional, Dict, Any, Tuple
+from app.core.database import get_db, AsyncSessionLocal
+from app.models import Student, User, AttendanceRecord, Subject, ClassSchedule, DayOfWeek, AttendanceStatus, AttendanceMethod
 from app.schemas import (
     FaceRecognitionRequest, FaceRecognitionResponse, FaceRegistrationRequest,
-    MultiImageFaceRegistrationRequest,
+    MultiImageFaceRegistrationRequest, ImageData, FaceBoxHint,
     AttendanceRecord as AttendanceRecordSchema
 )
-from app.services.insightface_service import insightface_service
-from app.api.dependencies import get_current_student
+from app.services.insightface_service import insightface_service, EMBEDDING_UNCLEAR_MESSAGE
+from app.services.face_gallery import face_gallery, GalleryMatch, Cohort, cohort_key
+from app.services.face_embedding_store import face_embedding_store
+from app.services.student_embedding_cache import student_embedding_cache
+from app.core.config import settings
+from app.services.face_inference_executor import face_inference_executor, FaceInferenceBusyError
+from app.services.face_model_registry import session_config
+from app.services.liveness_service import liveness_service
+from app.services.face_quality_gate import face_quality_gate
+from app.services.frame_cache import frame_result_cache, frame_hash, encoded_image_bytes
+from app.services.face_tracker import face_tracker
+from app.services.enrollment_images import save_enrollment_images
+from app.services.face_metrics import face_metrics
+from app.services.face_batcher import recognition_batcher
+from app.api.dependencies import (
+    get_current_student, get_current_student_for_verification, get_user_from_token, require_admin_role
+)
 from pydantic import BaseModel
+import asyncio
+import json
+import time
 from app.core.face_constants import (
     LIVE_SIMILARITY_THRESHOLD,
     EXCELLENT_MATCH_THRESHOLD,
@@ -100,6 +118,152 @@ async def mark_absent_for_expired_classes(db: AsyncSession, student_id: int, stu
         await db.rollback()
 
 
+async def run_inference(fn, *args, **kwargs):
+    """Run blocking face work on the inference pool; a full queue becomes HTTP 503."""
+    try:
+        return await face_inference_executor.run(fn, *args, **kwargs)
+    except FaceInferenceBusyError as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e)
+        )
+
+
+async def extract_probe_face(image, policy: str = "mark_attendance",
+                             roi_hint: Optional[FaceBoxHint] = None) -> Optional[Dict[str, Any]]:
+    """
+    Detect the most prominent face and embed it through the recognition micro-batcher,
+    so concurrent attendance requests share one batched ArcFace call.
+    ``policy`` picks the detection ladder from DETECTION_LADDERS, the pre-embedding
+    quality checks (QUALITY_GATE_POLICIES) and whether the liveness stage runs
+    (LIVENESS_POLICIES). A face refused by either comes back without an embedding and
+    with ``face_info['quality']['passed']`` or ``face_info['liveness']['is_live']`` False.
+    ``roi_hint`` is the client's face box; detection then only searches around it.
+    """
+    analysis = await run_inference(
+        insightface_service.analyze_image, image, embed=False, policy=policy, roi_hint=roi_hint
+    )
+    face_info = analysis.largest_face()
+    if face_info is None or face_info['embedding'] is not None:
+        # No face, or development mode mock that already carries an embedding
+        return face_info
+    
+    # Same quality/liveness cascade as registration (gate_and_embed); only the embedding is batched
+    refusal = await run_inference(insightface_service.gate_face, image, face_info, policy)
+    if refusal is not None:
+        return face_info
+    
+    return await embed_probe_face(image, analysis, face_info)
+
+
+async def embed_probe_face(image, analysis, face_info: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Align a detected face and embed it through the recognition micro-batcher."""
+    if face_info['embedding'] is not None:
+        return face_info
+    crop = insightface_service.align_face(image, analysis, face_info)
+    if crop is None:
+        return None
+    
+    try:
+        embedding = await recognition_batcher.embed(crop)
+    except FaceInferenceBusyError as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e)
+        )
+    return insightface_service.attach_embedding(face_info, embedding)
+
+
+async def refresh_gallery_entry(db: AsyncSession, student: Student, templates):
+    """Push a freshly committed registration (one embedding or its templates) into the in-memory face gallery."""
+    try:
+        name_result = await db.execute(select(User.full_name).where(User.id == student.user_id))
+        student_name = name_result.scalar_one_or_none() or ""
+        face_gallery.upsert(student.id, student_name, templates,
+                            cohort=cohort_key(student.faculty_id, student.semester))
+    except Exception as e:
+        # Gallery will pick the change up on its next periodic reload
+        print(f"Warning: Failed to update face gallery for student {student.id}: {e}")
+        face_gallery.invalidate()
+
+
+async def keep_enrollment_images(student_id: int, images):
+    """Store the registration photos for later re-embedding (never fails the registration)."""
+    try:
+        count = await asyncio.to_thread(save_enrollment_images, student_id, images)
+        print(f"[DEBUG] 🗂️ Kept {count} enrollment image(s) for student {student_id}")
+    except Exception as e:
+        print(f"Warning: Failed to keep enrollment images for student {student_id}: {e}")
+
+
+async def resolve_search_cohort(db: AsyncSession, subject_id: Optional[int] = None,
+                                schedule_id: Optional[int] = None) -> Cohort:
+    """
+    (faculty_id, semester) whose students may legitimately attend a schedule or subject.
+    None (search everyone) when neither is given or the cohort is ambiguous.
+    """
+    if schedule_id is not None:
+        result = await db.execute(
+            select(ClassSchedule.faculty_id, ClassSchedule.semester).where(ClassSchedule.id == schedule_id)
+        )
+        row = result.first()
+        return cohort_key(*row) if row else None
+
+    if subject_id is not None:
+        result = await db.execute(
+            select(ClassSchedule.faculty_id, ClassSchedule.semester)
+            .where(ClassSchedule.subject_id == subject_id, ClassSchedule.is_active == True)
+            .distinct()
+        )
+        rows = result.all()
+        # A subject taught to several cohorts can't be narrowed down
+        return cohort_key(*rows[0]) if len(rows) == 1 else None
+
+    return None
+
+
+async def search_gallery(db: AsyncSession, embedding, top_k: int = 1,
+                         cohort: Cohort = None) -> List[GalleryMatch]:
+    """1:N identification via pgvector when configured, else the in-memory gallery."""
+    with face_metrics.timed("search"):
+        return await _search_gallery(db, embedding, top_k, cohort)
+
+
+async def _search_gallery(db: AsyncSession, embedding, top_k: int, cohort: Cohort) -> List[GalleryMatch]:
+    if settings.face_search_backend == "pgvector":
+        try:
+            rows = await face_embedding_store.nearest(db, embedding, limit=top_k, cohort=cohort)
+        except Exception as e:
+            print(f"Warning: pgvector search failed, using in-memory gallery: {e}")
+            rows = None
+        if rows is not None:
+            return [GalleryMatch(student_id=sid, student_name=name, similarity=sim) for sid, name, sim in rows]
+
+    await face_gallery.ensure_loaded(db)
+    if not face_gallery.quantized:
+        return face_gallery.search(embedding, top_k=top_k, cohort=cohort)
+
+    # Quantized gallery: over-fetch, then re-rank in float32 against the stored templates
+    candidates = face_gallery.search(embedding, top_k=max(top_k, face_gallery.rerank_size), cohort=cohort)
+    try:
+        templates_by_id = await face_embedding_store.load_templates(db, [m.student_id for m in candidates])
+    except Exception as e:
+        print(f"Warning: Gallery re-rank failed, using quantized scores: {e}")
+        return candidates[:top_k]
+    return face_gallery.rescore(embedding, candidates, templates_by_id, top_k=top_k)
+
+
+def preview_session_key(request: Optional[Request]) -> str:
+    """Identify a preview client for the frame cache: X-Client-Session header, else address + user agent."""
+    if request is None:
+        return "anonymous"
+    session = request.headers.get("x-client-session")
+    if session:
+        return f"session:{session}"
+    host = request.client.host if request.client else "unknown"
+    return f"client:{host}|{request.headers.get('user-agent', '')}"
+
+
 # New schema for glasses detection
 class GlassesDetectionRequest(BaseModel):
     image_data: str  # Base64 encoded image
@@ -113,7 +277,10 @@ class GlassesDetectionResponse(BaseModel):
 
 # New schema for real-time recognition
 class LiveRecognitionRequest(BaseModel):
-    image_data: str  # Base64 encoded image
+    image_data: ImageData  # Base64 encoded image (or raw bytes from /upload)
+    subject_id: Optional[int] = None  # Narrows the search to the subject's cohort
+    schedule_id: Optional[int] = None  # Narrows the search to the class's cohort
+    face_hint: Optional[FaceBoxHint] = None  # Accepted but ignored: the multiple-face check needs the full frame
 
 class LiveRecognitionResponse(BaseModel):
     success: bool
@@ -124,21 +291,26 @@ class LiveRecognitionResponse(BaseModel):
     confidence_score: Optional[float] = None
     faces_detected: int
     recognition_quality: Optional[str] = None
+    cached: bool = False  # Served from the preview frame cache
+    tracked: bool = False  # Identity carried over from a tracked face without re-embedding
 
 router = APIRouter(prefix="/face-recognition", tags=["face-recognition"])
+# Mounted without the /api prefix: /ws/face-recognition/...
+ws_router = APIRouter(prefix="/ws/face-recognition", tags=["face-recognition"])
 
 @router.post("/mark-attendance", response_model=FaceRecognitionResponse)
 async def mark_attendance_with_face(
     recognition_data: FaceRecognitionRequest,
     db: AsyncSession = Depends(get_db),
-    current_student: Student = Depends(get_current_student)
+    current_student: Student = Depends(get_current_student_for_verification)
 ):
     """Mark attendance using face recognition."""
     try:
         print(f"[DEBUG] Mark attendance request - Student ID: {current_student.id}, Subject ID: {recognition_data.subject_id}")
         
         # Verify the face matches the current logged-in student
-        if current_student.face_encoding is None:
+        registered_templates = await student_embedding_cache.get(db, current_student)
+        if registered_templates is None:
             return FaceRecognitionResponse(
                 success=False,
                 message="No registered face found. Please register your face first.",
@@ -146,8 +318,8 @@ async def mark_attendance_with_face(
             )
         
         # Decode and extract embedding for the provided image
-        image = insightface_service.decode_base64_image(recognition_data.image_data)
-        face_info = insightface_service.extract_face_features(image)
+        image = await run_inference(insightface_service.decode_image, recognition_data.image_data)
+        face_info = await extract_probe_face(image, roi_hint=recognition_data.face_hint)
 
         if not face_info:
             return FaceRecognitionResponse(
@@ -156,6 +328,22 @@ async def mark_attendance_with_face(
                 attendance_marked=False
             )
 
+        quality = face_info.get('quality')
+        if quality and not quality['passed']:
+            return FaceRecognitionResponse(
+                success=False,
+                message=quality['message'],
+                attendance_marked=False
+            )
+
+        liveness = face_info.get('liveness')
+        if liveness and not liveness['is_live']:
+            return FaceRecognitionResponse(
+                success=False,
+                message=liveness['message'],
+                attendance_marked=False
+            )
+
         if face_info['confidence'] < insightface_service.confidence_threshold:
             return FaceRecognitionResponse(
                 success=False,
@@ -164,9 +352,10 @@ async def mark_attendance_with_face(
             )
 
         unknown_embedding = face_info['embedding']
-        is_match, similarity_score, _ = insightface_service.compare_embeddings(
-            [current_student.face_encoding], unknown_embedding
-        )
+        with face_metrics.timed("match"):
+            is_match, similarity_score, _ = insightface_service.compare_normalized(
+                registered_templates, unknown_embedding
+            )
 
         if not is_match:
             return FaceRecognitionResponse(
@@ -176,9 +365,10 @@ async def mark_attendance_with_face(
             )
 
         # Verify subject exists
-        subject_result = await db.execute(
-            select(Subject).where(Subject.id == recognition_data.subject_id)
-        )
+        with face_metrics.timed("db"):
+            subject_result = await db.execute(
+                select(Subject).where(Subject.id == recognition_data.subject_id)
+            )
         subject = subject_result.scalar_one_or_none()
         if not subject:
             print(f"[ERROR] Subject ID {recognition_data.subject_id} not found")
@@ -193,13 +383,14 @@ async def mark_attendance_with_face(
         # Check if attendance already marked today for this subject
         today = datetime.now().date()
         today_datetime = datetime.combine(today, datetime.min.time())  # Convert to datetime for database
-        existing_record = await db.execute(
-            select(AttendanceRecord).where(
-                AttendanceRecord.student_id == current_student.id,
-                AttendanceRecord.subject_id == recognition_data.subject_id,
-                func.date(AttendanceRecord.date) == today
+        with face_metrics.timed("db"):
+            existing_record = await db.execute(
+                select(AttendanceRecord).where(
+                    AttendanceRecord.student_id == current_student.id,
+                    AttendanceRecord.subject_id == recognition_data.subject_id,
+                    func.date(AttendanceRecord.date) == today
+                )
             )
-        )
         
         if existing_record.scalar_one_or_none():
             return FaceRecognitionResponse(
@@ -228,7 +419,8 @@ async def mark_attendance_with_face(
         
         db.add(attendance)
         try:
-            await db.commit()
+            with face_metrics.timed("db_commit"):
+                await db.commit()
             print(f"[DEBUG] Attendance record created successfully")
         except Exception as commit_error:
             print(f"[ERROR] Database commit failed: {str(commit_error)}")
@@ -236,7 +428,8 @@ async def mark_attendance_with_face(
             raise commit_error
         
         # Auto-mark absent for any expired classes TODAY that have no attendance record
-        await mark_absent_for_expired_classes(db, current_student.id, current_student, today)
+        with face_metrics.timed("auto_absent"):
+            await mark_absent_for_expired_classes(db, current_student.id, current_student, today)
         
         return FaceRecognitionResponse(
             success=True,
@@ -246,6 +439,8 @@ async def mark_attendance_with_face(
             attendance_marked=True
         )
     
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"[ERROR] Exception in mark_attendance_with_face: {str(e)}")
         import traceback
@@ -258,19 +453,21 @@ async def mark_attendance_with_face(
 @router.post("/verify-identity")
 async def verify_identity(
     request: FaceRegistrationRequest,
-    current_student: Student = Depends(get_current_student)
+    current_student: Student = Depends(get_current_student_for_verification),
+    db: AsyncSession = Depends(get_db)
 ):
     """Verify that the provided face image matches the currently authenticated student."""
     try:
-        if current_student.face_encoding is None:
+        registered_templates = await student_embedding_cache.get(db, current_student)
+        if registered_templates is None:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="No registered face found for the current user. Please register your face first."
             )
 
         # Decode and extract embedding for the provided image
-        image = insightface_service.decode_base64_image(request.image_data)
-        face_info = insightface_service.extract_face_features(image)
+        image = await run_inference(insightface_service.decode_image, request.image_data)
+        face_info = await extract_probe_face(image, policy="verify_identity", roi_hint=request.face_hint)
 
         if not face_info:
             return {
@@ -279,6 +476,24 @@ async def verify_identity(
                 "message": "No clear face detected."
             }
 
+        quality = face_info.get('quality')
+        if quality and not quality['passed']:
+            return {
+                "matched": False,
+                "confidence_score": 0.0,
+                "message": quality['message'],
+                "quality": quality
+            }
+
+        liveness = face_info.get('liveness')
+        if liveness and not liveness['is_live']:
+            return {
+                "matched": False,
+                "confidence_score": 0.0,
+                "message": liveness['message'],
+                "liveness": liveness
+            }
+
         if face_info['confidence'] < insightface_service.confidence_threshold:
             return {
                 "matched": False,
@@ -287,8 +502,8 @@ async def verify_identity(
             }
 
         unknown_embedding = face_info['embedding']
-        is_match, similarity_score, _ = insightface_service.compare_embeddings(
-            [current_student.face_encoding], unknown_embedding
+        is_match, similarity_score, _ = insightface_service.compare_normalized(
+            registered_templates, unknown_embedding
         )
 
         return {
@@ -321,11 +536,11 @@ async def register_student_face(
         if isinstance(request.image_data, list):
             # Multiple images provided
             print(f"[DEBUG] 📷 Processing {len(request.image_data)} images")
-            registration_result = insightface_service.process_multi_image_face_registration(request.image_data)
+            registration_result = await run_inference(insightface_service.process_multi_image_face_registration, request.image_data)
         else:
             # Single image provided (backward compatibility)
             print(f"[DEBUG] 📷 Processing single image")
-            registration_result = insightface_service.process_face_registration(request.image_data)
+            registration_result = await run_inference(insightface_service.process_face_registration, request.image_data)
         
         print(f"[DEBUG] 📊 Registration result: {registration_result['success']}")
         print(f"[DEBUG] 📝 Message: {registration_result['message']}")
@@ -348,9 +563,16 @@ async def register_student_face(
         
         # Update student's face embedding in database
         print("[DEBUG] 💾 Updating student face embedding in database...")
-        current_student.face_encoding = face_encoding
+        templates = registration_result.get('templates')
+        await face_embedding_store.save(db, current_student, face_encoding, templates=templates)
         await db.commit()
         print("[DEBUG] ✅ Face embedding saved successfully")
+        student_embedding_cache.invalidate(current_student.id)
+        await refresh_gallery_entry(db, current_student, templates or face_encoding)
+        await keep_enrollment_images(
+            current_student.id,
+            request.image_data if isinstance(request.image_data, list) else [request.image_data]
+        )
         
         # Build response based on registration type
         if isinstance(request.image_data, list):
@@ -407,7 +629,7 @@ async def register_student_face_multi(
         print(f"[DEBUG] 📷 Processing {len(request.images)} images")
         
         # Process multiple images
-        registration_result = insightface_service.process_multi_image_face_registration(request.images)
+        registration_result = await run_inference(insightface_service.process_multi_image_face_registration, request.images)
         
         print(f"[DEBUG] 📊 Registration result: {registration_result['success']}")
         print(f"[DEBUG] 📝 Valid images: {registration_result.get('valid_images', 0)}/{registration_result.get('images_processed', 0)}")
@@ -430,9 +652,13 @@ async def register_student_face_multi(
         
         # Update student's face embedding in database
         print("[DEBUG] 💾 Updating student face embedding in database...")
-        current_student.face_encoding = face_encoding
+        templates = registration_result.get('templates')
+        await face_embedding_store.save(db, current_student, face_encoding, templates=templates)
         await db.commit()
         print("[DEBUG] ✅ Multi-image face embedding saved successfully")
+        student_embedding_cache.invalidate(current_student.id)
+        await refresh_gallery_entry(db, current_student, templates or face_encoding)
+        await keep_enrollment_images(current_student.id, request.images)
         
         return {
             "success": True,
@@ -479,9 +705,10 @@ async def verify_face_image(request: FaceRegistrationRequest):
     """Verify if image contains a valid face for registration."""
     try:
         # Decode image
-        image = insightface_service.decode_base64_image(request.image_data)
+        image = await run_inference(insightface_service.decode_image, request.image_data)
         # Detect faces
-        detected_faces = insightface_service.detect_faces(image)
+        analysis = await run_inference(insightface_service.analyze_image, image)
+        detected_faces = analysis.faces
         if len(detected_faces) == 0:
             return {
                 "valid": False,
@@ -499,7 +726,7 @@ async def verify_face_image(request: FaceRegistrationRequest):
         # Single face detected - validate quality
         face_data = detected_faces[0]
         is_valid, validation_message = insightface_service.validate_face_quality(image, face_data)
-        area_percentage = (face_data['area'] / (image.shape[0] * image.shape[1])) * 100
+        area_percentage = analysis.area_percentage(face_data)
         feedback = []
         if face_data['confidence'] < 0.7:
             feedback.append("Improve lighting for better detection")
@@ -566,80 +793,64 @@ async def get_face_recognition_service_status():
             "models": {}
         }
 
+@router.get("/inference-stats")
+async def get_face_inference_stats(current_user: User = Depends(require_admin_role)):
+    """Inference executor queue/in-flight counts, ORT session settings, decode timings and recognition micro-batching metrics."""
+    return {
+        "gallery": face_gallery.stats(),
+        "executor": face_inference_executor.stats(),
+        "onnx_runtime": {
+            **session_config(),
+            "warmed_up": insightface_service.warmed_up if insightface_service else False,
+            "warmup_ms": insightface_service.warmup_ms if insightface_service else None,
+        },
+        "decode": insightface_service.decode_stats() if insightface_service else None,
+        "liveness": liveness_service.stats(),
+        "frame_cache": frame_result_cache.stats(),
+        "face_tracking": face_tracker.stats(),
+        "verification_cache": student_embedding_cache.stats(),
+        "quality_gate": face_quality_gate.stats(),
+        "detection_ladder": insightface_service.detection_ladder_stats() if insightface_service else None,
+        "roi_hint": insightface_service.roi_hint_stats() if insightface_service else None,
+        "recognition_batching": recognition_batcher.stats(),
+        "live_stream": live_stream_stats.snapshot()
+    }
+
+@router.get("/timing-stats")
+async def get_face_timing_stats(current_user: User = Depends(require_admin_role)):
+    """
+    Per-stage latency (p50/p95/p99 over the last ``face_metrics_window`` samples per stage)
+    and per-endpoint totals for face requests. The same stages are returned per request
+    in the ``Server-Timing`` header.
+    """
+    return face_metrics.snapshot()
+
+
 @router.post("/detect-faces")
-async def detect_faces_in_image(request: FaceRegistrationRequest):
+async def detect_faces_in_image(request: FaceRegistrationRequest, http_request: Request):
     """
     Detect faces in image for real-time feedback.
     Returns face detection results without registration.
+    Near-identical consecutive frames from the same client reuse the last result.
     """
     try:
         print(f"[DEBUG] 🔍 Real-time face detection requested")
         print(f"[DEBUG] 📷 Image data length: {len(request.image_data)}")
         
+        image_bytes = encoded_image_bytes(request.image_data)
+        session = preview_session_key(http_request)
+        frame = frame_hash(image_bytes)
+        cached = frame_result_cache.lookup(session, "detect", frame)
+        if cached is not None:
+            return {**cached, "cached": True}
+        
         # Decode image
-        image = insightface_service.decode_base64_image(request.image_data)
+        image = await run_inference(insightface_service.decode_image, image_bytes)
         print(f"[DEBUG] 📷 Image decoded - Shape: {image.shape}")
         
-        # Detect faces only
-        detected_faces = insightface_service.detect_faces(image)
-        
-        if len(detected_faces) == 0:
-            return {
-                "success": False,
-                "message": "No face detected. Please ensure your face is visible and well-lit.",
-                "faces_detected": 0,
-                "faces": [],
-                "feedback": "Move closer to camera or improve lighting"
-            }
-        
-        if len(detected_faces) > 1:
-            return {
-                "success": False,
-                "message": f"Multiple faces detected ({len(detected_faces)}). Please ensure only one person is visible.",
-                "faces_detected": len(detected_faces),
-                "faces": [
-                    {
-                        "bbox": face['bbox'],
-                        "confidence": face['confidence'],
-                        "area": face['area']
-                    }
-                    for face in detected_faces
-                ],
-                "feedback": "Multiple people detected - ensure only you are visible"
-            }
-        
-        # Single face detected - validate quality
-        face_data = detected_faces[0]
-        is_valid, validation_message = insightface_service.validate_face_quality(image, face_data)
-        
-        # Calculate feedback for user
-        confidence = face_data['confidence']
-        area_percentage = (face_data['area'] / (image.shape[0] * image.shape[1])) * 100
-        
-        feedback = []
-        if confidence < 0.7:
-            feedback.append("Improve lighting for better detection")
-        if area_percentage < 10:
-            feedback.append("Move closer to camera")
-        elif area_percentage > 60:
-            feedback.append("Move back from camera")
-        if not feedback and is_valid:
-            feedback.append("Perfect! Ready for capture")
-        
-        return {
-            "success": is_valid,
-            "message": validation_message,
-            "faces_detected": 1,
-            "faces": [{
-                "bbox": face_data['bbox'],
-                "confidence": face_data['confidence'],
-                "width": face_data['width'],
-                "height": face_data['height'],
-                "area_percentage": area_percentage
-            }],
-            "feedback": " • ".join(feedback),
-            "ready_for_capture": is_valid
-        }
+        result = await detect_faces_feedback(image)
+        frame_result_cache.store(session, "detect", frame, result)
+        return result
     
     except Exception as e:
         return {
@@ -651,6 +862,71 @@ async def detect_faces_in_image(request: FaceRegistrationRequest):
             "ready_for_capture": False
         }
 
+async def detect_faces_feedback(image) -> Dict[str, Any]:
+    """Detection + quality feedback payload of /detect-faces for a decoded frame."""
+    # Detect faces only
+    analysis = await run_inference(insightface_service.analyze_image, image, policy="detect_faces")
+    detected_faces = analysis.faces
+    
+    if len(detected_faces) == 0:
+        return {
+            "success": False,
+            "message": "No face detected. Please ensure your face is visible and well-lit.",
+            "faces_detected": 0,
+            "faces": [],
+            "feedback": "Move closer to camera or improve lighting"
+        }
+    
+    if len(detected_faces) > 1:
+        return {
+            "success": False,
+            "message": f"Multiple faces detected ({len(detected_faces)}). Please ensure only one person is visible.",
+            "faces_detected": len(detected_faces),
+            "faces": [
+                {
+                    "bbox": face['bbox'],
+                    "confidence": face['confidence'],
+                    "area": face['area']
+                }
+                for face in detected_faces
+            ],
+            "feedback": "Multiple people detected - ensure only you are visible"
+        }
+    
+    # Single face detected - validate quality
+    face_data = detected_faces[0]
+    is_valid, validation_message = insightface_service.validate_face_quality(image, face_data)
+    
+    # Calculate feedback for user
+    confidence = face_data['confidence']
+    area_percentage = analysis.area_percentage(face_data)
+    
+    feedback = []
+    if confidence < 0.7:
+        feedback.append("Improve lighting for better detection")
+    if area_percentage < 10:
+        feedback.append("Move closer to camera")
+    elif area_percentage > 60:
+        feedback.append("Move back from camera")
+    if not feedback and is_valid:
+        feedback.append("Perfect! Ready for capture")
+    
+    return {
+        "success": is_valid,
+        "message": validation_message,
+        "faces_detected": 1,
+        "faces": [{
+            "bbox": face_data['bbox'],
+            "confidence": face_data['confidence'],
+            "width": face_data['width'],
+            "height": face_data['height'],
+            "area_percentage": area_percentage
+        }],
+        "feedback": " • ".join(feedback),
+        "ready_for_capture": is_valid
+    }
+
+
 @router.post("/detect-glasses", response_model=GlassesDetectionResponse)
 async def detect_glasses(request: GlassesDetectionRequest):
     """
@@ -664,9 +940,12 @@ async def detect_glasses(request: GlassesDetectionRequest):
                 detail="Face recognition service not available"
             )
         
-        # Decode and analyze the image
-        image = insightface_service.decode_base64_image(request.image_data)
-        detected_faces = insightface_service.detect_faces(image)
+        # Decode and analyze the image (attribute models are loaded lazily on first use)
+        image = await run_inference(insightface_service.decode_image, request.image_data)
+        analysis = await run_inference(
+            insightface_service.analyze_image, image, embed=False, attributes=('age', 'gender', 'glasses')
+        )
+        detected_faces = analysis.faces
         
         if len(detected_faces) == 0:
             return GlassesDetectionResponse(
@@ -734,120 +1013,171 @@ async def detect_glasses(request: GlassesDetectionRequest):
             "feedback": "Try capturing a new image"
         }
 
+async def recognize_live_frame(db: AsyncSession, image, analysis=None, cohort: Cohort = None,
+                               session: Optional[str] = None, track_kind: str = "recognize",
+                               roi_hint: Optional[FaceBoxHint] = None) -> LiveRecognitionResponse:
+    """
+    Detect, validate and identify the single face in a decoded frame.
+    Shared by the HTTP endpoint and the WebSocket stream; pass ``analysis`` to reuse
+    a detection pass and ``cohort`` to search only that (faculty_id, semester) shard.
+    With a ``session`` a face identified on earlier frames keeps its identity from the
+    face tracker and is only re-embedded when the tracker asks for it. ``roi_hint``
+    is not used for detection here (see ROI_HINT_POLICIES): a crop around one face
+    would hide the others from the multiple-face check.
+    """
+    # Detection only; the face is embedded below unless the tracker already knows it
+    if analysis is None:
+        analysis = await run_inference(
+            insightface_service.analyze_image, image, embed=False, policy="live_recognition", roi_hint=roi_hint
+        )
+    detected_faces = analysis.faces
+    
+    if len(detected_faces) == 0:
+        face_tracker.drop(session, track_kind)
+        return LiveRecognitionResponse(
+            success=False,
+            message="No face detected",
+            student_recognized=False,
+            faces_detected=0,
+            recognition_quality="poor"
+        )
+    
+    if len(detected_faces) > 1:
+        face_tracker.drop(session, track_kind)
+        return LiveRecognitionResponse(
+            success=False,
+            message=f"Multiple faces detected ({len(detected_faces)})",
+            student_recognized=False,
+            faces_detected=len(detected_faces),
+            recognition_quality="multiple_faces"
+        )
+    
+    # Single face detected - now try to recognize
+    face_data = detected_faces[0]
+    
+    # Check face quality first (framing and confidence; the embedding norm is checked once it exists)
+    is_valid, validation_message = insightface_service.validate_face_quality(image, face_data, check_embedding=False)
+    
+    if not is_valid:
+        face_tracker.drop(session, track_kind)
+        return LiveRecognitionResponse(
+            success=False,
+            message=validation_message,
+            student_recognized=False,
+            faces_detected=1,
+            recognition_quality="poor"
+        )
+    
+    if face_data['confidence'] < insightface_service.confidence_threshold:
+        face_tracker.drop(session, track_kind)
+        return LiveRecognitionResponse(
+            success=False,
+            message="Face not clear enough for recognition",
+            student_recognized=False,
+            faces_detected=1,
+            recognition_quality="poor"
+        )
+    
+    # Same face as the last confidently identified one - skip embedding and search
+    tracked = face_tracker.lookup(session, track_kind, face_data['bbox'])
+    if tracked is not None:
+        return tracked.model_copy(update={"tracked": True})
+    
+    face_info = await embed_probe_face(image, analysis, face_data)
+    
+    if not face_info:
+        return LiveRecognitionResponse(
+            success=False,
+            message="Face not clear enough for recognition",
+            student_recognized=False,
+            faces_detected=1,
+            recognition_quality="poor"
+        )
+    
+    if not insightface_service.embedding_usable(face_info):
+        face_tracker.drop(session, track_kind)
+        return LiveRecognitionResponse(
+            success=False,
+            message=EMBEDDING_UNCLEAR_MESSAGE,
+            student_recognized=False,
+            faces_detected=1,
+            recognition_quality="poor"
+        )
+    
+    unknown_embedding = face_info['embedding']
+    
+    # Vectorized search (in-memory gallery or pgvector index)
+    matches = await search_gallery(db, unknown_embedding, top_k=1, cohort=cohort)
+    
+    if not matches:
+        return LiveRecognitionResponse(
+            success=False,
+            message="No registered students found",
+            student_recognized=False,
+            faces_detected=1,
+            recognition_quality="no_database"
+        )
+    
+    best = matches[0]
+    best_similarity = max(0.0, best.similarity)
+    
+    if best_similarity >= LIVE_SIMILARITY_THRESHOLD:
+        quality = (
+            "excellent" if best_similarity >= EXCELLENT_MATCH_THRESHOLD else
+            "good" if best_similarity >= GOOD_MATCH_THRESHOLD else
+            "fair"
+        )
+        result = LiveRecognitionResponse(
+            success=True,
+            message=f"Recognized: {best.student_name}",
+            student_recognized=True,
+            student_name=best.student_name,
+            student_id=best.student_id,
+            confidence_score=best_similarity * 100,
+            faces_detected=1,
+            recognition_quality=quality
+        )
+        face_tracker.update(session, track_kind, face_data['bbox'], result, best_similarity)
+        return result
+    
+    face_tracker.drop(session, track_kind)
+    return LiveRecognitionResponse(
+        success=False,
+        message="Face not recognized",
+        student_recognized=False,
+        faces_detected=1,
+        confidence_score=best_similarity * 100 if best_similarity > 0 else 0,
+        recognition_quality="unrecognized"
+    )
+
+
 @router.post("/live-recognition", response_model=LiveRecognitionResponse)
 async def live_face_recognition(
     request: LiveRecognitionRequest,
+    http_request: Request,
     db: AsyncSession = Depends(get_db)
 ):
     """
     Real-time face recognition that returns the recognized student's name.
     Used for live feedback during attendance marking process.
+    Near-identical consecutive frames from the same client reuse the last result.
     """
     try:
         print(f"[DEBUG] 🔍 Live recognition requested")
         
-        # Decode and analyze the image
-        image = insightface_service.decode_base64_image(request.image_data)
-        detected_faces = insightface_service.detect_faces(image)
-        
-        if len(detected_faces) == 0:
-            return LiveRecognitionResponse(
-                success=False,
-                message="No face detected",
-                student_recognized=False,
-                faces_detected=0,
-                recognition_quality="poor"
-            )
-        
-        if len(detected_faces) > 1:
-            return LiveRecognitionResponse(
-                success=False,
-                message=f"Multiple faces detected ({len(detected_faces)})",
-                student_recognized=False,
-                faces_detected=len(detected_faces),
-                recognition_quality="multiple_faces"
-            )
-        
-        # Single face detected - now try to recognize
-        face_data = detected_faces[0]
-        
-        # Check face quality first
-        is_valid, validation_message = insightface_service.validate_face_quality(image, face_data)
-        
-        if not is_valid:
-            return LiveRecognitionResponse(
-                success=False,
-                message=validation_message,
-                student_recognized=False,
-                faces_detected=1,
-                recognition_quality="poor"
-            )
-        
-        # Extract embedding from current face
-        face_info = insightface_service.extract_face_features(image)
-        
-        if not face_info or face_info['confidence'] < insightface_service.confidence_threshold:
-            return LiveRecognitionResponse(
-                success=False,
-                message="Face not clear enough for recognition",
-                student_recognized=False,
-                faces_detected=1,
-                recognition_quality="poor"
-            )
-        
-        unknown_embedding = face_info['embedding']
-        
-        # JSON-based face matching with linear scan
-        result = await db.execute(
-            select(Student).options(selectinload(Student.user)).where(Student.face_encoding.isnot(None))
-        )
-        students = result.scalars().all()
+        cohort = await resolve_search_cohort(db, request.subject_id, request.schedule_id)
+        image_bytes = encoded_image_bytes(request.image_data)
+        session, kind = preview_session_key(http_request), f"recognize:{cohort}"
+        frame = frame_hash(image_bytes)
+        cached = frame_result_cache.lookup(session, kind, frame)
+        if cached is not None:
+            return cached.model_copy(update={"cached": True})
         
-        if not students:
-            return LiveRecognitionResponse(
-                success=False,
-                message="No registered students found",
-                student_recognized=False,
-                faces_detected=1,
-                recognition_quality="no_database"
-            )
-        
-        best_match = None
-        best_similarity = 0.0
-        
-        for s in students:
-            is_match, sim_pct, _ = insightface_service.compare_embeddings([s.face_encoding], unknown_embedding)
-            sim = sim_pct / 100.0
-            if sim > best_similarity:
-                best_similarity = sim
-                if sim >= LIVE_SIMILARITY_THRESHOLD:
-                    best_match = s
-        
-        if best_match:
-            quality = (
-                "excellent" if best_similarity >= EXCELLENT_MATCH_THRESHOLD else
-                "good" if best_similarity >= GOOD_MATCH_THRESHOLD else
-                "fair"
-            )
-            return LiveRecognitionResponse(
-                success=True,
-                message=f"Recognized: {best_match.user.full_name}",
-                student_recognized=True,
-                student_name=best_match.user.full_name,
-                student_id=best_match.id,
-                confidence_score=best_similarity * 100,
-                faces_detected=1,
-                recognition_quality=quality
-            )
-        
-        return LiveRecognitionResponse(
-            success=False,
-            message="Face not recognized",
-            student_recognized=False,
-            faces_detected=1,
-            confidence_score=best_similarity * 100 if best_similarity > 0 else 0,
-            recognition_quality="unrecognized"
-        )
+        image = await run_inference(insightface_service.decode_image, image_bytes)
+        result = await recognize_live_frame(db, image, cohort=cohort, session=session, track_kind=kind,
+                                            roi_hint=request.face_hint)
+        frame_result_cache.store(session, kind, frame, result)
+        return result
     
     except Exception as e:
         print(f"[ERROR] ❌ Live recognition error: {str(e)}")
@@ -858,3 +1188,343 @@ async def live_face_recognition(
             faces_detected=0,
             recognition_quality="error"
         )
+
+
+# ----------------------------------------------------------------------
+# Binary upload variants (multipart/form-data or raw image/* body)
+# ----------------------------------------------------------------------
+RAW_IMAGE_CONTENT_TYPES = ("image/", "application/octet-stream")
+
+
+async def read_image_uploads(request: Request) -> Tuple[List[bytes], Dict[str, str]]:
+    """
+    Read image bytes from a multipart form (every file field, in order) or a raw
+    image/* body, plus any plain form fields. The bytes are handed to
+    decode_image as-is, skipping base64 and JSON string validation.
+    """
+    content_type = request.headers.get("content-type", "")
+    images: List[bytes] = []
+    fields: Dict[str, str] = {}
+
+    if content_type.startswith("multipart/form-data"):
+        form = await request.form()
+        for key, value in form.multi_items():
+            if isinstance(value, StarletteUploadFile):
+                images.append(await value.read())
+            else:
+                fields[key] = value
+    elif content_type.startswith(RAW_IMAGE_CONTENT_TYPES):
+        images.append(await request.body())
+    else:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail="Send images as multipart/form-data or a raw image/* body"
+        )
+
+    if not images or not all(images):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="No image data received")
+    if any(len(image) > settings.max_file_size for image in images):
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail="Image too large")
+    return images, fields
+
+
+def face_hint_field(fields: Dict[str, str]) -> Optional[FaceBoxHint]:
+    """Optional ``face_hint`` form field (a FaceBoxHint JSON object) of the upload variants."""
+    if not fields.get("face_hint"):
+        return None
+    try:
+        return FaceBoxHint.model_validate_json(fields["face_hint"])
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=f"Invalid face_hint: {e}")
+
+
+@router.post("/mark-attendance/upload", response_model=FaceRecognitionResponse)
+async def mark_attendance_with_face_upload(
+    request: Request,
+    subject_id: Optional[int] = None,
+    db: AsyncSession = Depends(get_db),
+    current_student: Student = Depends(get_current_student_for_verification)
+):
+    """Binary variant of /mark-attendance (subject_id as query parameter or form field)."""
+    images, fields = await read_image_uploads(request)
+    subject_id = subject_id if subject_id is not None else fields.get("subject_id")
+    if subject_id is None:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="subject_id is required")
+    recognition_data = FaceRecognitionRequest(image_data=images[0], subject_id=subject_id,
+                                              face_hint=face_hint_field(fields))
+    return await mark_attendance_with_face(recognition_data, db, current_student)
+
+
+@router.post("/verify-identity/upload")
+async def verify_identity_upload(
+    request: Request,
+    current_student: Student = Depends(get_current_student_for_verification),
+    db: AsyncSession = Depends(get_db)
+):
+    """Binary variant of /verify-identity."""
+    images, fields = await read_image_uploads(request)
+    return await verify_identity(
+        FaceRegistrationRequest(image_data=images[0], face_hint=face_hint_field(fields)), current_student, db
+    )
+
+
+@router.post("/register-face/upload")
+async def register_student_face_upload(
+    request: Request,
+    current_student: Student = Depends(get_current_student),
+    db: AsyncSession = Depends(get_db)
+):
+    """Binary variant of /register-face; several files register multi-angle."""
+    images, _ = await read_image_uploads(request)
+    image_data = images if len(images) > 1 else images[0]
+    return await register_student_face(FaceRegistrationRequest(image_data=image_data), current_student, db)
+
+
+@router.post("/register-face-multi/upload")
+async def register_student_face_multi_upload(
+    request: Request,
+    current_student: Student = Depends(get_current_student),
+    db: AsyncSession = Depends(get_db)
+):
+    """Binary variant of /register-face-multi."""
+    images, _ = await read_image_uploads(request)
+    return await register_student_face_multi(MultiImageFaceRegistrationRequest(images=images), current_student, db)
+
+
+@router.post("/detect-faces/upload")
+async def detect_faces_in_image_upload(request: Request):
+    """Binary variant of /detect-faces."""
+    images, _ = await read_image_uploads(request)
+    return await detect_faces_in_image(FaceRegistrationRequest(image_data=images[0]), request)
+
+
+@router.post("/live-recognition/upload", response_model=LiveRecognitionResponse)
+async def live_face_recognition_upload(
+    request: Request,
+    subject_id: Optional[int] = None,
+    schedule_id: Optional[int] = None,
+    db: AsyncSession = Depends(get_db)
+):
+    """Binary variant of /live-recognition (subject_id/schedule_id as query parameters or form fields)."""
+    images, fields = await read_image_uploads(request)
+    return await live_face_recognition(LiveRecognitionRequest(
+        image_data=images[0],
+        subject_id=subject_id if subject_id is not None else fields.get("subject_id"),
+        schedule_id=schedule_id if schedule_id is not None else fields.get("schedule_id"),
+        face_hint=face_hint_field(fields),
+    ), request, db)
+
+# ----------------------------------------------------------------------
+# WebSocket live preview stream
+# ----------------------------------------------------------------------
+LIVE_STREAM_AUTH_TIMEOUT = 10.0  # Seconds to wait for {"type": "auth"} when no ?token= is given
+LIVE_STREAM_MODES = ("recognize", "detect")
+
+
+class LatestFrameSlot:
+    """Single-slot mailbox: a new frame replaces any frame inference has not picked up yet."""
+
+    def __init__(self):
+        self._frame = None
+        self._event = asyncio.Event()
+        self.dropped = 0
+        self.closed = False
+
+    def put(self, seq: int, data: bytes):
+        if self._frame is not None:
+            self.dropped += 1
+            live_stream_stats.frames_dropped += 1
+        self._frame = (seq, data)
+        self._event.set()
+
+    async def take(self):
+        """Wait for the newest frame; returns None once the connection is closed."""
+        await self._event.wait()
+        self._event.clear()
+        frame, self._frame = self._frame, None
+        return None if self.closed else frame
+
+    def close(self):
+        self.closed = True
+        self._event.set()
+
+
+class LiveStreamStats:
+    """Process-wide counters for the live preview WebSocket."""
+
+    def __init__(self):
+        self.active_connections = 0
+        self.connections = 0
+        self.frames_received = 0
+        self.frames_processed = 0
+        self.frames_dropped = 0
+        self.total_processing_ms = 0.0
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "active_connections": self.active_connections,
+            "connections": self.connections,
+            "frames_received": self.frames_received,
+            "frames_processed": self.frames_processed,
+            "frames_dropped": self.frames_dropped,
+            "avg_processing_ms": round(self.total_processing_ms / self.frames_processed, 2)
+            if self.frames_processed else 0.0,
+        }
+
+
+live_stream_stats = LiveStreamStats()
+
+
+async def authenticate_live_stream(websocket: WebSocket, token: Optional[str]):
+    """Authenticate once per connection from ?token= or a first {"type": "auth"} message."""
+    if not token:
+        message = await asyncio.wait_for(websocket.receive_json(), timeout=LIVE_STREAM_AUTH_TIMEOUT)
+        if message.get("type") != "auth":
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Expected auth message")
+        token = message.get("token")
+    if not token:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Missing token")
+    async with AsyncSessionLocal() as db:
+        return await get_user_from_token(token, db)
+
+
+async def process_live_frame(image_bytes: bytes, mode: str, cohort: Cohort = None,
+                             session: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Decode one binary frame and build the detection (+ recognition) payload.
+    With a ``session`` a frame nearly identical to the last analysed one reuses its payload.
+    """
+    frame = frame_hash(image_bytes) if session else None
+    kind = f"stream:{mode}:{cohort}"
+    cached = frame_result_cache.lookup(session, kind, frame)
+    if cached is not None:
+        return {**cached, "cached": True}
+    
+    image = await run_inference(insightface_service.decode_image_bytes, image_bytes)
+    analysis = await run_inference(
+        insightface_service.analyze_image, image, embed=False, policy="live_recognition"
+    )
+    result: Dict[str, Any] = {
+        "faces": [
+            {"bbox": face['bbox'], "confidence": face['confidence']}
+            for face in analysis.faces
+        ],
+        "recognition": None,
+    }
+    if mode == "recognize":
+        async with AsyncSessionLocal() as db:
+            recognition = await recognize_live_frame(db, image, analysis=analysis, cohort=cohort,
+                                                     session=session, track_kind=f"stream:{cohort}")
+        result["recognition"] = recognition.model_dump()
+    frame_result_cache.store(session, kind, frame, result)
+    return result
+
+
+async def run_live_stream_inference(websocket: WebSocket, slot: LatestFrameSlot, state: Dict[str, Any]):
+    """Inference loop: always works on the newest frame, so load follows inference capacity."""
+    while True:
+        frame = await slot.take()
+        if frame is None:
+            return
+        seq, image_bytes = frame
+        start = time.perf_counter()
+        try:
+            payload = await process_live_frame(image_bytes, state["mode"], state["cohort"], state["session"])
+        except HTTPException as e:
+            if e.status_code == status.HTTP_503_SERVICE_UNAVAILABLE:
+                await websocket.send_json({"type": "busy", "frame": seq, "message": e.detail})
+                continue
+            await websocket.send_json({"type": "error", "frame": seq, "message": e.detail})
+            continue
+        except ValueError as e:
+            await websocket.send_json({"type": "error", "frame": seq, "message": str(e)})
+            continue
+        except Exception as e:
+            # Keep the stream alive; the next frame gets a fresh attempt
+            print(f"[ERROR] ❌ Live stream inference failed on frame {seq}: {str(e)}")
+            await websocket.send_json({"type": "error", "frame": seq, "message": "Frame processing failed"})
+            continue
+        processing_ms = (time.perf_counter() - start) * 1000
+        live_stream_stats.frames_processed += 1
+        live_stream_stats.total_processing_ms += processing_ms
+        await websocket.send_json({
+            "type": "result",
+            "frame": seq,
+            "mode": state["mode"],
+            "dropped": slot.dropped,
+            "processing_ms": round(processing_ms, 2),
+            **payload,
+        })
+
+
+@ws_router.websocket("/live")
+async def live_recognition_stream(websocket: WebSocket, token: Optional[str] = None, mode: str = "recognize",
+                                  subject_id: Optional[int] = None, schedule_id: Optional[int] = None):
+    """
+    Streaming counterpart of /detect-faces and /live-recognition.
+
+    Clients send encoded frames (JPEG/PNG) as binary messages and receive
+    ``{"type": "result", ...}`` JSON with face boxes and, in ``recognize`` mode,
+    the live-recognition result. Frames arriving while inference is busy replace
+    the pending one, so only the latest frame is ever processed. Text messages:
+    ``{"type": "mode", "mode": "detect"|"recognize"}`` and ``{"type": "ping"}``.
+    ``?subject_id=`` / ``?schedule_id=`` restrict recognition to that class's cohort.
+    """
+    await websocket.accept()
+    try:
+        user = await authenticate_live_stream(websocket, token)
+    except (HTTPException, asyncio.TimeoutError, ValueError) as e:
+        detail = getattr(e, "detail", None) or "Authentication failed"
+        await websocket.close(code=1008, reason=str(detail))
+        return
+
+    async with AsyncSessionLocal() as db:
+        cohort = await resolve_search_cohort(db, subject_id, schedule_id)
+    state = {
+        "mode": mode if mode in LIVE_STREAM_MODES else "recognize",
+        "cohort": cohort,
+        "session": f"ws:{id(websocket)}",  # Frame cache slot for this connection
+    }
+    slot = LatestFrameSlot()
+    live_stream_stats.connections += 1
+    live_stream_stats.active_connections += 1
+    print(f"[DEBUG] 🔌 Live stream connected - user {user.id}, mode {state['mode']}")
+    await websocket.send_json({"type": "ready", "user_id": user.id, "mode": state["mode"]})
+
+    worker = asyncio.create_task(run_live_stream_inference(websocket, slot, state))
+    seq = 0
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            if message.get("bytes") is not None:
+                data = message["bytes"]
+                seq += 1
+                live_stream_stats.frames_received += 1
+                if len(data) > settings.max_file_size:
+                    await websocket.send_json({"type": "error", "frame": seq, "message": "Frame too large"})
+                    continue
+                slot.put(seq, data)
+            elif message.get("text") is not None:
+                try:
+                    command = json.loads(message["text"])
+                except ValueError:
+                    continue
+                if command.get("type") == "ping":
+                    await websocket.send_json({"type": "pong"})
+                elif command.get("type") == "mode" and command.get("mode") in LIVE_STREAM_MODES:
+                    state["mode"] = command["mode"]
+    except Exception as e:
+        print(f"[ERROR] ❌ Live stream error: {str(e)}")
+    finally:
+        slot.close()
+        worker.cancel()
+        try:
+            await worker
+        except (asyncio.CancelledError, Exception):
+            pass
+        frame_result_cache.forget(state["session"])
+        face_tracker.forget(state["session"])
+        live_stream_stats.active_connections -= 1
+        print(f"[DEBUG] 🔌 Live stream closed - user {user.id}, {seq} frames, {slot.dropped} dropped")
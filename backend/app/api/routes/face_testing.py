@@ -8,7 +8,7 @@ without time restrictions or authentication requirements.
 
 from fastapi import APIRouter, HTTPException, status, Depends
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, text
+from sqlalchemy import select, or_
 from typing import List, Dict, Any, Optional
 from pydantic import BaseModel
 import logging
@@ -19,6 +19,10 @@ import asyncio
 from app.core.database import get_db
 from app.models import Student
 from app.services.insightface_service import insightface_service
+from app.services.face_gallery import face_gallery
+from app.services.student_embedding_cache import student_embedding_cache
+from app.services.enrollment_images import delete_all_enrollment_images
+from app.services.face_embedding_store import face_embedding_store, student_embedding
 
 logger = logging.getLogger(__name__)
 
@@ -240,7 +244,7 @@ async def test_face_verification(
             result = await db.execute(
                 select(Student).where(
                     Student.id == request.test_student_id,
-                    Student.face_encoding.isnot(None)
+                    or_(Student.face_embedding.isnot(None), Student.face_encoding.isnot(None))
                 )
             )
             test_students = result.scalars().all()
@@ -248,7 +252,7 @@ async def test_face_verification(
         else:
             # Test against all registered students
             result = await db.execute(
-                select(Student).where(Student.face_encoding.isnot(None))
+                select(Student).where(or_(Student.face_embedding.isnot(None), Student.face_encoding.isnot(None)))
             )
             test_students = result.scalars().all()
             test_mode = "all registered students"
@@ -266,11 +270,11 @@ async def test_face_verification(
             )
         
         # Prepare known encodings
-        known_encodings = [
-            (student.id, student.face_encoding) 
-            for student in test_students 
-            if student.face_encoding
-        ]
+        known_encodings = []
+        for student in test_students:
+            embedding = student_embedding(student)
+            if embedding is not None:
+                known_encodings.append((student.id, embedding.tolist()))
         
         # Process verification
         recognition_result = insightface_service.process_attendance_image(
@@ -485,19 +489,20 @@ async def get_registered_students_info(db: AsyncSession = Depends(get_db)):
     try:
         # Get students with face encodings
         result = await db.execute(
-            select(Student).where(Student.face_encoding.isnot(None))
+            select(Student).where(or_(Student.face_embedding.isnot(None), Student.face_encoding.isnot(None)))
         )
         students = result.scalars().all()
         
         students_info = []
         for student in students:
+            embedding = student_embedding(student)
             students_info.append({
                 "id": student.id,
                 "registration_number": student.registration_number,
                 "name": f"{student.first_name} {student.last_name}",
                 "email": student.email,
-                "has_face_encoding": student.face_encoding is not None,
-                "encoding_length": len(student.face_encoding) if student.face_encoding else 0
+                "has_face_encoding": embedding is not None,
+                "encoding_length": len(embedding) if embedding is not None else 0
             })
         
         return {
@@ -521,10 +526,11 @@ async def clear_test_data(db: AsyncSession = Depends(get_db)):
         logger.warning("🚨 CLEARING ALL FACE ENCODINGS - TESTING ONLY!")
         
         # Update all students to remove face encodings
-        await db.execute(
-            text("UPDATE students SET face_encoding = NULL WHERE face_encoding IS NOT NULL")
-        )
+        await face_embedding_store.clear_all(db)
         await db.commit()
+        face_gallery.clear()
+        student_embedding_cache.clear()
+        await asyncio.to_thread(delete_all_enrollment_images)
         
         return {
             "success": True,
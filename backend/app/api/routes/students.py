@@ -1,3 +1,4 @@
+import asyncio
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, and_, text
@@ -9,6 +10,10 @@ from app.models import Student, User, Faculty
 from app.schemas import Student as StudentSchema, StudentCreate, StudentUpdate
 from app.api.dependencies import get_current_admin, get_current_user
 from app.utils import generate_student_id
+from app.services.face_gallery import face_gallery, cohort_key
+from app.services.student_embedding_cache import student_embedding_cache
+from app.services.enrollment_images import delete_enrollment_images
+from app.services.face_embedding_store import student_embedding_list
 
 router = APIRouter(prefix="/students", tags=["students"])
 
@@ -82,7 +87,7 @@ async def get_all_students(
                 "phone_number": student.phone_number or "",
                 "emergency_contact": student.emergency_contact or "",
                 "profile_image_url": getattr(student, "profile_image_url", ""),
-                "face_encoding": getattr(student, "face_encoding", []),
+                "face_encoding": student_embedding_list(student),
                 "user": user_data
             }
             student_list.append(student_data)
@@ -128,7 +133,7 @@ async def get_student(
         "year": student.year,
         "phone_number": student.phone_number,
         "emergency_contact": student.emergency_contact,
-        "face_encoding": getattr(student, "face_encoding", []),
+        "face_encoding": student_embedding_list(student),
         "user": {
             "id": student.user.id,
             "email": student.user.email,
@@ -351,6 +356,9 @@ async def update_student(
         await db.commit()
         await db.refresh(student)
         print(f"[Backend] Student update committed successfully")
+        # Move the student to their new cohort shard instead of waiting for the next gallery refresh
+        face_gallery.relabel(student.id, student.user.full_name if student.user else "",
+                             cohort=cohort_key(student.faculty_id, student.semester))
     except Exception as e:
         print(f"[Backend] Error committing update: {str(e)}")
         await db.rollback()
@@ -405,6 +413,9 @@ async def delete_student(
         
         print(f"[Backend] Student {student_id} deleted, committing transaction")
         await db.commit()
+        face_gallery.remove(student_id)
+        student_embedding_cache.invalidate(student_id)
+        await asyncio.to_thread(delete_enrollment_images, student_id)
         
         return {"message": f"Student with ID {student_id} deleted successfully"}
     
@@ -18,10 +18,49 @@ class Settings(BaseSettings):
     # Face Recognition (using InsightFace)
     face_recognition_tolerance: float = 0.6  # Cosine similarity threshold
     insightface_det_size: int = 640  # Detection size for InsightFace
+    face_models_share_after_fork: bool = False  # Keep preloaded ONNX sessions in forked workers (gunicorn --preload)
+    face_ort_intra_op_threads: int = 0  # Threads per ONNX op (0 = ORT default, one per core)
+    face_ort_inter_op_threads: int = 0  # Threads across independent ops in "parallel" mode (0 = ORT default)
+    face_ort_execution_mode: str = "sequential"  # "sequential" or "parallel"
+    face_ort_graph_optimization: str = "all"  # "disabled", "basic", "extended" or "all"
+    face_ort_optimized_model_dir: str = ""  # Cache optimized models here to skip graph optimization on boot ("" = off)
+    face_warmup_runs: int = 2  # Dummy inference passes at startup before /health reports ready (0 = skip)
+    face_liveness_enabled: bool = True  # Anti-spoofing stage on endpoints enabled in LIVENESS_POLICIES
+    face_liveness_model_path: str = "models/anti_spoof_2.7.onnx"  # Exported by scripts/export_anti_spoof_onnx.py
+    face_liveness_threshold: float = 0.5  # Minimum "real" probability from the anti-spoof model
+    face_liveness_require_model: bool = False  # Reject faces while the ONNX file is missing (default: skip the model stage and warn)
+    face_liveness_fail_open: bool = False  # Skip the model stage when the ONNX file exists but fails to load (otherwise reject)
+    face_quality_gate_enabled: bool = True  # Reject blurry/dark/badly framed faces before embedding (QUALITY_GATE_POLICIES)
+    face_frame_cache_enabled: bool = True  # Reuse preview results for near-identical consecutive frames
+    face_frame_cache_ttl_seconds: float = 1.0  # Max age of a reused preview result
+    face_frame_cache_max_distance: int = 16  # Max frame-hash Hamming distance (of 2048 bits) to count as the same frame
+    face_frame_cache_max_sessions: int = 1000  # Preview sessions remembered (LRU)
+    face_metrics_enabled: bool = True  # Per-stage timing histograms and Server-Timing on face responses
+    face_metrics_window: int = 2048  # Recent samples per stage used for the p50/p95/p99 report
+    face_tracking_enabled: bool = True  # Keep a tracked face's identity across frames instead of re-embedding
+    face_tracking_iou_threshold: float = 0.6  # Min box IoU with the previous frame to count as the same face
+    face_tracking_min_similarity: float = 0.70  # Only identities matched at least this well are tracked
+    face_tracking_reembed_frames: int = 10  # Re-embed a tracked face at least every N frames
+    face_tracking_ttl_seconds: float = 3.0  # Drop a track not seen for this long
     development_mode: bool = False  # Enable real face detection for production
+    face_gallery_refresh_seconds: int = 300  # Reload in-memory embedding gallery (0 = never)
+    face_inference_workers: int = 2  # Threads running ONNX inference off the event loop
+    face_inference_max_queue: int = 32  # Reject new face jobs beyond this backlog (0 = unbounded)
+    face_batching_enabled: bool = True  # Micro-batch recognition across concurrent requests
+    face_batch_max_size: int = 16  # Max aligned crops per batched recognition call
+    face_batch_max_wait_ms: float = 5.0  # Max time a crop waits for batch-mates
+    face_encoding_json_fallback: bool = True  # Also write the legacy JSON face_encoding column
+    face_max_templates: int = 5  # Enrollment embeddings kept per student (max-over-templates matching)
+    face_gallery_shortlist: int = 64  # Identities re-scored over all templates after the centroid pass
+    face_gallery_storage: str = "float32"  # "float32", "float16" or "int8" (quantized scan + float32 re-rank); float16 not recommended: its scan is ~10x slower than int8
+    face_gallery_rerank: int = 8  # Candidates re-scored in float32 when the gallery is quantized
+    face_search_backend: str = "gallery"  # "gallery" (in-memory numpy) or "pgvector" (database ANN index)
+    face_verification_cache_enabled: bool = True  # Keep each student's normalized templates for 1:1 verification
+    face_verification_cache_size: int = 10000  # Students kept in the verification cache (LRU)
     
     # File Storage
     upload_dir: str = "uploads"
+    face_keep_enrollment_images: bool = True  # Save registration photos under upload_dir/faces for re-embedding
     max_file_size: int = 10485760  # 10MB
     
     # Email
@@ -14,6 +14,27 @@ Definitions:
     MIN_FACE_AREA_PERCENT / MAX_FACE_AREA_PERCENT: Frame coverage bounds (percent of total image area).
     MAX_CENTER_OFFSET: Allowed normalized offset of face center from image center.
     MAX_DECODE_DIMENSION: Cap on largest side during decode to avoid excessive CPU cost.
+    DETECTION_LADDERS: Per-endpoint detector input sizes, tried smallest first.
+    LADDER_MIN_FACE_PX: Escalate to the next rung when the best face is smaller than
+        this (short side, in detector-input pixels) or nothing was found.
+    LIVENESS_POLICIES: Per-endpoint switch for the anti-spoofing stage (off for previews).
+    LIVENESS_MIN_FACE_PX: Faces smaller than this (short side, source pixels) are
+        rejected before the liveness model runs; too little texture to judge.
+    LIVENESS_MAX_GLARE_FRACTION: Reject when this share of face pixels is clipped
+        white (screen or glossy print glare) without running the model.
+    LIVENESS_REAL_THRESHOLD: Minimum "real" class probability from the anti-spoof model.
+    QUALITY_GATE_POLICIES: Per-endpoint checks of the pre-embedding quality gate.
+    QUALITY_MIN_SHARPNESS: Minimum Laplacian variance of the downscaled face crop (blur).
+    QUALITY_MIN_BRIGHTNESS / QUALITY_MAX_BRIGHTNESS: Accepted mean gray level of the
+        face crop (under/over-exposure).
+    ROI_HINT_PADDING: Margin added on every side of a client face box hint, as a
+        fraction of its longer side, before detecting inside it.
+    ROI_HINT_DET_SIZE / ROI_HINT_FAST_DET_SIZE: Detector input size for the hint crop;
+        the smaller one is used when the client reports ROI_HINT_FAST_MIN_CONFIDENCE.
+    ROI_HINT_MIN_IOU: Minimum overlap between the hint and the detected face; below
+        it the hint is treated as wrong and the full frame is searched.
+    ROI_HINT_POLICIES: Endpoints allowed to detect inside the hint. Policies that
+        reject frames with more than one face need the full frame and ignore it.
 
 Note: SIMILARITY_THRESHOLD aligns with settings.face_recognition_tolerance (0.6) at
 initialization; adjust here then remove per-file changes.
@@ -43,6 +64,51 @@ MAX_CENTER_OFFSET: float = 0.30
 # Decode / performance safeguards
 MAX_DECODE_DIMENSION: int = 1280  # Downscale larger images to reduce inference time
 
+# Adaptive detection: a selfie with one large face is found at 256/320 just as well
+# as at 640. Policies not listed here use settings.insightface_det_size only.
+DETECTION_LADDERS: dict = {
+    "mark_attendance": (320, 640),
+    "verify_identity": (320, 640),
+    "live_recognition": (256, 640),
+    "detect_faces": (320, 640),
+    "registration": (640,),  # Enrollment always runs at full resolution
+}
+LADDER_MIN_FACE_PX: int = 40
+
+# Liveness (anti-spoofing) cascade, run between detection and embedding
+LIVENESS_POLICIES: dict = {
+    "mark_attendance": True,
+    "verify_identity": True,
+    "registration": True,
+    "live_recognition": False,  # Preview only; the attendance call itself is checked
+    "detect_faces": False,
+}
+LIVENESS_MIN_FACE_PX: int = 64
+LIVENESS_MAX_GLARE_FRACTION: float = 0.30
+LIVENESS_REAL_THRESHOLD: float = 0.50
+
+# Pre-embedding quality gate: runs on the detector box and a small face crop, before
+# alignment, liveness and ArcFace. Framing is only enforced where it was already
+# required (registration); previews are not gated.
+QUALITY_GATE_POLICIES: dict = {
+    "registration": ("size", "area", "center", "blur", "exposure"),
+    "mark_attendance": ("blur", "exposure"),
+    "verify_identity": ("blur", "exposure"),
+}
+QUALITY_MIN_SHARPNESS: float = 15.0
+QUALITY_MIN_BRIGHTNESS: float = 40.0
+QUALITY_MAX_BRIGHTNESS: float = 220.0
+
+# Client face box hints (browser MediaPipe): detect in a padded crop around the hint
+# instead of the full frame. Input sizes only shrink with a dynamic-input detector.
+ROI_HINT_PADDING: float = 0.4
+ROI_HINT_DET_SIZE: int = 256
+ROI_HINT_FAST_DET_SIZE: int = 160
+ROI_HINT_FAST_MIN_CONFIDENCE: float = 0.9
+ROI_HINT_MIN_IOU: float = 0.3
+# live_recognition rejects multi-face frames, which a crop around one face would hide
+ROI_HINT_POLICIES: tuple = ("mark_attendance", "verify_identity")
+
 __all__ = [
     "DETECTION_MIN_CONFIDENCE",
     "REGISTRATION_MIN_CONFIDENCE",
@@ -56,4 +122,20 @@ __all__ = [
     "MAX_FACE_AREA_PERCENT",
     "MAX_CENTER_OFFSET",
     "MAX_DECODE_DIMENSION",
+    "DETECTION_LADDERS",
+    "LADDER_MIN_FACE_PX",
+    "LIVENESS_POLICIES",
+    "LIVENESS_MIN_FACE_PX",
+    "LIVENESS_MAX_GLARE_FRACTION",
+    "LIVENESS_REAL_THRESHOLD",
+    "QUALITY_GATE_POLICIES",
+    "QUALITY_MIN_SHARPNESS",
+    "QUALITY_MIN_BRIGHTNESS",
+    "QUALITY_MAX_BRIGHTNESS",
+    "ROI_HINT_PADDING",
+    "ROI_HINT_DET_SIZE",
+    "ROI_HINT_FAST_DET_SIZE",
+    "ROI_HINT_FAST_MIN_CONFIDENCE",
+    "ROI_HINT_MIN_IOU",
+    "ROI_HINT_POLICIES",
 ]
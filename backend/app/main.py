@@ -1,4 +1,5 @@
 from fastapi import FastAPI, HTTPException
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
 from app.core.config import settings
@@ -23,8 +24,11 @@ from app.api.routes.auto_absent_trigger import router as auto_absent_trigger_rou
 from app.api.routes.system_settings import router as system_settings_router
 from app.api.routes.notifications import router as notifications_router
 from app.api.calendar import router as calendar_router
-from app.middleware import ResponseTimeMiddleware
+from app.middleware import ResponseTimeMiddleware, FaceTimingMiddleware
 from app.services.scheduler_service import scheduler_service
+from app.services.face_inference_executor import face_inference_executor
+from app.services.insightface_service import insightface_service
+import asyncio
 import logging
 import warnings
 from contextlib import asynccontextmanager
@@ -36,6 +40,18 @@ warnings.filterwarnings("ignore", category=UserWarning, module="face_recognition
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+async def warm_up_face_models():
+    """Run warm-up inferences on the inference pool; /health turns ready when done."""
+    if insightface_service is None:
+        return
+    try:
+        await face_inference_executor.run(insightface_service.warm_up, settings.face_warmup_runs)
+    except Exception as e:
+        # Serve anyway; the first real requests will pay the warm-up cost
+        logger.warning(f"Face model warm-up failed: {e}")
+        insightface_service.warmed_up = True
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan context replacing deprecated on_event handlers.
@@ -67,13 +83,23 @@ async def lifespan(app: FastAPI):
     logger.info("Starting background scheduler...")
     await scheduler_service.start()
 
+    # Warm the ONNX sessions in the background so /health can report progress
+    logger.info("Warming up face models...")
+    warmup_task = asyncio.create_task(warm_up_face_models())
+
     # Hand control to application runtime
     yield
 
+    if not warmup_task.done():
+        warmup_task.cancel()
+
     # Shutdown
     logger.info("Stopping background scheduler...")
     await scheduler_service.stop()
 
+    logger.info("Stopping face inference executor...")
+    face_inference_executor.shutdown(wait=False)
+
 # Create FastAPI app with lifespan handler
 app = FastAPI(
     title=settings.project_name,
@@ -104,6 +130,9 @@ app.add_middleware(
 # Add response time tracking middleware
 app.add_middleware(ResponseTimeMiddleware)
 
+# Per-stage timings (Server-Timing header) on face recognition responses
+app.add_middleware(FaceTimingMiddleware)
+
 # Add debug middleware to see all requests
 @app.middleware("http")
 async def debug_requests(request, call_next):
@@ -124,6 +153,7 @@ app.add_middleware(
 # Include routers
 app.include_router(auth.router, prefix="/api")
 app.include_router(face_recognition.router, prefix="/api")
+app.include_router(face_recognition.ws_router)  # /ws/face-recognition/live
 app.include_router(face_testing_router, prefix="/api")
 app.include_router(students.router, prefix="/api")
 app.include_router(classes.router, prefix="/api")
@@ -163,11 +193,23 @@ async def root():
 
 @app.get("/health")
 async def health_check():
-    """Health check endpoint."""
-    return {
-        "status": "healthy",
-        "version": settings.version
-    }
+    """Health check endpoint; 503 until the face models are warm."""
+    if insightface_service is None:
+        face_models = "unavailable"
+    elif insightface_service.warmed_up:
+        face_models = "warm"
+    else:
+        face_models = "warming_up"
+    ready = face_models != "warming_up"
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={
+            "status": "ready" if ready else "starting",
+            "version": settings.version,
+            "face_models": face_models,
+            "warmup_ms": insightface_service.warmup_ms if insightface_service is not None else None,
+        },
+    )
 
 @app.get("/api/__routes")
 async def list_routes():
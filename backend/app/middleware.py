@@ -4,6 +4,7 @@ from fastapi import Request, Response
 from starlette.middleware.base import BaseHTTPMiddleware
 from collections import deque
 from datetime import datetime, timedelta
+from app.services.face_metrics import face_metrics, server_timing_header
 
 
 class ResponseTimeMiddleware(BaseHTTPMiddleware):
@@ -97,5 +98,29 @@ class ResponseTimeMiddleware(BaseHTTPMiddleware):
         }
 
 
+class FaceTimingMiddleware(BaseHTTPMiddleware):
+    """Collect per-stage timings of face requests and return them as a Server-Timing header"""
+    
+    def __init__(self, app, path_prefix: str = "/api/face-recognition"):
+        super().__init__(app)
+        self.path_prefix = path_prefix
+    
+    async def dispatch(self, request: Request, call_next):
+        if not request.url.path.startswith(self.path_prefix) or not face_metrics.enabled:
+            return await call_next(request)
+        
+        start_time = time.perf_counter()
+        token = face_metrics.begin_request()
+        try:
+            response = await call_next(request)
+        finally:
+            route = request.scope.get("route")
+            endpoint = f"{request.method} {getattr(route, 'path', request.url.path)}"
+            timings = face_metrics.end_request(token, endpoint, (time.perf_counter() - start_time) * 1000)
+        
+        response.headers["Server-Timing"] = server_timing_header(timings)
+        return response
+
+
 # Global instance to be used across the app
 response_time_tracker = ResponseTimeMiddleware(None) 
\ No newline at end of file
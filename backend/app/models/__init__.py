@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, Float, ForeignKey, JSON, Enum, ARRAY, Numeric, Index
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, Float, ForeignKey, JSON, Enum, ARRAY, Numeric, Index, LargeBinary
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.core.database import Base
@@ -83,7 +83,13 @@ class Student(Base):
     semester = Column(Integer, nullable=False, default=1)  # Current semester (1-8)
     year = Column(Integer, nullable=False, default=1)  # Current academic year (1-4)
     batch = Column(Integer, nullable=False)  # Year when student joined (e.g., 2025)
-    face_encoding = Column(JSON)  # JSON embedding storage
+    face_encoding = Column(JSON)  # Legacy JSON embedding storage (read fallback)
+    face_embedding = Column(LargeBinary)  # Packed float32 embedding (see face_embedding_store)
+    face_templates = Column(LargeBinary)  # Packed float32 (n, 512) per-image enrollment templates
+    face_embedding_version = Column(String)  # Model version that produced the embedding (see embedding_model_version)
+    face_embedding_staged = Column(LargeBinary)  # Re-embedded vector awaiting the version switch
+    face_templates_staged = Column(LargeBinary)  # Re-embedded templates awaiting the version switch
+    face_embedding_staged_version = Column(String)  # Model version of the staged columns
     profile_image_url = Column(String)
     phone_number = Column(String)
     emergency_contact = Column(String)
@@ -243,15 +243,28 @@ class Mark(MarkBase):
         from_attributes = True
 
 # Face Recognition schemas
+# Base64 string from JSON bodies, or raw encoded bytes from multipart / image/* uploads
+ImageData = Union[str, bytes]
+
+class FaceBoxHint(BaseModel):
+    """Face box found by the client (e.g. browser MediaPipe), relative to the image size."""
+    x: float = Field(..., ge=0, le=1)  # Left edge
+    y: float = Field(..., ge=0, le=1)  # Top edge
+    width: float = Field(..., gt=0, le=1)
+    height: float = Field(..., gt=0, le=1)
+    confidence: Optional[float] = Field(None, ge=0, le=1)  # Client detector score
+
 class FaceRecognitionRequest(BaseModel):
-    image_data: str  # Base64 encoded image
+    image_data: ImageData  # Base64 encoded image (or raw bytes from /upload variants)
     subject_id: int
+    face_hint: Optional[FaceBoxHint] = None  # Detect only around this box (full frame if it is wrong)
 
 class FaceRegistrationRequest(BaseModel):
-    image_data: Union[str, List[str]]  # Single Base64 string or list of Base64 encoded images
+    image_data: Union[ImageData, List[ImageData]]  # Single Base64 string or list of Base64 encoded images
+    face_hint: Optional[FaceBoxHint] = None  # /verify-identity only; registration always searches the full frame
     
 class MultiImageFaceRegistrationRequest(BaseModel):
-    images: List[str]  # List of Base64 encoded images
+    images: List[ImageData]  # List of Base64 encoded images
 
 class FaceRecognitionResponse(BaseModel):
     success: bool
@@ -0,0 +1,109 @@
+"""
+Source photos of each student's face registration, kept for re-embedding.
+
+Registration stores the submitted images as ``<upload_dir>/faces/<student id>/<n>.<ext>``
+(the encoded bytes as received, no re-compression). A new registration replaces
+the whole set. ``scripts/reembed_faces.py`` reads them back to rebuild every
+embedding after a model pack or detector size change, so students do not have
+to register again. The photos are biometric data: they are deleted together with
+the student, and when all face data is cleared.
+"""
+
+import logging
+import os
+import shutil
+import uuid
+from typing import List, Sequence, Union
+
+from app.core.config import settings
+from app.services.frame_cache import encoded_image_bytes
+
+logger = logging.getLogger(__name__)
+
+ENROLLMENT_SUBDIR = "faces"
+IMAGE_SIGNATURES = ((b'\xff\xd8', "jpg"), (b'\x89PNG', "png"), (b'RIFF', "webp"))
+
+
+def enrollment_root() -> str:
+    return os.path.join(settings.upload_dir, ENROLLMENT_SUBDIR)
+
+
+def enrollment_dir(student_id: int) -> str:
+    return os.path.join(enrollment_root(), str(student_id))
+
+
+def _extension(image_bytes: bytes) -> str:
+    for signature, extension in IMAGE_SIGNATURES:
+        if image_bytes.startswith(signature):
+            return extension
+    return "img"
+
+
+def save_enrollment_images(student_id: int, images: Sequence[Union[str, bytes]]) -> int:
+    """Replace a student's stored registration photos; returns how many were written."""
+    if not getattr(settings, 'face_keep_enrollment_images', True):
+        return 0
+    target = enrollment_dir(student_id)
+    staging = f"{target}.{uuid.uuid4().hex}.tmp"
+    os.makedirs(staging)
+    try:
+        for index, image in enumerate(images):
+            image_bytes = encoded_image_bytes(image)
+            with open(os.path.join(staging, f"{index}.{_extension(image_bytes)}"), "wb") as f:
+                f.write(image_bytes)
+        # Swap the whole set so a reader never sees a mix of old and new photos
+        previous = f"{target}.{uuid.uuid4().hex}.old"
+        if os.path.isdir(target):
+            os.rename(target, previous)
+        os.rename(staging, target)
+        shutil.rmtree(previous, ignore_errors=True)
+    except Exception:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+    return len(images)
+
+
+def load_enrollment_images(student_id: int) -> List[bytes]:
+    """Stored registration photos in submission order (empty if none were kept)."""
+    directory = enrollment_dir(student_id)
+    if not os.path.isdir(directory):
+        return []
+    names = sorted(os.listdir(directory), key=lambda name: int(name.split(".")[0]) if name.split(".")[0].isdigit() else -1)
+    images = []
+    for name in names:
+        with open(os.path.join(directory, name), "rb") as f:
+            images.append(f.read())
+    return images
+
+
+def delete_enrollment_images(student_id: int) -> bool:
+    """Remove a student's stored registration photos; returns whether any existed."""
+    directory = enrollment_dir(student_id)
+    if not os.path.isdir(directory):
+        return False
+    shutil.rmtree(directory)
+    logger.info(f"🗑️ Deleted stored registration photos of student {student_id}")
+    return True
+
+
+def delete_all_enrollment_images() -> int:
+    """Remove every stored registration photo (including interrupted swaps); returns students affected."""
+    root = enrollment_root()
+    if not os.path.isdir(root):
+        return 0
+    count = len(enrolled_student_ids())
+    for name in os.listdir(root):
+        path = os.path.join(root, name)
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+    logger.info(f"🗑️ Deleted stored registration photos of {count} student(s)")
+    return count
+
+
+def enrolled_student_ids() -> List[int]:
+    """Students that have stored registration photos."""
+    root = enrollment_root()
+    if not os.path.isdir(root):
+        return []
+    return sorted(int(name) for name in os.listdir(root)
+                  if name.isdigit() and os.path.isdir(os.path.join(root, name)))
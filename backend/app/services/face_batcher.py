@@ -0,0 +1,162 @@
+"""
+Dynamic micro-batching in front of the ArcFace recognition model.
+
+At class start hundreds of students call /face-recognition/mark-attendance
+within a few minutes and each request used to run recognition on a batch of
+one. The batcher collects aligned face crops from concurrent requests for up to
+``max_wait_ms`` or ``max_batch_size`` items, runs a single batched ONNX call on
+the inference executor, and fans the embeddings back to the awaiting requests.
+
+All queue bookkeeping happens on the event loop thread, so no locking is needed.
+"""
+
+import asyncio
+import logging
+import time
+from collections import Counter, deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+from app.services.face_inference_executor import face_inference_executor, FaceInferenceExecutor
+from app.services.face_metrics import face_metrics
+from app.services.insightface_service import insightface_service
+
+logger = logging.getLogger(__name__)
+
+# (aligned crop, future awaiting its embedding, enqueue timestamp)
+PendingItem = Tuple[np.ndarray, asyncio.Future, float]
+
+
+class RecognitionBatcher:
+    """Collects aligned crops and embeds them in batches."""
+
+    def __init__(
+        self,
+        embed_batch: Callable[[List[np.ndarray]], np.ndarray],
+        executor: FaceInferenceExecutor,
+        max_batch_size: int = 16,
+        max_wait_ms: float = 5.0,
+        enabled: bool = True,
+    ):
+        self.embed_batch = embed_batch
+        self.executor = executor
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait_ms = max(0.0, max_wait_ms)
+        self.enabled = enabled
+        self._pending: Deque[PendingItem] = deque()
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: set = set()  # Strong refs so in-flight batch tasks are not GC'd
+
+        # Metrics
+        self._batches = 0
+        self._items = 0
+        self._failed_batches = 0
+        self._batch_sizes: Counter = Counter()
+        self._total_wait_ms = 0.0
+        self._max_wait_seen_ms = 0.0
+        self._total_batch_ms = 0.0
+
+    async def embed(self, crop: np.ndarray) -> np.ndarray:
+        """Queue one aligned crop and wait for its embedding."""
+        if not self.enabled or self.max_batch_size == 1:
+            embeddings = await self._run_batch_now([crop])
+            return embeddings[0]
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((crop, future, time.perf_counter()))
+
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait_ms / 1000.0, self._flush)
+
+        # Queue wait plus the shared batch, as seen by this request
+        with face_metrics.timed("embedding_batch"):
+            return await future
+
+    def _flush(self) -> None:
+        """Dispatch everything pending in chunks of at most max_batch_size."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        while self._pending:
+            size = min(self.max_batch_size, len(self._pending))
+            self._dispatch([self._pending.popleft() for _ in range(size)])
+
+    def _dispatch(self, items: List[PendingItem]) -> None:
+        # Drop requests whose callers already went away (client disconnects)
+        live = [item for item in items if not item[1].done()]
+        if live:
+            task = asyncio.create_task(self._run_batch(live))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run_batch_now(self, crops: Sequence[np.ndarray]) -> np.ndarray:
+        start = time.perf_counter()
+        embeddings = await self.executor.run(self.embed_batch, list(crops))
+        self._record(len(crops), [0.0], (time.perf_counter() - start) * 1000)
+        return embeddings
+
+    async def _run_batch(self, items: List[PendingItem]) -> None:
+        face_metrics.detach()  # The batch serves several requests; none of them owns its stages
+        dispatched_at = time.perf_counter()
+        crops = [crop for crop, _, _ in items]
+        waits = [(dispatched_at - enqueued_at) * 1000 for _, _, enqueued_at in items]
+        try:
+            embeddings = await self.executor.run(self.embed_batch, crops)
+        except Exception as e:
+            self._failed_batches += 1
+            logger.error(f"Recognition batch of {len(items)} failed: {str(e)}")
+            for _, future, _ in items:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        self._record(len(items), waits, (time.perf_counter() - dispatched_at) * 1000)
+        for (_, future, _), embedding in zip(items, embeddings):
+            if not future.done():
+                future.set_result(embedding)
+
+    def _record(self, size: int, waits: List[float], batch_ms: float) -> None:
+        self._batches += 1
+        self._items += size
+        self._batch_sizes[size] += 1
+        self._total_wait_ms += sum(waits)
+        self._max_wait_seen_ms = max(self._max_wait_seen_ms, max(waits))
+        self._total_batch_ms += batch_ms
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait_ms,
+            "pending": len(self._pending),
+            "batches": self._batches,
+            "items": self._items,
+            "failed_batches": self._failed_batches,
+            "avg_batch_size": round(self._items / self._batches, 2) if self._batches else 0.0,
+            "batch_size_histogram": {str(k): v for k, v in sorted(self._batch_sizes.items())},
+            "avg_queue_wait_ms": round(self._total_wait_ms / self._items, 2) if self._items else 0.0,
+            "max_queue_wait_ms": round(self._max_wait_seen_ms, 2),
+            "avg_batch_ms": round(self._total_batch_ms / self._batches, 2) if self._batches else 0.0,
+        }
+
+
+def _embed_batch(crops: List[np.ndarray]) -> np.ndarray:
+    if insightface_service is None:
+        raise RuntimeError("InsightFace service not available")
+    return insightface_service.embed_aligned_batch(crops)
+
+
+# Singleton instance
+recognition_batcher = RecognitionBatcher(
+    _embed_batch,
+    face_inference_executor,
+    max_batch_size=settings.face_batch_max_size,
+    max_wait_ms=settings.face_batch_max_wait_ms,
+    enabled=settings.face_batching_enabled,
+)
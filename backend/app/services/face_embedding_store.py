@@ -0,0 +1,281 @@
+"""
+Storage codec and database search path for student face embeddings.
+
+``Student.face_encoding`` used to be the only copy of an embedding: a JSON array
+of 512 floats (~10 KB of text) re-parsed on every read. Embeddings are now kept
+as packed little-endian float32 bytes in ``Student.face_embedding`` (2 KB).
+Multi-image enrollment additionally keeps each per-image embedding in
+``Student.face_templates`` as a packed (n, 512) float32 matrix.
+
+When the pgvector extension is installed, every template is also mirrored into
+the unmapped ``student_face_templates`` table (one ``vector(512)`` row per
+template, HNSW index) so the database can answer nearest-neighbour queries
+itself. The search takes the best template per student, like the in-memory
+gallery's max-over-templates match, so both backends rank students the same way.
+
+Every row records the model version that produced it (``face_embedding_version``).
+Embeddings from different model packs or detector sizes are not comparable, so
+``scripts/reembed_faces.py`` rebuilds them into the ``*_staged`` columns and swaps
+them in for all students at once.
+
+The JSON column remains a read fallback for rows written before the migration
+and is still written while ``face_encoding_json_fallback`` is enabled, so older
+deployments can roll back.
+"""
+
+import logging
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models import Student
+from app.services.face_model_registry import DEFAULT_MODEL_PACK
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_DIM = 512
+EMBEDDING_DTYPE = np.dtype('<f4')  # Packed little-endian float32
+
+TEMPLATE_TABLE = "student_face_templates"
+
+# Nearest templates by cosine distance (<=>, served by the HNSW/IVFFlat index), then
+# the best one per student. A student's best template ranks no lower than
+# (rank - 1) * K + 1 among all templates, so the nearest ``limit * K`` templates
+# always contain the top ``limit`` students.
+_NEAREST_TEMPLATES_SQL = """
+    WITH nearest AS (
+        SELECT t.student_id, 1 - (t.embedding <=> CAST(:probe AS vector)) AS similarity
+        FROM {table} t
+        {cohort_filter}
+        ORDER BY t.embedding <=> CAST(:probe AS vector)
+        LIMIT :candidates
+    )
+    SELECT n.student_id AS id, u.full_name, max(n.similarity) AS similarity
+    FROM nearest n
+    JOIN students s ON s.id = n.student_id
+    JOIN users u ON u.id = s.user_id
+    GROUP BY n.student_id, u.full_name
+    ORDER BY similarity DESC
+    LIMIT :limit
+"""
+
+NEAREST_VECTOR_SQL = text(_NEAREST_TEMPLATES_SQL.format(table=TEMPLATE_TABLE, cohort_filter=""))
+
+# Same search restricted to one (faculty_id, semester) cohort plus unassigned students
+NEAREST_VECTOR_COHORT_SQL = text(_NEAREST_TEMPLATES_SQL.format(table=TEMPLATE_TABLE, cohort_filter="""
+        JOIN students s ON s.id = t.student_id
+        WHERE (s.faculty_id = :faculty_id AND s.semester = :semester)
+           OR s.faculty_id IS NULL OR s.semester IS NULL  -- Unassigned rows stay searchable, as in cohort_key"""))
+
+HAS_VECTOR_TABLE_SQL = text("""
+    SELECT 1 FROM information_schema.tables WHERE table_name = :table
+""")
+
+DELETE_TEMPLATE_VECTORS_SQL = text(f"DELETE FROM {TEMPLATE_TABLE} WHERE student_id = ANY(:ids)")
+
+INSERT_TEMPLATE_VECTOR_SQL = text(f"""
+    INSERT INTO {TEMPLATE_TABLE} (student_id, template_index, embedding)
+    VALUES (:student_id, :template_index, CAST(:vec AS vector))
+""")
+
+
+def embedding_model_version() -> str:
+    """Identifier of the model setup whose embeddings are mutually comparable."""
+    return f"{DEFAULT_MODEL_PACK}@det{getattr(settings, 'insightface_det_size', 640)}"
+
+
+def encode_embedding(embedding: Sequence[float]) -> Optional[bytes]:
+    """Pack an embedding as float32 bytes (None for empty input)."""
+    if embedding is None:
+        return None
+    vec = np.asarray(embedding, dtype=EMBEDDING_DTYPE).reshape(-1)
+    if vec.size == 0:
+        return None
+    return vec.tobytes()
+
+
+def decode_embedding(blob: Optional[bytes]) -> Optional[np.ndarray]:
+    """Unpack float32 bytes written by encode_embedding (read-only view, no copy)."""
+    if not blob:
+        return None
+    if len(blob) % EMBEDDING_DTYPE.itemsize:
+        logger.warning(f"Ignoring face embedding blob with invalid length {len(blob)}")
+        return None
+    return np.frombuffer(blob, dtype=EMBEDDING_DTYPE)
+
+
+def to_vector_literal(embedding: Sequence[float]) -> str:
+    """Format an embedding as a pgvector text literal."""
+    vec = np.asarray(embedding, dtype=np.float32).reshape(-1)
+    return "[" + ",".join(f"{x:.7g}" for x in vec) + "]"
+
+
+def resolve_embedding(binary: Optional[bytes], legacy_json) -> Optional[np.ndarray]:
+    """Prefer the binary column, falling back to the legacy JSON list."""
+    vec = decode_embedding(binary)
+    if vec is not None:
+        return vec
+    if legacy_json:
+        return np.asarray(legacy_json, dtype=np.float32).reshape(-1)
+    return None
+
+
+def encode_templates(templates: Sequence[Sequence[float]]) -> Optional[bytes]:
+    """Pack an (n, dim) template matrix row-major as float32 bytes."""
+    if templates is None or len(templates) == 0:
+        return None
+    return np.asarray(templates, dtype=EMBEDDING_DTYPE).reshape(len(templates), -1).tobytes()
+
+
+def decode_templates(blob: Optional[bytes], dim: int = EMBEDDING_DIM) -> Optional[np.ndarray]:
+    """Unpack an (n, dim) template matrix written by encode_templates."""
+    vec = decode_embedding(blob)
+    if vec is None or vec.size % dim:
+        return None
+    return vec.reshape(-1, dim)
+
+
+def resolve_templates(templates_blob: Optional[bytes], binary: Optional[bytes],
+                      legacy_json, dim: int = EMBEDDING_DIM) -> Optional[np.ndarray]:
+    """All enrollment templates as (n, dim); single-vector rows become one template."""
+    templates = decode_templates(templates_blob, dim)
+    if templates is not None:
+        return templates
+    vec = resolve_embedding(binary, legacy_json)
+    return vec.reshape(1, -1) if vec is not None else None
+
+
+def template_vector_rows(student_id: int, templates: Optional[np.ndarray],
+                         max_templates: int) -> List[Dict[str, object]]:
+    """INSERT_TEMPLATE_VECTOR_SQL parameters for the first ``max_templates`` templates (as the gallery keeps)."""
+    if templates is None:
+        return []
+    return [
+        {"student_id": student_id, "template_index": index, "vec": to_vector_literal(vec)}
+        for index, vec in enumerate(np.asarray(templates, dtype=np.float32).reshape(-1, EMBEDDING_DIM)[:max_templates])
+    ]
+
+
+def nearest_vector_params(embedding: Sequence[float], limit: int, max_templates: int,
+                          cohort: Optional[Tuple[int, int]] = None) -> Dict[str, object]:
+    """Bind parameters for NEAREST_VECTOR_SQL / NEAREST_VECTOR_COHORT_SQL."""
+    params = {"probe": to_vector_literal(embedding), "limit": limit,
+              "candidates": limit * max(1, max_templates)}
+    if cohort is not None:
+        params.update(faculty_id=cohort[0], semester=cohort[1])
+    return params
+
+
+def student_templates(student: Student) -> Optional[np.ndarray]:
+    """Return a student's enrollment templates as an (n, 512) float32 array."""
+    return resolve_templates(
+        getattr(student, 'face_templates', None),
+        getattr(student, 'face_embedding', None),
+        student.face_encoding,
+    )
+
+
+def student_embedding(student: Student) -> Optional[np.ndarray]:
+    """Return a student's stored embedding as float32, or None if not enrolled."""
+    return resolve_embedding(getattr(student, 'face_embedding', None), student.face_encoding)
+
+
+def student_embedding_list(student: Student) -> Optional[List[float]]:
+    """Stored embedding as a plain list, for API responses that expose face_encoding."""
+    vec = student_embedding(student)
+    return vec.tolist() if vec is not None else None
+
+
+class FaceEmbeddingStore:
+    """Writes embeddings to every configured column and runs DB-side searches."""
+
+    def __init__(self, json_fallback: bool = True, max_templates: int = 5):
+        self.json_fallback = json_fallback
+        self.max_templates = max(1, max_templates)
+        self._vector_table: Optional[bool] = None  # Unknown until first checked
+
+    async def has_vector_table(self, db: AsyncSession) -> bool:
+        """Whether the pgvector template table exists (checked once per process)."""
+        if self._vector_table is None:
+            try:
+                result = await db.execute(HAS_VECTOR_TABLE_SQL, {"table": TEMPLATE_TABLE})
+                self._vector_table = result.first() is not None
+            except Exception as e:
+                logger.warning(f"Could not check for pgvector template table: {str(e)}")
+                self._vector_table = False
+            logger.info(f"🧭 pgvector face search {'enabled' if self._vector_table else 'unavailable'}")
+        return self._vector_table
+
+    async def save(self, db: AsyncSession, student: Student, embedding: Sequence[float],
+                   templates: Optional[Sequence[Sequence[float]]] = None) -> None:
+        """
+        Stage a student's embedding on the session (caller commits).
+        ``embedding`` is the single composite vector; ``templates`` are the
+        per-image embeddings used for max-over-templates matching.
+        """
+        vec = np.asarray(embedding, dtype=np.float32).reshape(-1)
+        student.face_embedding = encode_embedding(vec)
+        student.face_templates = encode_templates(templates) if templates else None
+        student.face_encoding = vec.tolist() if self.json_fallback else None
+        student.face_embedding_version = embedding_model_version()
+        # A fresh registration supersedes anything a running re-embedding job staged
+        student.face_embedding_staged = None
+        student.face_templates_staged = None
+        student.face_embedding_staged_version = None
+
+        if await self.has_vector_table(db):
+            await db.execute(DELETE_TEMPLATE_VECTORS_SQL, {"ids": [student.id]})
+            rows = template_vector_rows(student.id, templates if templates else vec, self.max_templates)
+            await db.execute(INSERT_TEMPLATE_VECTOR_SQL, rows)
+
+    async def clear_all(self, db: AsyncSession) -> None:
+        """Remove every stored embedding (caller commits)."""
+        columns = ["face_encoding = NULL", "face_embedding = NULL", "face_templates = NULL",
+                   "face_embedding_version = NULL", "face_embedding_staged = NULL",
+                   "face_templates_staged = NULL", "face_embedding_staged_version = NULL"]
+        if await self.has_vector_table(db):
+            await db.execute(text(f"DELETE FROM {TEMPLATE_TABLE}"))
+        await db.execute(text(
+            f"UPDATE students SET {', '.join(columns)} "
+            "WHERE face_encoding IS NOT NULL OR face_embedding IS NOT NULL"
+        ))
+
+    async def load_templates(self, db: AsyncSession, student_ids: Sequence[int]) -> Dict[int, np.ndarray]:
+        """Full-precision enrollment templates for a handful of students (gallery re-rank)."""
+        if not student_ids:
+            return {}
+        result = await db.execute(
+            select(Student.id, Student.face_templates, Student.face_embedding, Student.face_encoding)
+            .where(Student.id.in_(list(student_ids)))
+        )
+        templates_by_id = {}
+        for student_id, templates_blob, binary, encoding in result:
+            templates = resolve_templates(templates_blob, binary, encoding)
+            if templates is not None:
+                templates_by_id[student_id] = templates
+        return templates_by_id
+
+    async def nearest(self, db: AsyncSession, embedding: Sequence[float], limit: int = 1,
+                      cohort: Optional[Tuple[int, int]] = None) -> Optional[List[Tuple[int, str, float]]]:
+        """
+        Database-side nearest students as (student_id, name, best template similarity),
+        best first. ``cohort`` is an optional (faculty_id, semester) filter. Returns
+        None when pgvector is not available so callers can fall back to the in-memory gallery.
+        """
+        if not await self.has_vector_table(db):
+            return None
+        params = nearest_vector_params(embedding, limit, self.max_templates, cohort)
+        result = await db.execute(
+            NEAREST_VECTOR_COHORT_SQL if cohort is not None else NEAREST_VECTOR_SQL, params
+        )
+        return [(row.id, row.full_name or "", float(row.similarity)) for row in result]
+
+
+# Global instance
+face_embedding_store = FaceEmbeddingStore(
+    json_fallback=getattr(settings, 'face_encoding_json_fallback', True),
+    max_templates=getattr(settings, 'face_max_templates', 5),
+)
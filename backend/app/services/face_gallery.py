@@ -0,0 +1,497 @@
+"""
+In-memory face embedding gallery for 1:N identification.
+
+Keeps every enrolled student's enrollment templates in one contiguous float32
+array of L2-normalized vectors shaped (identities, K, dim), plus one normalized
+centroid per identity and parallel id/name arrays. Identification is a single
+centroid matrix-vector product with an argpartition shortlist, followed by an
+exact max over the K templates of the shortlisted identities only, so scanning
+stays as cheap as the old one-vector-per-student search while the score is the
+best pose match rather than the average.
+
+Identities with fewer than K templates are padded with copies of their own
+templates, which leaves the per-identity max unchanged and keeps the layout
+dense (no masking or per-identity offsets on the hot path).
+
+With ``storage="float16"`` or ``"int8"`` (per-vector scaled) the centroids and
+templates are held quantized, cutting gallery memory 2x/4x. Both are scanned
+through small cache-resident float32 blocks, and the best ``rerank_size``
+candidates are re-scored in float32 against the stored templates (see
+``rescore``) so the reported similarity is exact. numpy's float16 -> float32
+cast is slow, so float16 scans cost several times more than float32 or int8;
+prefer int8 when memory matters.
+
+Each identity is also tagged with its ``(faculty_id, semester)`` cohort. A
+request that knows the subject or class schedule searches only that cohort's
+rows plus the global fallback partition (students with no faculty assigned),
+which keeps scan cost and false-match odds flat as enrollment grows across
+faculties. Unscoped requests, and cohorts with nobody enrolled yet, search
+the whole gallery.
+
+The gallery is loaded lazily from the database on first use, updated in place
+when a student (re-)registers, and periodically reloaded so that multiple
+uvicorn workers converge on registrations handled by their siblings.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models import Student, User
+from app.services.face_embedding_store import resolve_templates
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_DIM = 512
+
+GALLERY_STORAGE_DTYPES = {"float32": np.float32, "float16": np.float16, "int8": np.int8}
+INT8_MAX = 127.0
+SCAN_BLOCK_ROWS = 256  # Quantized rows dequantized per block (~512 KB float32, stays in L2)
+
+# (faculty_id, semester); None is the global fallback partition
+Cohort = Optional[Tuple[int, int]]
+
+
+@dataclass
+class GalleryMatch:
+    """A single identification candidate returned by the gallery."""
+    student_id: int
+    student_name: str
+    similarity: float  # Raw cosine similarity (0-1 range for matches)
+    templates: int = 1  # Enrollment templates the score was maxed over
+
+
+def cohort_key(faculty_id: Optional[int], semester: Optional[int]) -> Cohort:
+    """Gallery partition for a faculty/semester pair (None unless both are known)."""
+    if faculty_id is None or semester is None:
+        return None
+    return (int(faculty_id), int(semester))
+
+
+def normalize_templates(templates, dim: int, max_templates: int) -> Optional[np.ndarray]:
+    """Normalize up to ``max_templates`` valid rows of a 1-D or 2-D input (None if none survive)."""
+    if templates is None:
+        return None
+    rows = np.asarray(templates, dtype=np.float32)
+    if rows.ndim == 1:
+        rows = rows.reshape(1, -1)
+    valid = [vec for vec in (normalize_embedding(row) for row in rows)
+             if vec is not None and vec.shape[0] == dim]
+    if not valid:
+        return None
+    return np.vstack(valid[:max_templates])
+
+
+def normalize_embedding(embedding: Sequence[float]) -> Optional[np.ndarray]:
+    """Return a contiguous, L2-normalized float32 copy of an embedding (None if degenerate)."""
+    if embedding is None:
+        return None
+    vec = np.asarray(embedding, dtype=np.float32).reshape(-1)
+    if vec.size == 0:
+        return None
+    norm = float(np.linalg.norm(vec))
+    if norm == 0.0 or not np.isfinite(norm):
+        return None
+    return np.ascontiguousarray(vec / norm)
+
+
+def quantize_rows(dst: np.ndarray, dst_scale: np.ndarray, src: np.ndarray) -> None:
+    """Write float32 rows into ``dst`` in its dtype; int8 rows get a per-vector scale."""
+    if dst.dtype == np.int8:
+        scale = np.abs(src).max(axis=-1) / INT8_MAX
+        scale[scale == 0] = 1.0
+        dst[...] = np.rint(src / scale[..., None])
+        dst_scale[...] = scale
+    else:
+        dst[...] = src
+        dst_scale[...] = 1.0
+
+
+class FaceEmbeddingGallery:
+    """Process-wide, thread-safe matrix of normalized student embeddings."""
+
+    def __init__(self, dim: int = EMBEDDING_DIM, max_templates: int = 5,
+                 shortlist_size: int = 64, refresh_seconds: int = 300,
+                 storage: str = "float32", rerank_size: int = 8):
+        if storage not in GALLERY_STORAGE_DTYPES:
+            raise ValueError(f"Unknown gallery storage '{storage}', expected one of {list(GALLERY_STORAGE_DTYPES)}")
+        self.dim = dim
+        self.max_templates = max(1, max_templates)
+        self.shortlist_size = max(1, shortlist_size)  # Identities re-scored over all templates
+        self.refresh_seconds = refresh_seconds
+        self.storage = storage
+        self.dtype = np.dtype(GALLERY_STORAGE_DTYPES[storage])
+        self.rerank_size = max(1, rerank_size)  # Candidates re-scored in float32 when quantized
+        self._lock = threading.RLock()
+        self._load_lock = asyncio.Lock()
+        self._scan_buffer = np.empty((SCAN_BLOCK_ROWS, dim), dtype=np.float32)
+        self._matrix = np.empty((0, self.max_templates, dim), dtype=self.dtype)
+        self._matrix_scale = np.empty((0, self.max_templates), dtype=np.float32)
+        self._centroids = np.empty((0, dim), dtype=self.dtype)
+        self._centroid_scale = np.empty(0, dtype=np.float32)
+        self._student_ids = np.empty(0, dtype=np.int64)
+        self._template_counts = np.empty(0, dtype=np.int32)
+        self._names: List[str] = []
+        self._cohorts: List[Cohort] = []
+        self._shards: Optional[Dict[Cohort, np.ndarray]] = None  # Row indices per cohort, rebuilt lazily
+        self._row_of: Dict[int, int] = {}
+        self._size = 0
+        self._loaded_at: Optional[float] = None
+        self.last_load_ms = 0.0
+        self.cohort_searches = 0
+        self.global_searches = 0
+
+    # ------------------------------------------------------------------
+    # Loading
+    # ------------------------------------------------------------------
+    @property
+    def quantized(self) -> bool:
+        return self.dtype != np.float32
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._loaded_at is not None
+
+    def _is_stale(self) -> bool:
+        if self._loaded_at is None:
+            return True
+        if self.refresh_seconds <= 0:
+            return False
+        return (time.monotonic() - self._loaded_at) > self.refresh_seconds
+
+    async def ensure_loaded(self, db: AsyncSession) -> None:
+        """Load the gallery if it is empty or older than the refresh interval."""
+        if not self._is_stale():
+            return
+        async with self._load_lock:
+            # Another request may have finished loading while we waited
+            if self._is_stale():
+                await self.load(db)
+
+    async def load(self, db: AsyncSession) -> None:
+        """(Re)build the gallery from every student with a stored face encoding."""
+        start = time.perf_counter()
+        result = await db.execute(
+            select(Student.id, User.full_name, Student.faculty_id, Student.semester,
+                   Student.face_templates, Student.face_embedding, Student.face_encoding)
+            .join(User, User.id == Student.user_id)
+            .where(or_(Student.face_embedding.isnot(None), Student.face_encoding.isnot(None)))
+        )
+        rows = result.all()
+
+        ids: List[int] = []
+        names: List[str] = []
+        cohorts: List[Cohort] = []
+        matrix = np.empty((len(rows), self.max_templates, self.dim), dtype=self.dtype)
+        matrix_scale = np.empty((len(rows), self.max_templates), dtype=np.float32)
+        centroids = np.empty((len(rows), self.dim), dtype=self.dtype)
+        centroid_scale = np.empty(len(rows), dtype=np.float32)
+        counts = np.empty(len(rows), dtype=np.int32)
+        for student_id, full_name, faculty_id, semester, templates_blob, binary, encoding in rows:
+            templates = normalize_templates(
+                resolve_templates(templates_blob, binary, encoding, self.dim), self.dim, self.max_templates
+            )
+            if templates is None:
+                logger.warning(f"Skipping invalid face encoding for student {student_id}")
+                continue
+            row = len(ids)
+            counts[row] = self._fill_row(matrix[row], matrix_scale[row], centroids[row],
+                                         centroid_scale[row:row + 1], templates)
+            ids.append(student_id)
+            names.append(full_name or "")
+            cohorts.append(cohort_key(faculty_id, semester))
+
+        n = len(ids)
+        self._replace(matrix[:n], matrix_scale[:n], centroids[:n], centroid_scale[:n],
+                      counts[:n], ids, names, cohorts)
+
+        self.last_load_ms = round((time.perf_counter() - start) * 1000, 2)
+        logger.info(f"📚 Face gallery loaded - {len(ids)} identities, "
+                    f"{int(counts[:len(ids)].sum())} templates in {self.last_load_ms}ms")
+
+    def _fill_row(self, slot: np.ndarray, slot_scale: np.ndarray, centroid: np.ndarray,
+                  centroid_scale: np.ndarray, templates: np.ndarray) -> int:
+        """Write templates into a (K, dim) slot (padded by repetition) and their centroid."""
+        count = templates.shape[0]
+        quantize_rows(slot, slot_scale, templates[np.arange(self.max_templates) % count])
+        mean = normalize_embedding(templates.mean(axis=0))
+        quantize_rows(centroid, centroid_scale, (mean if mean is not None else templates[0]).reshape(1, -1))
+        return count
+
+    def _replace(self, matrix: np.ndarray, matrix_scale: np.ndarray, centroids: np.ndarray,
+                 centroid_scale: np.ndarray, counts: np.ndarray,
+                 ids: List[int], names: List[str], cohorts: List[Cohort]) -> None:
+        with self._lock:
+            self._matrix = np.ascontiguousarray(matrix, dtype=self.dtype)
+            self._matrix_scale = np.ascontiguousarray(matrix_scale, dtype=np.float32)
+            self._centroids = np.ascontiguousarray(centroids, dtype=self.dtype)
+            self._centroid_scale = np.ascontiguousarray(centroid_scale, dtype=np.float32)
+            self._template_counts = np.asarray(counts, dtype=np.int32)
+            self._student_ids = np.asarray(ids, dtype=np.int64)
+            self._names = list(names)
+            self._cohorts = list(cohorts)
+            self._shards = None
+            self._row_of = {sid: i for i, sid in enumerate(ids)}
+            self._size = len(ids)
+            self._loaded_at = time.monotonic()
+
+    def invalidate(self) -> None:
+        """Force a full reload on the next ensure_loaded() call."""
+        with self._lock:
+            self._loaded_at = None
+
+    # ------------------------------------------------------------------
+    # Incremental updates
+    # ------------------------------------------------------------------
+    def _grow(self, min_capacity: int) -> None:
+        capacity = max(min_capacity, max(16, self._matrix.shape[0] * 2))
+        matrix = np.empty((capacity, self.max_templates, self.dim), dtype=self.dtype)
+        matrix[:self._size] = self._matrix[:self._size]
+        matrix_scale = np.empty((capacity, self.max_templates), dtype=np.float32)
+        matrix_scale[:self._size] = self._matrix_scale[:self._size]
+        centroids = np.empty((capacity, self.dim), dtype=self.dtype)
+        centroids[:self._size] = self._centroids[:self._size]
+        centroid_scale = np.empty(capacity, dtype=np.float32)
+        centroid_scale[:self._size] = self._centroid_scale[:self._size]
+        ids = np.empty(capacity, dtype=np.int64)
+        ids[:self._size] = self._student_ids[:self._size]
+        counts = np.empty(capacity, dtype=np.int32)
+        counts[:self._size] = self._template_counts[:self._size]
+        self._matrix = matrix
+        self._matrix_scale = matrix_scale
+        self._centroids = centroids
+        self._centroid_scale = centroid_scale
+        self._student_ids = ids
+        self._template_counts = counts
+
+    def upsert(self, student_id: int, student_name: str, embeddings, cohort: Cohort = None) -> bool:
+        """
+        Insert or replace one student's templates. Accepts a single embedding or
+        an (n, dim) array; returns False if no valid vector was given.
+        """
+        templates = normalize_templates(embeddings, self.dim, self.max_templates)
+        if templates is None:
+            logger.warning(f"Refusing to add invalid embedding for student {student_id} to gallery")
+            return False
+
+        with self._lock:
+            row = self._row_of.get(student_id)
+            if row is None:
+                if self._size >= self._matrix.shape[0]:
+                    self._grow(self._size + 1)
+                row = self._size
+                self._size += 1
+                self._row_of[student_id] = row
+                self._names.append(student_name or "")
+                self._cohorts.append(cohort)
+                self._student_ids[row] = student_id
+                self._shards = None
+            else:
+                self._names[row] = student_name or self._names[row]
+                if self._cohorts[row] != cohort:
+                    self._cohorts[row] = cohort
+                    self._shards = None
+            self._template_counts[row] = self._fill_row(
+                self._matrix[row], self._matrix_scale[row],
+                self._centroids[row], self._centroid_scale[row:row + 1], templates
+            )
+        return True
+
+    def relabel(self, student_id: int, student_name: str, cohort: Cohort = None) -> bool:
+        """Update a student's name and cohort after a profile edit (False if not in the gallery)."""
+        with self._lock:
+            row = self._row_of.get(student_id)
+            if row is None:
+                return False
+            self._names[row] = student_name or self._names[row]
+            if self._cohorts[row] != cohort:
+                self._cohorts[row] = cohort
+                self._shards = None
+        return True
+
+    def template_count(self, student_id: int) -> int:
+        """Number of enrollment templates held for a student (0 if absent)."""
+        with self._lock:
+            row = self._row_of.get(student_id)
+            return int(self._template_counts[row]) if row is not None else 0
+
+    def remove(self, student_id: int) -> None:
+        """Drop a student from the gallery (swap-with-last to keep rows contiguous)."""
+        with self._lock:
+            row = self._row_of.pop(student_id, None)
+            if row is None:
+                return
+            last = self._size - 1
+            if row != last:
+                moved_id = int(self._student_ids[last])
+                self._matrix[row] = self._matrix[last]
+                self._matrix_scale[row] = self._matrix_scale[last]
+                self._centroids[row] = self._centroids[last]
+                self._centroid_scale[row] = self._centroid_scale[last]
+                self._template_counts[row] = self._template_counts[last]
+                self._student_ids[row] = moved_id
+                self._names[row] = self._names[last]
+                self._cohorts[row] = self._cohorts[last]
+                self._row_of[moved_id] = row
+            self._names.pop()
+            self._cohorts.pop()
+            self._size = last
+            self._shards = None
+
+    def clear(self) -> None:
+        """Empty the gallery but keep it marked as loaded."""
+        self._replace(np.empty((0, self.max_templates, self.dim), dtype=self.dtype),
+                      np.empty((0, self.max_templates), dtype=np.float32),
+                      np.empty((0, self.dim), dtype=self.dtype),
+                      np.empty(0, dtype=np.float32),
+                      np.empty(0, dtype=np.int32), [], [], [])
+
+    # ------------------------------------------------------------------
+    # Search
+    # ------------------------------------------------------------------
+    def _shard_rows(self, cohort: Cohort) -> np.ndarray:
+        """Rows of a cohort plus the global fallback partition (caller holds the lock)."""
+        if self._shards is None:
+            grouped: Dict[Cohort, List[int]] = {}
+            for row, key in enumerate(self._cohorts):
+                grouped.setdefault(key, []).append(row)
+            self._shards = {key: np.asarray(rows, dtype=np.int64) for key, rows in grouped.items()}
+        own = self._shards.get(cohort)
+        if own is None:
+            return np.empty(0, dtype=np.int64)
+        fallback = self._shards.get(None)
+        return own if fallback is None else np.concatenate((own, fallback))
+
+    def _scan(self, vectors: np.ndarray, scale: np.ndarray, probe: np.ndarray) -> np.ndarray:
+        """Dot products of (n, dim) stored vectors with the probe (caller holds the lock)."""
+        if not self.quantized:
+            return vectors @ probe
+        scores = np.empty(vectors.shape[0], dtype=np.float32)
+        for start in range(0, vectors.shape[0], SCAN_BLOCK_ROWS):
+            block = vectors[start:start + SCAN_BLOCK_ROWS]
+            buffer = self._scan_buffer[:block.shape[0]]
+            np.copyto(buffer, block, casting='unsafe')
+            np.dot(buffer, probe, out=scores[start:start + block.shape[0]])
+        if self.dtype == np.int8:
+            scores *= scale
+        return scores
+
+    def search(self, embedding: Sequence[float], top_k: int = 1,
+               cohort: Cohort = None) -> List[GalleryMatch]:
+        """
+        Return the top-k most similar identities (max over their templates), best first.
+        With a ``cohort`` only that partition and the global fallback are scanned.
+        Quantized galleries return approximate scores; pass the results through
+        ``rescore`` (or ask for ``rerank_size`` candidates first) for exact ones.
+        """
+        probe = normalize_embedding(embedding)
+        if probe is None or probe.shape[0] != self.dim:
+            return []
+
+        with self._lock:
+            if self._size == 0:
+                return []
+            rows = self._shard_rows(cohort) if cohort is not None else None
+            if rows is None or rows.size == 0:
+                # Unscoped request, or nobody from this cohort enrolled yet
+                rows = None
+                self.global_searches += 1
+            else:
+                self.cohort_searches += 1
+            size = self._size if rows is None else rows.size
+
+            # Stage 1: one centroid per identity -> shortlist
+            k = min(max(1, top_k), size)
+            shortlist = min(size, max(k, self.shortlist_size))
+            if shortlist < size:
+                if rows is None:
+                    centroid_scores = self._scan(self._centroids[:size], self._centroid_scale[:size], probe)
+                else:
+                    centroid_scores = self._scan(self._centroids[rows], self._centroid_scale[rows], probe)
+                candidates = np.argpartition(-centroid_scores, shortlist - 1)[:shortlist]
+                if rows is not None:
+                    candidates = rows[candidates]
+            else:
+                candidates = np.arange(size) if rows is None else rows
+
+            # Stage 2: exact max over every template of the shortlisted identities
+            templates = self._matrix[candidates].reshape(-1, self.dim)
+            scale = self._matrix_scale[candidates].reshape(-1)
+            scores = self._scan(templates, scale, probe).reshape(len(candidates), self.max_templates).max(axis=1)
+            order = np.argsort(-scores)[:k]
+            return [
+                GalleryMatch(
+                    student_id=int(self._student_ids[candidates[i]]),
+                    student_name=self._names[candidates[i]],
+                    similarity=float(scores[i]),
+                    templates=int(self._template_counts[candidates[i]]),
+                )
+                for i in order
+            ]
+
+    def rescore(self, embedding: Sequence[float], matches: List[GalleryMatch],
+                templates_by_id: Dict[int, np.ndarray], top_k: int = 1) -> List[GalleryMatch]:
+        """
+        Exact float32 re-rank of candidates against their full-precision templates
+        (as loaded from the database). Candidates without templates keep their score.
+        """
+        probe = normalize_embedding(embedding)
+        if probe is None:
+            return matches[:top_k]
+        rescored = []
+        for match in matches:
+            templates = normalize_templates(templates_by_id.get(match.student_id), self.dim, self.max_templates)
+            if templates is not None:
+                match = GalleryMatch(match.student_id, match.student_name,
+                                     float((templates @ probe).max()), templates.shape[0])
+            rescored.append(match)
+        rescored.sort(key=lambda m: m.similarity, reverse=True)
+        return rescored[:top_k]
+
+    def _row_bytes(self) -> int:
+        """Bytes of templates, centroid and scales stored per identity."""
+        return (self.max_templates * self.dim * self.dtype.itemsize + self.max_templates * 4
+                + self.dim * self.dtype.itemsize + 4)
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            counts = self._template_counts[:self._size]
+            histogram = np.bincount(counts, minlength=self.max_templates + 1)[1:] if self._size else []
+            return {
+                "loaded": self.is_loaded,
+                "identities": self._size,
+                "templates": int(counts.sum()),
+                "max_templates": self.max_templates,
+                "templates_per_identity": {str(n): int(c) for n, c in enumerate(histogram, start=1) if c},
+                "capacity": int(self._matrix.shape[0]),
+                "dtype": str(self._matrix.dtype),
+                "storage": self.storage,
+                "rerank_size": self.rerank_size if self.quantized else 0,
+                "memory_bytes": self._size * self._row_bytes(),  # Filled rows only
+                "allocated_bytes": int(self._matrix.shape[0]) * self._row_bytes(),
+                "shortlist_size": self.shortlist_size,
+                "cohorts": len({key for key in self._cohorts if key is not None}),
+                "fallback_identities": sum(1 for key in self._cohorts if key is None),
+                "cohort_searches": self.cohort_searches,
+                "global_searches": self.global_searches,
+                "last_load_ms": self.last_load_ms,
+                "refresh_seconds": self.refresh_seconds,
+            }
+
+
+# Global instance shared by all face routes in this worker
+face_gallery = FaceEmbeddingGallery(
+    max_templates=getattr(settings, 'face_max_templates', 5),
+    shortlist_size=getattr(settings, 'face_gallery_shortlist', 64),
+    refresh_seconds=getattr(settings, 'face_gallery_refresh_seconds', 300),
+    storage=getattr(settings, 'face_gallery_storage', 'float32'),
+    rerank_size=getattr(settings, 'face_gallery_rerank', 8)
+)
@@ -0,0 +1,151 @@
+"""
+Dedicated executor for CPU-bound face inference.
+
+The face routes are ``async def`` handlers; running InsightFace (ONNX) inference
+inline blocks the event loop for hundreds of milliseconds and stalls every other
+request on the worker. Routes instead ``await face_inference_executor.run(...)``
+which hands the work to a bounded thread pool. ONNX Runtime releases the GIL
+during inference, so threads give real parallelism while sharing one copy of the
+loaded models (a process pool would need a full model load per child).
+
+The executor also applies backpressure: once ``max_queue`` jobs are waiting,
+new work is rejected with ``FaceInferenceBusyError`` instead of piling up.
+Jobs run in a copy of the caller's context, so stage timings recorded on the
+worker thread (face_metrics) are charged to the submitting request.
+"""
+
+import asyncio
+import contextvars
+import functools
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from app.core.config import settings
+from app.services.face_metrics import face_metrics
+
+logger = logging.getLogger(__name__)
+
+
+class FaceInferenceBusyError(RuntimeError):
+    """Raised when the inference queue is full and the job was not accepted."""
+
+
+class FaceInferenceExecutor:
+    """Bounded thread pool with queue-depth and in-flight accounting."""
+
+    def __init__(self, max_workers: int = 2, max_queue: int = 32):
+        self.max_workers = max(1, max_workers)
+        self.max_queue = max(0, max_queue)  # 0 = unbounded
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._in_flight = 0
+        self._completed = 0
+        self._failed = 0
+        self._rejected = 0
+        self._total_wait_ms = 0.0
+        self._total_run_ms = 0.0
+        self._max_queue_seen = 0
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers,
+                thread_name_prefix="face-inference",
+            )
+            logger.info(f"🧵 Face inference executor started with {self.max_workers} worker(s)")
+        return self._executor
+
+    def _wrap(self, fn: Callable[..., Any], submitted_at: float,
+              context: contextvars.Context) -> Callable[[], Any]:
+        def runner():
+            started_at = time.perf_counter()
+            wait_ms = (started_at - submitted_at) * 1000
+            with self._lock:
+                self._queued -= 1
+                self._in_flight += 1
+                self._total_wait_ms += wait_ms
+            ok = False
+            try:
+                context.run(face_metrics.record, "queue_wait", wait_ms)
+                result = context.run(fn)
+                ok = True
+                return result
+            finally:
+                with self._lock:
+                    self._in_flight -= 1
+                    self._total_run_ms += (time.perf_counter() - started_at) * 1000
+                    if ok:
+                        self._completed += 1
+                    else:
+                        self._failed += 1
+        return runner
+
+    async def run(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Run ``fn(*args, **kwargs)`` on the inference pool and await its result."""
+        with self._lock:
+            if self.max_queue and self._queued >= self.max_queue:
+                self._rejected += 1
+                raise FaceInferenceBusyError("Face inference queue is full, please retry shortly")
+            self._queued += 1
+            self._max_queue_seen = max(self._max_queue_seen, self._queued)
+
+        call = functools.partial(fn, *args, **kwargs)
+        try:
+            job = self._get_executor().submit(
+                self._wrap(call, time.perf_counter(), contextvars.copy_context())
+            )
+        except RuntimeError:
+            # Executor was shut down before the job could be submitted
+            with self._lock:
+                self._queued -= 1
+            raise
+        # A job cancelled while still queued (client gone, stream worker cancelled,
+        # shutdown) never reaches the runner, so release its queue slot here
+        job.add_done_callback(self._release_if_cancelled)
+        return await asyncio.wrap_future(job)
+
+    def _release_if_cancelled(self, job: Future) -> None:
+        if job.cancelled():
+            with self._lock:
+                self._queued -= 1
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queued
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            finished = self._completed + self._failed
+            return {
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "queue_depth": self._queued,
+                "in_flight": self._in_flight,
+                "completed": self._completed,
+                "failed": self._failed,
+                "rejected": self._rejected,
+                "max_queue_depth_seen": self._max_queue_seen,
+                "avg_wait_ms": round(self._total_wait_ms / finished, 2) if finished else 0.0,
+                "avg_run_ms": round(self._total_run_ms / finished, 2) if finished else 0.0,
+            }
+
+    def shutdown(self, wait: bool = True) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait, cancel_futures=True)
+            self._executor = None
+            logger.info("🛑 Face inference executor stopped")
+
+
+# Singleton instance
+face_inference_executor = FaceInferenceExecutor(
+    max_workers=settings.face_inference_workers,
+    max_queue=settings.face_inference_max_queue,
+)
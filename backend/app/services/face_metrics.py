@@ -0,0 +1,140 @@
+"""
+Per-stage timing of face requests.
+
+Stages are timed where the work happens (``face_metrics.timed("detection")`` inside
+InsightFaceService, the routes' DB calls, ...). Every sample goes into a bounded
+rolling window per stage for the admin p50/p95/p99 report. While a face request is
+in flight (see ``FaceTimingMiddleware``), the same samples also add up per request
+and are returned in a ``Server-Timing`` header, so one slow mark-attendance call
+shows whether decode, detection, attribute models, DB lookups or the auto-absent
+pass took the time.
+
+The per-request totals live in a context variable. The inference executor runs
+jobs inside a copy of the caller's context, so stages timed on worker threads are
+still charged to the request that submitted them. Shared work (a recognition
+batch serving several requests) calls ``detach()`` and only feeds the windows.
+"""
+
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+from typing import Deque, Dict, Iterator, Optional
+
+import numpy as np
+
+from app.core.config import settings
+
+STAGE_WINDOW = 2048  # Recent samples kept per stage
+
+_request_timings: ContextVar[Optional[Dict[str, float]]] = ContextVar("face_request_timings", default=None)
+
+
+class LatencyWindow:
+    """Rolling per-stage latencies for percentile reporting."""
+
+    def __init__(self, size: int = STAGE_WINDOW):
+        self._samples: Dict[str, Deque[float]] = {}
+        self._totals: Dict[str, int] = {}
+        self._size = size
+        self._lock = threading.Lock()
+
+    def add(self, timings_ms: Dict[str, float]) -> None:
+        with self._lock:
+            for stage, value in timings_ms.items():
+                self._samples.setdefault(stage, deque(maxlen=self._size)).append(value)
+                self._totals[stage] = self._totals.get(stage, 0) + 1
+
+    def mean(self, stage: str) -> float:
+        """Mean of the recent samples of one stage (0 if none yet)."""
+        with self._lock:
+            values = self._samples.get(stage)
+            return float(np.mean(values)) if values else 0.0
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            samples = {stage: np.asarray(values) for stage, values in self._samples.items()}
+            totals = dict(self._totals)
+        report = {}
+        for stage, values in sorted(samples.items()):
+            if not values.size:
+                continue
+            p50, p95, p99 = np.percentile(values, (50, 95, 99))
+            report[stage] = {
+                "count": int(values.size),
+                "total_count": totals.get(stage, 0),
+                "mean_ms": round(float(values.mean()), 3),
+                "p50_ms": round(float(p50), 3),
+                "p95_ms": round(float(p95), 3),
+                "p99_ms": round(float(p99), 3),
+                "max_ms": round(float(values.max()), 3),
+            }
+        return report
+
+
+def server_timing_header(timings_ms: Dict[str, float]) -> str:
+    """Format stage durations as a Server-Timing header value."""
+    return ", ".join(f"{stage.replace(' ', '_')};dur={ms:.1f}" for stage, ms in timings_ms.items())
+
+
+class FaceMetrics:
+    """Stage windows plus the per-request accumulation behind Server-Timing."""
+
+    def __init__(self, window: int = STAGE_WINDOW, enabled: bool = True):
+        self.enabled = enabled
+        self.window = window
+        self._stages = LatencyWindow(window)
+        self._endpoints = LatencyWindow(window)
+
+    def record(self, stage: str, ms: float) -> None:
+        if not self.enabled:
+            return
+        self._stages.add({stage: ms})
+        timings = _request_timings.get()
+        if timings is not None:
+            timings[stage] = timings.get(stage, 0.0) + ms
+
+    @contextmanager
+    def timed(self, stage: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, (time.perf_counter() - start) * 1000)
+
+    def recent_mean(self, stage: str) -> float:
+        """Typical recent cost of a stage in ms, e.g. to estimate work that was skipped."""
+        return self._stages.mean(stage)
+
+    def begin_request(self) -> Token:
+        return _request_timings.set({})
+
+    def end_request(self, token: Token, endpoint: str, total_ms: float) -> Dict[str, float]:
+        """Close a request scope; returns its stage totals with ``total`` appended."""
+        timings = _request_timings.get() or {}
+        _request_timings.reset(token)
+        timings["total"] = total_ms
+        if self.enabled:
+            self._endpoints.add({endpoint: total_ms})
+        return timings
+
+    @staticmethod
+    def detach() -> None:
+        """Stop charging the current task's stages to the request that spawned it."""
+        _request_timings.set(None)
+
+    def snapshot(self) -> Dict[str, object]:
+        return {
+            "enabled": self.enabled,
+            "window": self.window,
+            "stages": self._stages.snapshot(),
+            "endpoints": self._endpoints.snapshot(),
+        }
+
+
+# Global instance
+face_metrics = FaceMetrics(
+    window=getattr(settings, 'face_metrics_window', STAGE_WINDOW),
+    enabled=getattr(settings, 'face_metrics_enabled', True),
+)
@@ -0,0 +1,355 @@
+"""
+Shared registry of InsightFace ONNX models.
+
+Both ``InsightFaceService`` and the legacy ``FaceRecognitionService`` used to
+build their own ``FaceAnalysis`` instance, so every worker held two copies of
+the detector and ArcFace sessions and paid both load times at startup. The
+registry loads each model file once, keyed by model pack, task, execution
+provider and (for the detector) det_size, and hands out lightweight
+``SharedFaceAnalysis`` views that borrow those sessions.
+
+Fork behaviour: ONNX Runtime sessions are not fork-safe by default, so a forked
+child drops the inherited sessions and reloads on demand (it keeps the cheap
+file -> task index). Services that hold sessions outside the registry (the
+``SharedFaceAnalysis`` views, the liveness model) drop them through a
+``register_fork_reset`` callback. When running under ``gunicorn --preload`` with
+single-threaded sessions, set ``face_models_share_after_fork=true`` to keep the
+parent's sessions so workers share model weights copy-on-write.
+
+Session options: every session is built with the thread counts, execution mode
+and graph optimization level from settings (``face_ort_*``). ORT's defaults use
+one intra-op thread per core, so several uvicorn workers each running
+``face_inference_workers`` sessions oversubscribe the CPU; size
+``face_ort_intra_op_threads`` to roughly cores / (workers x inference threads).
+With ``face_ort_optimized_model_dir`` set, the optimized graph is saved on first
+load and reused on later boots with graph optimization switched off.
+"""
+
+import glob
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import onnxruntime as ort
+import psutil
+from insightface.app.common import Face
+from insightface.model_zoo import model_zoo
+from insightface.utils import ensure_available
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL_PACK = "buffalo_l"
+DEFAULT_PROVIDERS: Tuple[str, ...] = ("CPUExecutionProvider",)
+
+GRAPH_OPTIMIZATION_LEVELS = {
+    "disabled": ort.GraphOptimizationLevel.ORT_DISABLE_ALL,
+    "basic": ort.GraphOptimizationLevel.ORT_ENABLE_BASIC,
+    "extended": ort.GraphOptimizationLevel.ORT_ENABLE_EXTENDED,
+    "all": ort.GraphOptimizationLevel.ORT_ENABLE_ALL,
+}
+EXECUTION_MODES = {
+    "sequential": ort.ExecutionMode.ORT_SEQUENTIAL,
+    "parallel": ort.ExecutionMode.ORT_PARALLEL,
+}
+# Preprocessing constants insightface derives by inspecting the original graph
+MODEL_NORMALIZATION_ATTRS = ("input_mean", "input_std")
+
+# (model pack, task name, providers, det_size or None for non-detection tasks)
+ModelKey = Tuple[str, str, Tuple[str, ...], Optional[int]]
+
+
+def build_session_options(optimization: Optional[str] = None) -> ort.SessionOptions:
+    """ORT SessionOptions from the face_ort_* settings (``optimization`` overrides the level)."""
+    level = optimization or getattr(settings, 'face_ort_graph_optimization', 'all')
+    mode = getattr(settings, 'face_ort_execution_mode', 'sequential')
+    if level not in GRAPH_OPTIMIZATION_LEVELS:
+        raise ValueError(f"Unknown graph optimization level '{level}', expected one of {list(GRAPH_OPTIMIZATION_LEVELS)}")
+    if mode not in EXECUTION_MODES:
+        raise ValueError(f"Unknown execution mode '{mode}', expected one of {list(EXECUTION_MODES)}")
+    options = ort.SessionOptions()
+    options.graph_optimization_level = GRAPH_OPTIMIZATION_LEVELS[level]
+    options.execution_mode = EXECUTION_MODES[mode]
+    options.intra_op_num_threads = max(0, getattr(settings, 'face_ort_intra_op_threads', 0))
+    options.inter_op_num_threads = max(0, getattr(settings, 'face_ort_inter_op_threads', 0))
+    return options
+
+
+def session_config() -> Dict[str, Any]:
+    """Effective ORT session settings, for logs and status endpoints."""
+    return {
+        "intra_op_threads": getattr(settings, 'face_ort_intra_op_threads', 0),
+        "inter_op_threads": getattr(settings, 'face_ort_inter_op_threads', 0),
+        "execution_mode": getattr(settings, 'face_ort_execution_mode', 'sequential'),
+        "graph_optimization": getattr(settings, 'face_ort_graph_optimization', 'all'),
+        "optimized_model_dir": getattr(settings, 'face_ort_optimized_model_dir', '') or None,
+    }
+
+
+@dataclass
+class LoadedModel:
+    """A loaded ONNX model plus the bookkeeping reported at startup."""
+    key: ModelKey
+    onnx_file: str
+    model: Any
+    load_ms: float
+    file_bytes: int
+    rss_delta_bytes: int
+    from_cache: bool = False
+
+    def describe(self) -> Dict[str, Any]:
+        pack, task, providers, det_size = self.key
+        return {
+            "model_pack": pack,
+            "task": task,
+            "providers": list(providers),
+            "det_size": det_size,
+            "file": os.path.basename(self.onnx_file),
+            "file_mb": round(self.file_bytes / (1024 ** 2), 1),
+            "rss_delta_mb": round(self.rss_delta_bytes / (1024 ** 2), 1),
+            "load_ms": self.load_ms,
+            "optimized_cache": self.from_cache,
+        }
+
+
+class SharedFaceAnalysis:
+    """
+    FaceAnalysis-compatible view over registry-owned models.
+    Exposes ``models``, ``det_model`` and ``get(img)`` like insightface's FaceAnalysis.
+    """
+
+    def __init__(self, models: Dict[str, Any], det_size: int):
+        self.models = models
+        self.det_model = models['detection']
+        self.det_size = (det_size, det_size)
+        # Detectors exported with a dynamic input shape can run at any input size
+        session = getattr(self.det_model, 'session', None)
+        input_shape = session.get_inputs()[0].shape if session is not None else []
+        self.dynamic_input = len(input_shape) == 4 and not isinstance(input_shape[2], int)
+
+    def detect(self, img: np.ndarray, input_size: Optional[int] = None, max_num: int = 0):
+        """Run only the detector, optionally at a different square input size."""
+        size = (input_size, input_size) if input_size and self.dynamic_input else self.det_size
+        return self.det_model.detect(img, input_size=size, max_num=max_num, metric='default')
+
+    def get(self, img: np.ndarray, max_num: int = 0, skip_tasks: Sequence[str] = ()) -> List[Face]:
+        """Detect faces and run every non-detection model not listed in ``skip_tasks``."""
+        bboxes, kpss = self.detect(img, max_num=max_num)
+        return self.build_faces(img, bboxes, kpss, skip_tasks)
+
+    def build_faces(self, img: np.ndarray, bboxes: np.ndarray, kpss: Optional[np.ndarray],
+                    skip_tasks: Sequence[str] = ()) -> List[Face]:
+        """Wrap detector output in Face objects and run the per-face models on them."""
+        if bboxes.shape[0] == 0:
+            return []
+        ret = []
+        for i in range(bboxes.shape[0]):
+            face = Face(
+                bbox=bboxes[i, 0:4],
+                kps=kpss[i] if kpss is not None else None,
+                det_score=bboxes[i, 4],
+            )
+            for taskname, model in self.models.items():
+                if taskname == 'detection' or taskname in skip_tasks:
+                    continue
+                model.get(img, face)
+            ret.append(face)
+        return ret
+
+
+class FaceModelRegistry:
+    """Process-wide owner of InsightFace ONNX sessions."""
+
+    def __init__(self, root: str = "~/.insightface", share_after_fork: bool = False):
+        self.root = root
+        self.share_after_fork = share_after_fork
+        self._lock = threading.RLock()
+        self._models: Dict[ModelKey, LoadedModel] = {}
+        # model pack -> {task name: onnx file}, filled while scanning a pack
+        self._task_files: Dict[str, Dict[str, str]] = {}
+        self._pid = os.getpid()
+        self._fork_resets: List[Callable[[], None]] = []
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._after_fork_in_child)
+
+    def _after_fork_in_child(self) -> None:
+        self._lock = threading.RLock()
+        self._pid = os.getpid()
+        if not self.share_after_fork:
+            # Inherited ORT sessions are not safe to use after fork; reload lazily
+            self._models = {}
+            for reset in self._fork_resets:
+                reset()
+
+    def register_fork_reset(self, callback: Callable[[], None]) -> None:
+        """Run ``callback`` in a forked child that drops its inherited sessions."""
+        self._fork_resets.append(callback)
+
+    # ------------------------------------------------------------------
+    # Loading
+    # ------------------------------------------------------------------
+    def _model_dir(self, model_pack: str) -> str:
+        return ensure_available('models', model_pack, root=self.root)
+
+    @staticmethod
+    def _optimized_path(onnx_file: str, providers: Tuple[str, ...]) -> Optional[str]:
+        """Where the optimized copy of a model is cached (None when caching is off)."""
+        cache_dir = getattr(settings, 'face_ort_optimized_model_dir', '')
+        if not cache_dir:
+            return None
+        pack = os.path.basename(os.path.dirname(onnx_file))
+        stem = os.path.splitext(os.path.basename(onnx_file))[0]
+        level = getattr(settings, 'face_ort_graph_optimization', 'all')
+        # "all"-level graphs are specialised to the provider/CPU they were built on
+        provider = providers[0].replace("ExecutionProvider", "").lower() if providers else "default"
+        return os.path.join(os.path.expanduser(cache_dir), pack, f"{stem}.{level}.{provider}.onnx")
+
+    def _load_file(self, onnx_file: str, providers: Tuple[str, ...]):
+        """Load one model; returns (model, load_ms, rss_delta, from_cache)."""
+        process = psutil.Process()
+        rss_before = process.memory_info().rss
+        start = time.perf_counter()
+        cached = self._optimized_path(onnx_file, providers)
+        sidecar = f"{cached}.json" if cached else None
+        from_cache = bool(
+            cached and os.path.exists(cached) and os.path.exists(sidecar)
+            and os.path.getmtime(cached) >= os.path.getmtime(onnx_file)
+        )
+
+        # ModelRouter (unlike model_zoo.get_model) forwards session kwargs to ORT
+        if from_cache:
+            model = model_zoo.ModelRouter(cached).get_model(
+                providers=list(providers), sess_options=build_session_options("disabled")
+            )
+            # insightface picks normalization by inspecting the graph; restore what the original used
+            with open(sidecar) as f:
+                for attr, value in json.load(f).items():
+                    setattr(model, attr, value)
+        else:
+            options = build_session_options()
+            if cached:
+                os.makedirs(os.path.dirname(cached), exist_ok=True)
+                options.optimized_model_filepath = cached
+            model = model_zoo.ModelRouter(onnx_file).get_model(providers=list(providers), sess_options=options)
+            if cached and model is not None and os.path.exists(cached):
+                with open(sidecar, "w") as f:
+                    json.dump({attr: getattr(model, attr) for attr in MODEL_NORMALIZATION_ATTRS
+                               if hasattr(model, attr)}, f)
+
+        load_ms = round((time.perf_counter() - start) * 1000, 1)
+        rss_delta = max(0, process.memory_info().rss - rss_before)
+        return model, load_ms, rss_delta, from_cache
+
+    def _register(self, key: ModelKey, onnx_file: str, model, load_ms: float,
+                  rss_delta: int, from_cache: bool, ctx_id: int) -> LoadedModel:
+        _, task, _, det_size = key
+        if task == 'detection':
+            model.prepare(ctx_id, input_size=(det_size, det_size))
+        else:
+            model.prepare(ctx_id)
+        loaded = LoadedModel(
+            key=key,
+            onnx_file=onnx_file,
+            model=model,
+            load_ms=load_ms,
+            file_bytes=os.path.getsize(onnx_file),
+            rss_delta_bytes=rss_delta,
+            from_cache=from_cache,
+        )
+        self._models[key] = loaded
+        logger.info(f"📦 Loaded {task} model {os.path.basename(onnx_file)} "
+                    f"({loaded.describe()['rss_delta_mb']} MB RSS, {load_ms} ms"
+                    f"{', optimized cache' if from_cache else ''})")
+        return loaded
+
+    def _scan_pack(self, model_pack: str, wanted: Sequence[str], providers: Tuple[str, ...],
+                   det_size: int, ctx_id: int) -> None:
+        """Identify the task of every model file in a pack, keeping only the wanted ones."""
+        task_files: Dict[str, str] = {}
+        for onnx_file in sorted(glob.glob(os.path.join(self._model_dir(model_pack), '*.onnx'))):
+            model, load_ms, rss_delta, from_cache = self._load_file(onnx_file, providers)
+            if model is None or model.taskname in task_files:
+                continue
+            task_files[model.taskname] = onnx_file
+            if model.taskname in wanted:
+                key = self._key(model_pack, model.taskname, providers, det_size)
+                if key not in self._models:
+                    self._register(key, onnx_file, model, load_ms, rss_delta, from_cache, ctx_id)
+            else:
+                del model
+        self._task_files[model_pack] = task_files
+
+    @staticmethod
+    def _key(model_pack: str, task: str, providers: Tuple[str, ...], det_size: int) -> ModelKey:
+        return (model_pack, task, providers, det_size if task == 'detection' else None)
+
+    def get_model(self, task: str, det_size: int = 640, model_pack: str = DEFAULT_MODEL_PACK,
+                  providers: Sequence[str] = DEFAULT_PROVIDERS, ctx_id: int = 0) -> Any:
+        """Return the shared model for a task, loading it on first request."""
+        providers = tuple(providers)
+        key = self._key(model_pack, task, providers, det_size)
+        loaded = self._models.get(key)
+        if loaded is not None:
+            return loaded.model
+
+        with self._lock:
+            loaded = self._models.get(key)
+            if loaded is not None:
+                return loaded.model
+            if model_pack not in self._task_files:
+                self._scan_pack(model_pack, [task], providers, det_size, ctx_id)
+            elif task in self._task_files[model_pack]:
+                onnx_file = self._task_files[model_pack][task]
+                model, load_ms, rss_delta, from_cache = self._load_file(onnx_file, providers)
+                self._register(key, onnx_file, model, load_ms, rss_delta, from_cache, ctx_id)
+            loaded = self._models.get(key)
+            if loaded is None:
+                raise RuntimeError(f"Model pack '{model_pack}' has no '{task}' model")
+            return loaded.model
+
+    def get_analysis(self, modules: Sequence[str], det_size: int = 640,
+                     model_pack: str = DEFAULT_MODEL_PACK,
+                     providers: Sequence[str] = DEFAULT_PROVIDERS,
+                     ctx_id: int = 0) -> SharedFaceAnalysis:
+        """Build a FaceAnalysis-compatible view over shared models for the given modules."""
+        if 'detection' not in modules:
+            raise ValueError("A face analysis profile must include the detection module")
+        providers = tuple(providers)
+        with self._lock:
+            if model_pack not in self._task_files:
+                # First touch of this pack: identify all files in one pass
+                self._scan_pack(model_pack, list(modules), providers, det_size, ctx_id)
+            models = {
+                task: self.get_model(task, det_size, model_pack, providers, ctx_id)
+                for task in modules
+                if task in self._task_files[model_pack]
+            }
+        return SharedFaceAnalysis(models, det_size)
+
+    # ------------------------------------------------------------------
+    # Reporting
+    # ------------------------------------------------------------------
+    def memory_report(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [loaded.describe() for loaded in self._models.values()]
+
+    def log_memory_report(self) -> None:
+        report = self.memory_report()
+        total_mb = round(sum(item['rss_delta_mb'] for item in report), 1)
+        for item in report:
+            logger.info(f"   • {item['task']:<16} {item['file']:<18} det_size={item['det_size']} "
+                        f"rss≈{item['rss_delta_mb']} MB file={item['file_mb']} MB")
+        logger.info(f"📊 Face model registry: {len(report)} model(s), ≈{total_mb} MB resident (pid {self._pid})")
+        logger.info(f"⚙️ ONNX Runtime sessions: {session_config()}")
+
+
+# Singleton instance shared by every face service in this process
+face_model_registry = FaceModelRegistry(
+    share_after_fork=getattr(settings, 'face_models_share_after_fork', False)
+)
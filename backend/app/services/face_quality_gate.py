@@ -0,0 +1,156 @@
+"""
+Pre-embedding face quality gate.
+
+Runs on the detector output and a small grayscale crop of the face, before
+alignment, liveness and ArcFace, so frames that would fail anyway never reach
+the expensive models:
+
+1. ``size``     - face box smaller than MIN_FACE_PIXEL_SIZE
+2. ``area``     - face covers less than MIN_FACE_AREA_PERCENT or more than
+   MAX_FACE_AREA_PERCENT of the frame
+3. ``center``   - face centre further than MAX_CENTER_OFFSET from the frame centre
+4. ``blur``     - Laplacian variance of the crop below QUALITY_MIN_SHARPNESS
+5. ``exposure`` - mean brightness of the crop outside QUALITY_MIN/MAX_BRIGHTNESS
+
+Endpoints pick their checks in QUALITY_GATE_POLICIES. Every rejection is
+credited with the recent mean time of the stages it skipped (from face_metrics),
+so the stats show how much inference the gate saved and why frames were refused.
+"""
+
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+from app.core.config import settings
+from app.core.face_constants import (
+    MIN_FACE_PIXEL_SIZE,
+    MIN_FACE_AREA_PERCENT,
+    MAX_FACE_AREA_PERCENT,
+    MAX_CENTER_OFFSET,
+    QUALITY_GATE_POLICIES,
+    QUALITY_MIN_SHARPNESS,
+    QUALITY_MIN_BRIGHTNESS,
+    QUALITY_MAX_BRIGHTNESS,
+)
+from app.services.face_metrics import face_metrics
+from app.services.liveness_service import liveness_required
+
+CROP_SIZE = 96  # Face box is resized to this before the blur/exposure checks
+SKIPPED_STAGES = ("alignment", "embedding")  # Work a rejected frame never reaches
+
+
+@dataclass
+class QualityResult:
+    """Outcome of the gate; ``reason`` is the check that refused the frame ("ok" if none)."""
+    passed: bool
+    reason: str
+    message: str
+    measurements: Dict[str, float] = field(default_factory=dict)
+    saved_ms: float = 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "passed": self.passed,
+            "reason": self.reason,
+            "message": self.message,
+            "measurements": self.measurements,
+            "saved_ms": self.saved_ms,
+        }
+
+
+def face_crop_stats(image: np.ndarray, bbox: Sequence[float], size: int = CROP_SIZE) -> Tuple[float, float]:
+    """(Laplacian variance, mean brightness) of the face box resized to ``size``."""
+    h, w = image.shape[:2]
+    x1, y1, x2, y2 = bbox
+    face = image[max(0, int(y1)):min(h, int(y2)), max(0, int(x1)):min(w, int(x2))]
+    if face.size == 0:
+        return 0.0, 0.0
+    gray = cv2.cvtColor(cv2.resize(face, (size, size), interpolation=cv2.INTER_AREA), cv2.COLOR_BGR2GRAY)
+    sharpness = float(cv2.Laplacian(gray, cv2.CV_64F).var())
+    return sharpness, float(gray.mean())
+
+
+class FaceQualityGate:
+    """Cheap framing/blur/exposure checks on a detected face."""
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._stats_lock = threading.Lock()
+        self._decisions: Dict[str, int] = {}
+        self._saved_ms = 0.0
+
+    def required(self, policy: Optional[str]) -> bool:
+        return self.enabled and bool(QUALITY_GATE_POLICIES.get(policy))
+
+    def check(self, image: np.ndarray, face_data: Dict[str, Any], policy: Optional[str]) -> Optional[QualityResult]:
+        """Run the policy's checks on one detected face (None when the policy is not gated)."""
+        if not self.required(policy):
+            return None
+        with face_metrics.timed("quality_gate"):
+            result = self._run_checks(image, face_data, QUALITY_GATE_POLICIES[policy])
+        if not result.passed:
+            skipped = SKIPPED_STAGES + (("liveness",) if liveness_required(policy) else ())
+            result.saved_ms = round(sum(face_metrics.recent_mean(stage) for stage in skipped), 3)
+        self._record(result)
+        return result
+
+    def _run_checks(self, image: np.ndarray, face_data: Dict[str, Any], checks: Sequence[str]) -> QualityResult:
+        image_height, image_width = image.shape[:2]
+        x1, y1, x2, y2 = face_data['bbox']
+        face_width, face_height = x2 - x1, y2 - y1
+        measurements: Dict[str, float] = {}
+
+        if "size" in checks and (face_width < MIN_FACE_PIXEL_SIZE or face_height < MIN_FACE_PIXEL_SIZE):
+            return QualityResult(False, "size", f"Face too small ({face_width:.0f}x{face_height:.0f}px). Please move closer to camera.")
+
+        if "area" in checks:
+            face_percentage = face_width * face_height / (image_width * image_height) * 100
+            measurements["area_percent"] = round(face_percentage, 2)
+            if face_percentage < MIN_FACE_AREA_PERCENT:
+                return QualityResult(False, "area", f"Face too small in frame ({face_percentage:.1f}%). Please move closer.", measurements)
+            if face_percentage > MAX_FACE_AREA_PERCENT:
+                return QualityResult(False, "area", f"Face too large in frame ({face_percentage:.1f}%). Please move back.", measurements)
+
+        if "center" in checks:
+            offset_x = abs((x1 + x2) / 2 - image_width / 2) / image_width
+            offset_y = abs((y1 + y2) / 2 - image_height / 2) / image_height
+            if offset_x > MAX_CENTER_OFFSET or offset_y > MAX_CENTER_OFFSET:
+                return QualityResult(False, "center", "Please center your face in the camera frame.", measurements)
+
+        if "blur" in checks or "exposure" in checks:
+            sharpness, brightness = face_crop_stats(image, face_data['bbox'])
+            measurements.update(sharpness=round(sharpness, 1), brightness=round(brightness, 1))
+            if "blur" in checks and sharpness < QUALITY_MIN_SHARPNESS:
+                return QualityResult(False, "blur", "Image is too blurry. Hold still and make sure the camera is in focus.", measurements)
+            if "exposure" in checks and brightness < QUALITY_MIN_BRIGHTNESS:
+                return QualityResult(False, "exposure", "Face is too dark. Please improve the lighting.", measurements)
+            if "exposure" in checks and brightness > QUALITY_MAX_BRIGHTNESS:
+                return QualityResult(False, "exposure", "Face is overexposed. Avoid strong light behind the camera.", measurements)
+
+        return QualityResult(True, "ok", "Face quality check passed.", measurements)
+
+    def _record(self, result: QualityResult) -> None:
+        with self._stats_lock:
+            self._decisions[result.reason] = self._decisions.get(result.reason, 0) + 1
+            self._saved_ms += result.saved_ms
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            decisions = dict(self._decisions)
+            saved_ms = self._saved_ms
+        rejected = sum(count for reason, count in decisions.items() if reason != "ok")
+        return {
+            "enabled": self.enabled,
+            "policies": {policy: list(checks) for policy, checks in QUALITY_GATE_POLICIES.items()},
+            "decisions": decisions,
+            "rejected": rejected,
+            "estimated_saved_ms": round(saved_ms, 1),
+            "latency": face_metrics.snapshot()["stages"].get("quality_gate"),
+        }
+
+
+# Global instance
+face_quality_gate = FaceQualityGate(enabled=getattr(settings, 'face_quality_gate_enabled', True))
@@ -1,6 +1,5 @@
 import cv2
 import numpy as np
-import insightface
 import base64
 from typing import Optional, List, Tuple
 from io import BytesIO
@@ -18,21 +17,36 @@ from app.schemas import FaceRecognitionResponse
 from sqlalchemy import text
 from sqlalchemy.orm import Session
 import logging
-import onnxruntime as ort
+from app.services.face_model_registry import face_model_registry
+from app.services.face_embedding_store import NEAREST_VECTOR_SQL, face_embedding_store, nearest_vector_params, resolve_embedding
 
 logger = logging.getLogger(__name__)
 
 class FaceRecognitionService:
     def __init__(self):
         self.tolerance = getattr(settings, 'face_recognition_tolerance', SIMILARITY_THRESHOLD)
-        # Initialize InsightFace model
-        self.app = insightface.app.FaceAnalysis(
+        self._app = self._load_app()
+        face_model_registry.register_fork_reset(self._reset_after_fork)
+        logger.info("InsightFace model initialized successfully")
+    
+    @staticmethod
+    def _load_app():
+        # Borrow detection + recognition sessions from the shared model registry
+        det_size = getattr(settings, 'insightface_det_size', 640)
+        return face_model_registry.get_analysis(
+            ['detection', 'recognition'],
+            det_size=det_size,
             providers=['CPUExecutionProvider'],  # Use CPU, can switch to CUDA if available
-            allowed_modules=['detection', 'recognition']
         )
-        det_size = getattr(settings, 'insightface_det_size', 640)
-        self.app.prepare(ctx_id=0, det_size=(det_size, det_size))
-        logger.info("InsightFace model initialized successfully")
+    
+    @property
+    def app(self):
+        if self._app is None:
+            self._app = self._load_app()  # Forked child: reload instead of using inherited sessions
+        return self._app
+    
+    def _reset_after_fork(self):
+        self._app = None
     
     def decode_base64_image(self, base64_string: str) -> np.ndarray:
         """Decode base64 string to OpenCV image."""
@@ -88,23 +102,15 @@ class FaceRecognitionService:
     ) -> Tuple[Optional[int], float]:
         """
         Find best matching student using pgvector similarity search.
-        Much faster than comparing each face individually.
+        Uses the indexed student_face_templates table; falls back to a numpy
+        scan over the binary embeddings when pgvector is not installed.
         """
         try:
-            # Convert encoding to PostgreSQL vector format
-            vector_str = f"[{','.join(map(str, unknown_encoding))}]"
-            
-            # Use cosine similarity to find closest match
-            # Lower distance = higher similarity
-            query = text("""
-                SELECT id, 1 - (face_encoding <=> :query_vector) as similarity
-                FROM students 
-                WHERE face_encoding IS NOT NULL
-                ORDER BY face_encoding <=> :query_vector
-                LIMIT 1
-            """)
-            
-            result = db.execute(query, {"query_vector": vector_str}).fetchone()
+            # Cosine distance on the pgvector templates, served by their ANN index
+            result = db.execute(
+                NEAREST_VECTOR_SQL,
+                nearest_vector_params(unknown_encoding, 1, face_embedding_store.max_templates)
+            ).fetchone()
             
             if result and result.similarity >= threshold:
                 return result.id, result.similarity * 100  # Convert to percentage
@@ -112,8 +118,19 @@ class FaceRecognitionService:
             return None, 0.0
             
         except Exception as e:
-            logger.error(f"Error in pgvector face matching: {str(e)}")
-            # Fallback to traditional method if pgvector fails
+            logger.warning(f"pgvector face matching unavailable, scanning embeddings: {str(e)}")
+            db.rollback()
+            known = self.get_all_student_encodings_optimized(db)
+            if not known:
+                return None, 0.0
+            ids = [student_id for student_id, _ in known]
+            matrix = np.asarray([encoding for _, encoding in known], dtype=np.float32)
+            matrix /= np.linalg.norm(matrix, axis=1, keepdims=True)
+            probe = np.asarray(unknown_encoding, dtype=np.float32)
+            scores = matrix @ (probe / np.linalg.norm(probe))
+            best = int(np.argmax(scores))
+            if scores[best] >= threshold:
+                return ids[best], float(scores[best]) * 100
             return None, 0.0
     
     def compare_faces(
@@ -255,17 +272,18 @@ class FaceRecognitionService:
         try:
             # Use optimized query to only get students with face encodings
             query = text("""
-                SELECT id, face_encoding 
+                SELECT id, face_embedding, face_encoding 
                 FROM students 
-                WHERE face_encoding IS NOT NULL
+                WHERE face_embedding IS NOT NULL OR face_encoding IS NOT NULL
             """)
             
             results = db.execute(query).fetchall()
             student_encodings = []
             
             for row in results:
-                if row.face_encoding:
-                    student_encodings.append((row.id, row.face_encoding))
+                embedding = resolve_embedding(row.face_embedding, row.face_encoding)
+                if embedding is not None:
+                    student_encodings.append((row.id, embedding.tolist()))
             
             logger.info(f"Loaded {len(student_encodings)} student face encodings")
             return student_encodings
@@ -0,0 +1,137 @@
+"""
+Lightweight IoU tracking of the live preview face across frames of one client session.
+
+Once a face has been identified with high similarity its box and result are kept
+as a track. On the next frames only the detector runs: if the single detected box
+overlaps the tracked box by at least ``iou_threshold`` the tracked identity is
+returned without aligning, embedding or searching the gallery. The face is
+re-embedded every ``reembed_frames`` frames, when the box moves or resizes too
+much, or when the track has not been seen for ``ttl_seconds``. Frames with no face
+or several faces drop the track, so a different person never inherits a label.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+from app.core.config import settings
+
+
+def box_iou(a: Sequence[float], b: Sequence[float]) -> float:
+    """Intersection over union of two [x1, y1, x2, y2] boxes."""
+    inter_w = min(a[2], b[2]) - max(a[0], b[0])
+    inter_h = min(a[3], b[3]) - max(a[1], b[1])
+    if inter_w <= 0 or inter_h <= 0:
+        return 0.0
+    inter = inter_w * inter_h
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return float(inter / union) if union > 0 else 0.0
+
+
+@dataclass
+class FaceTrack:
+    bbox: Sequence[float]
+    result: Any
+    similarity: float
+    frames_since_embed: int = 0
+    seen_at: float = 0.0
+
+
+class FaceTracker:
+    """One track per (client session, endpoint kind)."""
+
+    def __init__(self, iou_threshold: float = 0.6, min_similarity: float = 0.70,
+                 reembed_frames: int = 10, ttl_seconds: float = 3.0,
+                 max_sessions: int = 1000, enabled: bool = True):
+        self.iou_threshold = iou_threshold
+        self.min_similarity = min_similarity
+        self.reembed_frames = max(1, reembed_frames)
+        self.ttl_seconds = ttl_seconds
+        self.max_sessions = max(1, max_sessions)
+        self.enabled = enabled
+        self._tracks: "OrderedDict[Tuple[str, str], FaceTrack]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.reused = 0
+        self.embedded = 0
+        self.reembed_reasons: Dict[str, int] = {}
+
+    def lookup(self, session: Optional[str], kind: str, bbox: Sequence[float]) -> Optional[Any]:
+        """Tracked result when ``bbox`` continues a confident track; None means embed this frame."""
+        if not self.enabled or session is None:
+            return None
+        key = (session, kind)
+        with self._lock:
+            track = self._tracks.get(key)
+            if track is None:
+                reason = "new"
+            elif time.monotonic() - track.seen_at > self.ttl_seconds:
+                reason = "expired"
+            elif box_iou(track.bbox, bbox) < self.iou_threshold:
+                reason = "moved"
+            elif track.frames_since_embed + 1 >= self.reembed_frames:
+                reason = "interval"
+            else:
+                track.bbox = list(bbox)
+                track.frames_since_embed += 1
+                track.seen_at = time.monotonic()
+                self._tracks.move_to_end(key)
+                self.reused += 1
+                return track.result
+            self.embedded += 1
+            self.reembed_reasons[reason] = self.reembed_reasons.get(reason, 0) + 1
+        return None
+
+    def update(self, session: Optional[str], kind: str, bbox: Sequence[float],
+               result: Any, similarity: float) -> None:
+        """Start (or restart) a track after a fresh embedding; weak matches are not tracked."""
+        if not self.enabled or session is None:
+            return
+        if similarity < self.min_similarity:
+            self.drop(session, kind)
+            return
+        with self._lock:
+            self._tracks[(session, kind)] = FaceTrack(list(bbox), result, similarity, seen_at=time.monotonic())
+            self._tracks.move_to_end((session, kind))
+            while len(self._tracks) > self.max_sessions:
+                self._tracks.popitem(last=False)
+
+    def drop(self, session: Optional[str], kind: str) -> None:
+        """Lose the track (no face, several faces, poor quality, or not recognized)."""
+        if session is None:
+            return
+        with self._lock:
+            self._tracks.pop((session, kind), None)
+
+    def forget(self, session: str) -> None:
+        """Drop every track of a session (e.g. when its WebSocket closes)."""
+        with self._lock:
+            for key in [key for key in self._tracks if key[0] == session]:
+                del self._tracks[key]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            frames = self.reused + self.embedded
+            return {
+                "enabled": self.enabled,
+                "iou_threshold": self.iou_threshold,
+                "min_similarity": self.min_similarity,
+                "reembed_frames": self.reembed_frames,
+                "active_tracks": len(self._tracks),
+                "frames_reused": self.reused,
+                "frames_embedded": self.embedded,
+                "reuse_rate": round(self.reused / frames, 3) if frames else 0.0,
+                "reembed_reasons": dict(self.reembed_reasons),
+            }
+
+
+# Global instance
+face_tracker = FaceTracker(
+    iou_threshold=getattr(settings, 'face_tracking_iou_threshold', 0.6),
+    min_similarity=getattr(settings, 'face_tracking_min_similarity', 0.70),
+    reembed_frames=getattr(settings, 'face_tracking_reembed_frames', 10),
+    ttl_seconds=getattr(settings, 'face_tracking_ttl_seconds', 3.0),
+    max_sessions=getattr(settings, 'face_frame_cache_max_sessions', 1000),
+    enabled=getattr(settings, 'face_tracking_enabled', True),
+)
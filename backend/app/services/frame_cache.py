@@ -0,0 +1,141 @@
+"""
+Short-lived per-session cache of live preview results keyed by a perceptual frame hash.
+
+The webcam preview posts near-identical frames several times per second to
+``/detect-faces`` and ``/live-recognition`` (and streams them over the live
+WebSocket). Each client session remembers the dHash of the last frame that was
+actually analysed together with its response; a new frame within
+``max_distance`` bits of it, and younger than ``ttl_seconds``, gets that response
+back without decoding the full frame or running any model.
+
+The hash is a 32x32 difference hash computed from a 1/8-scale grayscale decode,
+which costs well under a millisecond for a 640x480 JPEG. Plain dHash bits flip at
+random on flat areas (walls, background) under sensor noise, so each horizontal
+gradient is coded as two bits - rising and falling by more than
+``GRADIENT_THRESHOLD`` - and flat cells hash to zero in both frames.
+"""
+
+import base64
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple, Union
+
+import cv2
+import numpy as np
+
+from app.core.config import settings
+
+HASH_SIZE = 32  # dHash grid; 2 * HASH_SIZE ** 2 bits
+GRADIENT_THRESHOLD = 2  # Gray levels a neighbouring cell must differ by to count as an edge
+
+
+def encoded_image_bytes(image_data: Union[str, bytes]) -> bytes:
+    """Raw encoded image bytes from an upload or a (data URL) base64 string."""
+    if isinstance(image_data, (bytes, bytearray, memoryview)):
+        return bytes(image_data)
+    if ',' in image_data:
+        image_data = image_data.split(',')[1]
+    try:
+        return base64.b64decode(image_data)
+    except Exception:
+        raise ValueError("Invalid image data")
+
+
+def frame_hash(image_data: bytes, hash_size: int = HASH_SIZE) -> Optional[np.ndarray]:
+    """Packed dHash bits of an encoded frame (None if it cannot be decoded)."""
+    gray = cv2.imdecode(np.frombuffer(image_data, dtype=np.uint8), cv2.IMREAD_REDUCED_GRAYSCALE_8)
+    if gray is None or gray.size == 0:
+        return None
+    small = cv2.resize(gray, (hash_size + 1, hash_size), interpolation=cv2.INTER_AREA).astype(np.int16)
+    gradient = small[:, 1:] - small[:, :-1]
+    return np.packbits(np.concatenate((
+        (gradient > GRADIENT_THRESHOLD).ravel(),
+        (gradient < -GRADIENT_THRESHOLD).ravel(),
+    )))
+
+
+def hamming_distance(a: np.ndarray, b: np.ndarray) -> int:
+    return int(np.unpackbits(np.bitwise_xor(a, b)).sum())
+
+
+class FrameResultCache:
+    """Last analysed frame hash and result per (client session, endpoint kind)."""
+
+    def __init__(self, ttl_seconds: float = 1.0, max_distance: int = 16,
+                 max_sessions: int = 1000, enabled: bool = True):
+        self.ttl_seconds = ttl_seconds
+        self.max_distance = max_distance
+        self.max_sessions = max(1, max_sessions)
+        self.enabled = enabled
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[np.ndarray, Any, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits: Dict[str, int] = {}
+        self._misses: Dict[str, int] = {}
+        self._evictions = 0
+
+    def lookup(self, session: str, kind: str, frame: Optional[np.ndarray]) -> Optional[Any]:
+        """Cached result if ``frame`` is close enough to the session's last analysed frame."""
+        if not self.enabled or frame is None:
+            return None
+        key = (session, kind)
+        with self._lock:
+            entry = self._entries.get(key)
+            hit = (
+                entry is not None
+                and time.monotonic() - entry[2] <= self.ttl_seconds
+                and hamming_distance(entry[0], frame) <= self.max_distance
+            )
+            counter = self._hits if hit else self._misses
+            counter[kind] = counter.get(kind, 0) + 1
+            if hit:
+                self._entries.move_to_end(key)
+                return entry[1]
+        return None
+
+    def store(self, session: str, kind: str, frame: Optional[np.ndarray], result: Any) -> None:
+        if not self.enabled or frame is None:
+            return
+        with self._lock:
+            self._entries[(session, kind)] = (frame, result, time.monotonic())
+            self._entries.move_to_end((session, kind))
+            while len(self._entries) > self.max_sessions:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def forget(self, session: str) -> None:
+        """Drop every entry of a session (e.g. when its WebSocket closes)."""
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == session]:
+                del self._entries[key]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            kinds = sorted(set(self._hits) | set(self._misses))
+            hits, misses = sum(self._hits.values()), sum(self._misses.values())
+            return {
+                "enabled": self.enabled,
+                "ttl_seconds": self.ttl_seconds,
+                "max_distance": self.max_distance,
+                "sessions": len(self._entries),
+                "hits": hits,
+                "misses": misses,
+                "hit_rate": round(hits / (hits + misses), 3) if hits + misses else 0.0,
+                "by_kind": {
+                    kind: {
+                        "hits": self._hits.get(kind, 0),
+                        "misses": self._misses.get(kind, 0),
+                    }
+                    for kind in kinds
+                },
+                "evictions": self._evictions,
+            }
+
+
+# Global instance
+frame_result_cache = FrameResultCache(
+    ttl_seconds=getattr(settings, 'face_frame_cache_ttl_seconds', 1.0),
+    max_distance=getattr(settings, 'face_frame_cache_max_distance', 16),
+    max_sessions=getattr(settings, 'face_frame_cache_max_sessions', 1000),
+    enabled=getattr(settings, 'face_frame_cache_enabled', True),
+)
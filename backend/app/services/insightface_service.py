@@ -1,14 +1,15 @@
 import cv2
 import numpy as np
 import base64
-from typing import Optional, List, Tuple, Dict, Any
+from typing import Optional, List, Tuple, Dict, Any, Sequence, Union
 from io import BytesIO
 from PIL import Image
-import insightface
-from insightface.app import FaceAnalysis
-from insightface.data import get_image as ins_get_image
-import onnxruntime as ort
 from app.core.config import settings
+from app.services.face_model_registry import face_model_registry, SharedFaceAnalysis
+from app.services.liveness_service import liveness_service, liveness_required
+from app.services.face_metrics import face_metrics
+from app.services.face_quality_gate import face_quality_gate
+from insightface.utils import face_align
 from app.core.face_constants import (
     DETECTION_MIN_CONFIDENCE,
     REGISTRATION_MIN_CONFIDENCE,
@@ -16,18 +17,106 @@ from app.core.face_constants import (
     LIVE_SIMILARITY_THRESHOLD,
     MIN_FACE_PIXEL_SIZE,
     MIN_FACE_AREA_PERCENT,
+    MAX_FACE_AREA_PERCENT,
+    MAX_CENTER_OFFSET,
     MAX_DECODE_DIMENSION,
     MIN_EMBEDDING_NORM,
+    DETECTION_LADDERS,
+    LADDER_MIN_FACE_PX,
+    ROI_HINT_PADDING,
+    ROI_HINT_DET_SIZE,
+    ROI_HINT_FAST_DET_SIZE,
+    ROI_HINT_FAST_MIN_CONFIDENCE,
+    ROI_HINT_MIN_IOU,
+    ROI_HINT_POLICIES,
 )
-from app.schemas import FaceRecognitionResponse
+from app.schemas import FaceRecognitionResponse, FaceBoxHint
+from app.services.face_tracker import box_iou
 import logging
 import os
+import threading
+import time
 
 logger = logging.getLogger(__name__)
 
 # Development mode flag - set to True for testing with mock faces
 DEVELOPMENT_MODE = getattr(settings, 'development_mode', True)
 
+# Named model profiles: which InsightFace modules each FaceAnalysis instance loads.
+# "recognition" is the attendance hot path (detector + ArcFace only) and is loaded at
+# startup; "attributes" supplies the landmark and genderage models behind FACE_ATTRIBUTES
+# and is only loaded the first time a caller asks for one of them.
+RECOGNITION_PROFILE = "recognition"
+ATTRIBUTES_PROFILE = "attributes"
+MODEL_PROFILES: Dict[str, List[str]] = {
+    RECOGNITION_PROFILE: ['detection', 'recognition'],
+    ATTRIBUTES_PROFILE: ['detection', 'genderage', 'landmark_2d_106'],
+}
+
+# Optional per-face attributes -> model task that produces them. They are only computed
+# when a caller asks for them via ``analyze_image(..., attributes=[...])``.
+FACE_ATTRIBUTES: Dict[str, str] = {
+    'age': 'genderage',
+    'gender': 'genderage',
+    'glasses': 'genderage',
+    'landmark_2d_106': 'landmark_2d_106',
+}
+ATTRIBUTE_TASKS = frozenset(FACE_ATTRIBUTES.values())
+
+EMBEDDING_UNCLEAR_MESSAGE = "Face features unclear. Please ensure good lighting and clear facial visibility."
+
+# libjpeg DCT-domain scale factor -> cv2.imdecode flag (non-JPEG input decodes at full size)
+JPEG_REDUCED_DECODE_FLAGS = {
+    1: cv2.IMREAD_COLOR,
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    8: cv2.IMREAD_REDUCED_COLOR_8,
+}
+
+class FaceAnalysisResult:
+    """
+    Result of running the face pipeline once on a single frame.
+    Detection, embeddings and attributes are computed together by ``analyze_image``
+    and reused by quality validation, embedding extraction and attribute lookups,
+    so callers never need to run ``FaceAnalysis.get`` twice on the same image.
+    """
+
+    def __init__(
+        self,
+        image_shape: Tuple[int, ...],
+        faces: List[Dict[str, Any]],
+        raw_faces: Optional[Dict[int, Any]] = None
+    ):
+        self.image_height, self.image_width = image_shape[:2]
+        self.faces = faces  # Sorted by detection confidence (highest first)
+        # InsightFace Face objects keyed by face_data['index'] (keypoints for alignment)
+        self.raw_faces = raw_faces or {}
+    
+    def raw_face(self, face_data: Dict[str, Any]):
+        """InsightFace Face object behind a face dict, or None (e.g. development mode)."""
+        return self.raw_faces.get(face_data.get('index'))
+
+    @property
+    def face_count(self) -> int:
+        return len(self.faces)
+
+    @property
+    def image_area(self) -> int:
+        return self.image_height * self.image_width
+
+    def largest_face(self) -> Optional[Dict[str, Any]]:
+        """Most prominent face (largest bounding box), or None if nothing was detected."""
+        if not self.faces:
+            return None
+        return max(self.faces, key=lambda f: f['area'])
+
+    def area_percentage(self, face_data: Dict[str, Any]) -> float:
+        """Percentage of the frame covered by the given face's bounding box."""
+        if not self.image_area:
+            return 0.0
+        return (face_data['area'] / self.image_area) * 100
+
+
 class InsightFaceService:
     """
     Enhanced face recognition service using InsightFace library.
@@ -37,17 +126,57 @@ class InsightFaceService:
     
     def __init__(self):
         """Initialize InsightFace service with optimized settings."""
-        self.app = None
+        self._profile_apps: Dict[str, SharedFaceAnalysis] = {}  # "recognition" is loaded at startup
+        self._profile_lock = threading.Lock()
+        self._reload_after_fork = False
         # Keep tolerance aligned with centralized constants for matching
         self.tolerance = getattr(settings, 'face_recognition_tolerance', SIMILARITY_THRESHOLD)
         # Minimum face detection confidence
         self.confidence_threshold = DETECTION_MIN_CONFIDENCE
         self.development_mode = DEVELOPMENT_MODE
+        # Decode timing and detection ladder usage (updated from inference threads)
+        self._stats_lock = threading.Lock()
+        self._decode_count = 0
+        self._decode_total_ms = 0.0
+        self._decode_max_ms = 0.0
+        self._decode_bytes = 0
+        self._decode_reductions: Dict[int, int] = {}
+        # Detection ladder usage per endpoint policy
+        self._ladder_stats: Dict[str, Dict[str, Any]] = {}
+        # Client face box hints: "used", "used_fast" or the reason for a full-frame fallback
+        self._hint_outcomes: Dict[str, int] = {}
+        # Set once warm_up() has run every session at its serving shapes
+        self.warmed_up = False
+        self.warmup_ms: Optional[float] = None
         
         if self.development_mode:
             logger.info("🚀 Running in DEVELOPMENT MODE - Mock face detection enabled")
         
         self.init_model()
+        face_model_registry.register_fork_reset(self._reset_after_fork)
+    
+    @property
+    def app(self) -> Optional[SharedFaceAnalysis]:
+        """Recognition profile (detector + ArcFace)."""
+        app = self._profile_apps.get(RECOGNITION_PROFILE)
+        if app is None and self._reload_after_fork:
+            app = self.get_app(RECOGNITION_PROFILE)
+        return app
+    
+    @app.setter
+    def app(self, app: Optional[SharedFaceAnalysis]) -> None:
+        if app is None:
+            self._profile_apps.pop(RECOGNITION_PROFILE, None)
+        else:
+            self._profile_apps[RECOGNITION_PROFILE] = app
+    
+    def _reset_after_fork(self) -> None:
+        """Drop the profile views holding the parent's ORT sessions; they reload on first use."""
+        self._profile_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._reload_after_fork = RECOGNITION_PROFILE in self._profile_apps
+        self._profile_apps = {}
+        self.warmed_up = False
     
     def _create_mock_face_data(self, image: np.ndarray) -> Dict[str, Any]:
         """Create mock face data for development testing."""
@@ -81,19 +210,25 @@ class InsightFaceService:
             'area': bbox_width * bbox_height,
         }
     
+    def _create_profile_app(self, profile: str, det_size: Optional[int] = None, ctx_id: int = 0) -> SharedFaceAnalysis:
+        """Borrow a profile's models from the shared registry (loaded once per process)."""
+        det_size = det_size or getattr(settings, 'insightface_det_size', 640)
+        app = face_model_registry.get_analysis(
+            MODEL_PROFILES[profile],
+            det_size=det_size,
+            providers=['CPUExecutionProvider'],  # Use CPU for better compatibility
+            ctx_id=ctx_id,
+        )
+        logger.info(f"✅ InsightFace '{profile}' profile ready - models: {list(app.models.keys())}")
+        return app
+    
     def init_model(self):
-        """Initialize the InsightFace model with error handling."""
+        """Initialize the InsightFace recognition profile with error handling."""
         try:
             logger.info("🔥 Initializing InsightFace model...")
             
-            # Initialize FaceAnalysis app with all modules for glasses detection
-            self.app = FaceAnalysis(
-                providers=['CPUExecutionProvider'],  # Use CPU for better compatibility
-                allowed_modules=None  # Load all modules including genderage for glasses detection
-            )
-            
-            # Prepare the model with context size
-            self.app.prepare(ctx_id=0, det_size=(640, 640))
+            # Only detection + recognition are needed on the attendance hot path
+            self.app = self._create_profile_app(RECOGNITION_PROFILE)
             
             logger.info("✅ InsightFace model initialized successfully!")
             logger.info(f"📊 Available models: {list(self.app.models.keys())}")
@@ -103,59 +238,108 @@ class InsightFaceService:
             logger.error("💡 Falling back to CPU-only mode...")
             
             try:
-                # Fallback to basic CPU setup with all modules
-                self.app = FaceAnalysis(providers=['CPUExecutionProvider'])
-                self.app.prepare(ctx_id=-1, det_size=(320, 320))  # Smaller size for CPU
-                logger.info("✅ InsightFace initialized in CPU fallback mode with all modules")
+                # Fallback to basic CPU setup with the recognition modules
+                self.app = self._create_profile_app(RECOGNITION_PROFILE, det_size=320, ctx_id=-1)  # Smaller size for CPU
+                logger.info("✅ InsightFace initialized in CPU fallback mode")
             except Exception as e2:
                 logger.error(f"❌ Complete InsightFace initialization failed: {str(e2)}")
                 self.app = None
                 raise RuntimeError("InsightFace could not be initialized")
     
-    def _extract_glasses_attribute(self, image: np.ndarray, face) -> Optional[int]:
+    def warm_up(self, runs: int = 2) -> Dict[str, Any]:
+        """
+        Run dummy inferences at every detector size and recognition batch size in use,
+        so ORT allocates its buffers before the first real request instead of during it.
+        """
+        start = time.perf_counter()
+        if not self.development_mode and self.app is not None and runs > 0:
+            det_size = self.app.det_size[0]
+            sizes = {det_size}
+            if self.app.dynamic_input:
+                sizes |= {rung for ladder in DETECTION_LADDERS.values() for rung in ladder}
+                sizes |= {ROI_HINT_DET_SIZE, ROI_HINT_FAST_DET_SIZE}
+            image = np.zeros((max(sizes), max(sizes), 3), dtype=np.uint8)
+            rec_size = self.app.models['recognition'].input_size[0]
+            crop = np.zeros((rec_size, rec_size, 3), dtype=np.uint8)
+            batch_sizes = sorted({1, max(1, getattr(settings, 'face_batch_max_size', 16))})
+            for _ in range(runs):
+                for size in sorted(sizes):
+                    self.app.detect(image, input_size=size)
+                for batch_size in batch_sizes:
+                    self.embed_aligned_batch([crop] * batch_size)
+                if liveness_required("mark_attendance"):
+                    liveness_service.warm_up()
+        self.warmup_ms = round((time.perf_counter() - start) * 1000, 1)
+        self.warmed_up = True
+        logger.info(f"🔥 Face models warmed up in {self.warmup_ms}ms")
+        return {"warmed_up": True, "warmup_ms": self.warmup_ms}
+    
+    def get_app(self, profile: str = RECOGNITION_PROFILE) -> Optional[SharedFaceAnalysis]:
+        """Return the FaceAnalysis instance for a profile, loading it on first use."""
+        if profile not in MODEL_PROFILES:
+            raise ValueError(f"Unknown model profile: {profile}")
+        
+        app = self._profile_apps.get(profile)
+        if app is not None:
+            return app
+        
+        with self._profile_lock:
+            app = self._profile_apps.get(profile)
+            if app is None:
+                logger.info(f"🔥 Lazily loading InsightFace '{profile}' profile...")
+                try:
+                    app = self._create_profile_app(profile)
+                except Exception as e:
+                    logger.error(f"❌ Failed to load '{profile}' profile: {str(e)}")
+                    return None
+                self._profile_apps[profile] = app
+        return app
+    
+    @staticmethod
+    def _glasses_from_genderage(attr_result) -> Optional[int]:
         """
-        Extract glasses attribute using the genderage model.
+        Read the glasses flag from a genderage output.
         The genderage model might output [age, gender, glasses] or just [age, gender].
         
         Returns:
             0 = no glasses, 1 = glasses, None = not supported
         """
-        try:
-            if self.development_mode:
-                # In development mode, return mock data
-                return 0  # No glasses for testing
-            
-            if 'genderage' not in self.app.models:
-                logger.warning("Genderage model not available for glasses detection")
-                return None
-            
-            genderage_model = self.app.models['genderage']
-            
-            # Get attribute predictions from the model
-            attr_result = genderage_model.get(image, face)
-            
-            # Log the raw result for debugging
-            logger.info(f"Genderage model output: {attr_result} (shape: {attr_result.shape if hasattr(attr_result, 'shape') else 'no shape'})")
-            
-            # Check if we have a third output that could be glasses
-            if hasattr(attr_result, '__len__') and len(attr_result) >= 3:
-                # Third value might be glasses (0 = no glasses, 1 = glasses)
-                glasses_value = attr_result[2]
-                
-                # Convert to binary (0 or 1)
-                if glasses_value > 0.5:
-                    return 1  # Glasses detected
-                else:
-                    return 0  # No glasses
-            else:
-                # Model doesn't provide glasses information
-                logger.info(f"Genderage model only provides {len(attr_result) if hasattr(attr_result, '__len__') else 'unknown'} outputs - no glasses attribute")
-                return None
-                
-        except Exception as e:
-            logger.error(f"Error extracting glasses attribute: {str(e)}")
-            return None
+        if hasattr(attr_result, '__len__') and len(attr_result) >= 3:
+            # Third value might be glasses (0 = no glasses, 1 = glasses)
+            return 1 if attr_result[2] > 0.5 else 0
+        return None
+    
+    def _run_attribute_models(self, image: np.ndarray, faces: List[Any], app: SharedFaceAnalysis,
+                              attributes: Sequence[str]) -> None:
+        """
+        Run the attribute models behind the requested attributes on already detected faces.
+        Models missing from ``app`` are taken from the lazily loaded attributes profile.
+        """
+        tasks = {FACE_ATTRIBUTES[name] for name in attributes}
+        for task in sorted(tasks):
+            model = app.models.get(task)
+            if model is None:
+                attributes_app = self.get_app(ATTRIBUTES_PROFILE)
+                model = attributes_app.models.get(task) if attributes_app is not None else None
+            if model is None:
+                logger.warning(f"⚠️ Attribute model '{task}' is not available")
+                continue
+            for face in faces:
+                try:
+                    attr_result = model.get(image, face)
+                except Exception as e:
+                    logger.error(f"Error running attribute model '{task}': {str(e)}")
+                    continue
+                if task == 'genderage':
+                    face['glasses'] = self._glasses_from_genderage(attr_result)
+                    logger.debug(f"Genderage model output: {attr_result}")
 
+    def decode_image(self, image_data: Union[str, bytes]) -> np.ndarray:
+        """Decode either a base64 string (JSON APIs) or raw encoded bytes (uploads) to BGR."""
+        if isinstance(image_data, (bytes, bytearray, memoryview)):
+            return self.decode_image_bytes(image_data)
+        return self.decode_base64_image(image_data)
+    
     def decode_base64_image(self, base64_string: str) -> np.ndarray:
         """Decode base64 string to OpenCV BGR image."""
         try:
@@ -164,77 +348,114 @@ class InsightFaceService:
                 base64_string = base64_string.split(',')[1]
             
             # Decode base64
-            image_data = base64.b64decode(base64_string)
-            
-            # Convert to PIL Image
-            pil_image = Image.open(BytesIO(image_data))
-            
-            # Convert to RGB then to BGR for OpenCV
-            rgb_image = pil_image.convert('RGB')
-            bgr_image = cv2.cvtColor(np.array(rgb_image), cv2.COLOR_RGB2BGR)
-            # Convert to numpy
-            arr = np.array(rgb_image)
-
-            # Optional downscale for performance if image is very large
-            h, w = arr.shape[:2]
+            with face_metrics.timed("base64_decode"):
+                image_data = base64.b64decode(base64_string)
+        except Exception as e:
+            logger.error(f"Error decoding base64 image: {str(e)}")
+            raise ValueError("Invalid image data")
+        
+        return self.decode_image_bytes(image_data)
+    
+    @staticmethod
+    def _jpeg_reduction(image_data: bytes) -> int:
+        """
+        Largest libjpeg DCT scale factor (1, 2, 4 or 8) that still leaves the
+        longest side at or above MAX_DECODE_DIMENSION. Only the JPEG header is read.
+        """
+        if image_data[:2] != b'\xff\xd8':
+            return 1
+        try:
+            longest = max(Image.open(BytesIO(image_data)).size)
+        except Exception:
+            return 1
+        for factor in (8, 4, 2):
+            if longest / factor >= MAX_DECODE_DIMENSION:
+                return factor
+        return 1
+    
+    def decode_image_bytes(self, image_data: bytes) -> np.ndarray:
+        """
+        Decode encoded image bytes (JPEG/PNG/...) to OpenCV BGR image.
+        Large JPEGs are decoded at 1/2, 1/4 or 1/8 scale in the DCT domain, and the
+        only colour conversion is libjpeg's YCbCr -> BGR.
+        """
+        start = time.perf_counter()
+        try:
+            # Decode straight from the buffer (no intermediate copies); OpenCV yields BGR
+            reduction = self._jpeg_reduction(image_data)
+            buffer = np.frombuffer(image_data, dtype=np.uint8)
+            bgr_image = cv2.imdecode(buffer, JPEG_REDUCED_DECODE_FLAGS[reduction])
+            
+            if bgr_image is None:
+                # Formats OpenCV cannot read (e.g. GIF) go through PIL
+                reduction = 1
+                rgb_image = Image.open(BytesIO(image_data)).convert('RGB')
+                bgr_image = cv2.cvtColor(np.asarray(rgb_image), cv2.COLOR_RGB2BGR)
+            
+            # Finish the remaining (< 2x) downscale on the already-reduced image
+            h, w = bgr_image.shape[:2]
             if max(h, w) > MAX_DECODE_DIMENSION:
                 scale = MAX_DECODE_DIMENSION / float(max(h, w))
                 new_w = int(w * scale)
                 new_h = int(h * scale)
-                arr = cv2.resize(arr, (new_w, new_h), interpolation=cv2.INTER_AREA)
-
-            bgr_image = cv2.cvtColor(arr, cv2.COLOR_RGB2BGR)
-            
-            return bgr_image
+                bgr_image = cv2.resize(bgr_image, (new_w, new_h), interpolation=cv2.INTER_AREA)
         
         except Exception as e:
-            logger.error(f"Error decoding base64 image: {str(e)}")
+            logger.error(f"Error decoding image bytes: {str(e)}")
             raise ValueError("Invalid image data")
+        
+        self._record_decode((time.perf_counter() - start) * 1000, reduction, len(image_data))
+        return bgr_image
+    
+    def _record_decode(self, decode_ms: float, reduction: int, size_bytes: int):
+        face_metrics.record("decode", decode_ms)
+        with self._stats_lock:
+            self._decode_count += 1
+            self._decode_total_ms += decode_ms
+            self._decode_max_ms = max(self._decode_max_ms, decode_ms)
+            self._decode_bytes += size_bytes
+            self._decode_reductions[reduction] = self._decode_reductions.get(reduction, 0) + 1
+    
+    def decode_stats(self) -> Dict[str, Any]:
+        """Image decode timings, reported separately from inference."""
+        with self._stats_lock:
+            count = self._decode_count
+            return {
+                "decoded_images": count,
+                "avg_decode_ms": round(self._decode_total_ms / count, 2) if count else 0.0,
+                "max_decode_ms": round(self._decode_max_ms, 2),
+                "avg_input_kb": round(self._decode_bytes / count / 1024, 1) if count else 0.0,
+                "dct_reductions": {f"1/{k}": v for k, v in sorted(self._decode_reductions.items())},
+                "max_decode_dimension": MAX_DECODE_DIMENSION,
+            }
     
-    def extract_face_features(self, image: np.ndarray) -> Optional[Dict[str, Any]]:
+    def extract_face_features(
+        self,
+        image: np.ndarray,
+        analysis: Optional[FaceAnalysisResult] = None
+    ) -> Optional[Dict[str, Any]]:
         """
         Extract face features using InsightFace.
-        Returns face embedding and additional face information.
+        Returns face embedding and additional face information for the largest face.
+        Pass a precomputed ``analysis`` to reuse an earlier pipeline run on the same frame.
         """
         try:
             if self.app is None:
                 logger.error("InsightFace model not initialized")
                 return None
             
-            if self.development_mode:
-                # In development mode, create mock face data
-                logger.info("🚀 DEVELOPMENT MODE: Using mock face detection")
-                face_info = self._create_mock_face_data(image)
-                logger.info(f"✅ Mock face created - Confidence: {face_info['confidence']:.3f}, "
-                           f"Embedding norm: {face_info['embedding_norm']:.3f}")
-                return face_info
-            
-            # Detect and analyze faces
-            faces = self.app.get(image)
+            if analysis is None:
+                analysis = self.analyze_image(image)
             
-            if not faces:
+            if not analysis.faces:
                 logger.warning("No faces detected in image")
                 return None
             
-            if len(faces) > 1:
-                logger.warning(f"Multiple faces detected ({len(faces)}), using the largest one")
-                # Use the face with largest bounding box area
-                faces = sorted(faces, key=lambda x: (x.bbox[2] - x.bbox[0]) * (x.bbox[3] - x.bbox[1]), reverse=True)
+            if analysis.face_count > 1:
+                logger.warning(f"Multiple faces detected ({analysis.face_count}), using the largest one")
             
             # Get the best face
-            face = faces[0]
-            
-            # Extract comprehensive face information
-            face_info = {
-                'embedding': face.embedding.tolist(),  # 512-dimensional embedding
-                'bbox': face.bbox.tolist(),  # [x1, y1, x2, y2]
-                'confidence': float(face.det_score),  # Detection confidence
-                'landmark_2d_106': face.landmark_2d_106.tolist() if hasattr(face, 'landmark_2d_106') else None,
-                'age': int(face.age) if hasattr(face, 'age') else None,
-                'gender': int(face.gender) if hasattr(face, 'gender') else None,
-                'glasses': self._extract_glasses_attribute(image, face),  # NEW: Glasses detection
-                'embedding_norm': float(np.linalg.norm(face.embedding)),
-            }
+            face_info = analysis.largest_face()
             
             logger.info(f"✅ Face extracted - Confidence: {face_info['confidence']:.3f}, "
                        f"Embedding norm: {face_info['embedding_norm']:.3f}")
@@ -299,6 +520,31 @@ class InsightFaceService:
             logger.error(f"Error comparing embeddings: {str(e)}")
             return False, 0.0, -1
     
+    def compare_normalized(
+        self,
+        known_templates: np.ndarray,
+        unknown_embedding: List[float]
+    ) -> Tuple[bool, float, int]:
+        """
+        compare_embeddings() for templates that are already L2-normalized (n, dim) float32
+        (see student_embedding_cache): one matrix-vector product, no per-template norms.
+        Returns: (is_match, best_similarity, best_match_index)
+        """
+        if known_templates is None or len(known_templates) == 0 or not unknown_embedding:
+            return False, 0.0, -1
+        probe = np.asarray(unknown_embedding, dtype=np.float32).reshape(-1)
+        norm = float(np.linalg.norm(probe))
+        if norm == 0.0 or probe.shape[0] != known_templates.shape[1]:
+            return False, 0.0, -1
+        similarities = known_templates @ (probe / norm)
+        best_index = int(np.argmax(similarities))
+        best_similarity = float(similarities[best_index])
+        similarity_percentage = best_similarity * 100
+        is_match = best_similarity > self.tolerance
+        logger.info(f"🔍 Face comparison - Best similarity: {similarity_percentage:.1f}%, "
+                   f"Threshold: {self.tolerance*100:.1f}%, Match: {is_match}")
+        return is_match, similarity_percentage, best_index
+    
     def process_attendance_image(
         self, 
         base64_image: str, 
@@ -309,7 +555,7 @@ class InsightFaceService:
             logger.info("🎯 Processing attendance image with InsightFace...")
             
             # Decode image
-            image = self.decode_base64_image(base64_image)
+            image = self.decode_image(base64_image)
             logger.info(f"📷 Image decoded - Shape: {image.shape}")
             
             # Extract face features
@@ -374,7 +620,7 @@ class InsightFaceService:
         try:
             logger.info("🔍 Validating face image quality...")
             
-            image = self.decode_base64_image(base64_image)
+            image = self.decode_image(base64_image)
             face_info = self.extract_face_features(image)
             
             if not face_info:
@@ -428,56 +674,203 @@ class InsightFaceService:
             "detection_model": detection_model,
             "recognition_model": recognition_model,
             "available_models": list(models.keys()),
+            "loaded_profiles": {name: list(app.models.keys()) for name, app in self._profile_apps.items()},
+            "shared_models": face_model_registry.memory_report(),
             "tolerance": str(self.tolerance),
             "confidence_threshold": str(self.confidence_threshold)
         }
     
-    def detect_faces(self, image: np.ndarray) -> List[Dict[str, Any]]:
+    def _build_face_data(self, face, index: int) -> Dict[str, Any]:
+        """Convert an InsightFace ``Face`` into the dict format used by routes.
+        Attributes that were not requested are returned as None."""
+        bbox = face.bbox.tolist()  # [x1, y1, x2, y2]
+        face_width = bbox[2] - bbox[0]
+        face_height = bbox[3] - bbox[1]
+        embedding = face.get('embedding')
+        landmarks = face.get('landmark_2d_106')
+        return {
+            'index': index,
+            'bbox': bbox,
+            'confidence': float(face.det_score),
+            'embedding': embedding.tolist() if embedding is not None else None,  # 512-dimensional embedding
+            'landmark_2d_106': landmarks.tolist() if landmarks is not None else None,
+            'age': int(face.age) if face.get('age') is not None else None,
+            'gender': int(face.gender) if face.get('gender') is not None else None,
+            'glasses': face.get('glasses'),
+            'embedding_norm': float(np.linalg.norm(embedding)) if embedding is not None else 0.0,
+            # Face geometry for quality assessment
+            'width': face_width,
+            'height': face_height,
+            'area': face_width * face_height,
+        }
+    
+    def _detect_with_ladder(self, app: SharedFaceAnalysis, image: np.ndarray, policy: Optional[str]):
         """
-        Detect all faces in an image and return detailed information.
-        Returns list of face data including bounding boxes and confidence scores.
+        Run the detector up the policy's ladder of input sizes (see DETECTION_LADDERS),
+        stopping at the first rung that finds a face big enough to trust.
+        """
+        ladder = DETECTION_LADDERS.get(policy) if policy else None
+        if not ladder or not app.dynamic_input:
+            ladder = (app.det_size[0],)
+        
+        longest_side = float(max(image.shape[:2]))
+        for rung_index, rung in enumerate(ladder):
+            bboxes, kpss = app.detect(image, input_size=rung)
+            if rung_index == len(ladder) - 1:
+                break
+            if bboxes.shape[0] == 0:
+                continue
+            # Short side of the best face as the detector saw it at this rung
+            sizes = np.minimum(bboxes[:, 2] - bboxes[:, 0], bboxes[:, 3] - bboxes[:, 1])
+            best = int(np.argmax(bboxes[:, 4]))
+            seen_px = sizes[best] * rung / longest_side
+            if bboxes[best, 4] >= DETECTION_MIN_CONFIDENCE and seen_px >= LADDER_MIN_FACE_PX:
+                break
+        
+        self._record_ladder(policy or "default", rung, rung_index)
+        return bboxes, kpss
+    
+    def _record_ladder(self, policy: str, rung: int, rung_index: int):
+        with self._stats_lock:
+            policy_stats = self._ladder_stats.setdefault(policy, {"rungs": {}, "escalated": 0, "total": 0})
+            policy_stats["rungs"][rung] = policy_stats["rungs"].get(rung, 0) + 1
+            policy_stats["total"] += 1
+            if rung_index > 0:
+                policy_stats["escalated"] += 1
+    
+    def detection_ladder_stats(self) -> Dict[str, Any]:
+        """How often each detection rung settled the frame, per endpoint policy."""
+        with self._stats_lock:
+            return {
+                policy: {
+                    "ladder": list(DETECTION_LADDERS.get(policy, ())),
+                    "rungs": {str(size): count for size, count in sorted(stats["rungs"].items())},
+                    "escalation_rate": round(stats["escalated"] / stats["total"], 3) if stats["total"] else 0.0,
+                    "frames": stats["total"],
+                }
+                for policy, stats in self._ladder_stats.items()
+            }
+    
+    def _detect_in_hint(self, app: SharedFaceAnalysis, image: np.ndarray, hint: FaceBoxHint):
+        """
+        Run the detector only on a padded crop around a client face box hint.
+        Returns full-frame (bboxes, kpss), or None when the hint did not hold up
+        (no confident face, a different face, or one cut off by the crop) so the
+        caller falls back to full-frame detection.
+        """
+        image_height, image_width = image.shape[:2]
+        hint_box = [hint.x * image_width, hint.y * image_height,
+                    (hint.x + hint.width) * image_width, (hint.y + hint.height) * image_height]
+        pad = ROI_HINT_PADDING * max(hint_box[2] - hint_box[0], hint_box[3] - hint_box[1])
+        left, top = int(max(0, hint_box[0] - pad)), int(max(0, hint_box[1] - pad))
+        right, bottom = int(min(image_width, hint_box[2] + pad)), int(min(image_height, hint_box[3] + pad))
+        if right - left < MIN_FACE_PIXEL_SIZE // 2 or bottom - top < MIN_FACE_PIXEL_SIZE // 2:
+            return self._record_hint("too_small")
+        
+        fast = hint.confidence is not None and hint.confidence >= ROI_HINT_FAST_MIN_CONFIDENCE
+        crop = image[top:bottom, left:right]
+        bboxes, kpss = app.detect(crop, input_size=ROI_HINT_FAST_DET_SIZE if fast else ROI_HINT_DET_SIZE)
+        if bboxes.shape[0] == 0:
+            return self._record_hint("no_face")
+        best = int(np.argmax(bboxes[:, 4]))
+        if bboxes[best, 4] < DETECTION_MIN_CONFIDENCE:
+            return self._record_hint("low_confidence")
+        
+        # Back to full-frame coordinates
+        bboxes[:, [0, 2]] += left
+        bboxes[:, [1, 3]] += top
+        if kpss is not None:
+            kpss[:, :, 0] += left
+            kpss[:, :, 1] += top
+        
+        x1, y1, x2, y2 = bboxes[best, :4]
+        if box_iou(bboxes[best, :4], hint_box) < ROI_HINT_MIN_IOU:
+            return self._record_hint("mismatch")
+        # A face running into a crop edge (that is not the frame edge) was cut off by a wrong hint
+        if ((left > 0 and x1 <= left + 1) or (top > 0 and y1 <= top + 1) or
+                (right < image_width and x2 >= right - 1) or (bottom < image_height and y2 >= bottom - 1)):
+            return self._record_hint("cut_off")
+        
+        self._record_hint("used_fast" if fast else "used")
+        return bboxes, kpss
+    
+    def _record_hint(self, outcome: str) -> None:
+        with self._stats_lock:
+            self._hint_outcomes[outcome] = self._hint_outcomes.get(outcome, 0) + 1
+        return None
+    
+    def roi_hint_stats(self) -> Dict[str, Any]:
+        """How often client face box hints replaced full-frame detection."""
+        with self._stats_lock:
+            outcomes = dict(self._hint_outcomes)
+        total = sum(outcomes.values())
+        used = outcomes.get("used", 0) + outcomes.get("used_fast", 0)
+        return {
+            "hints": total,
+            "used": used,
+            "used_fast": outcomes.get("used_fast", 0),
+            "fallbacks": {outcome: count for outcome, count in outcomes.items() if not outcome.startswith("used")},
+            "fallback_rate": round((total - used) / total, 3) if total else 0.0,
+        }
+    
+    def analyze_image(
+        self,
+        image: np.ndarray,
+        profile: str = RECOGNITION_PROFILE,
+        embed: bool = True,
+        policy: Optional[str] = None,
+        attributes: Sequence[str] = (),
+        roi_hint: Optional[FaceBoxHint] = None
+    ) -> FaceAnalysisResult:
+        """
+        Run the face pipeline exactly once on a frame.
+        Returns a FaceAnalysisResult holding every detected face (with embedding)
+        sorted by confidence, ready to be reused by all downstream checks.
+        ``profile`` selects which model set runs (see MODEL_PROFILES). With
+        ``embed=False`` the recognition model is skipped and embeddings are left as
+        None so they can be computed later (e.g. by the recognition micro-batcher).
+        ``policy`` names the endpoint's detection ladder in DETECTION_LADDERS.
+        ``attributes`` lists the optional FACE_ATTRIBUTES to compute (e.g. ``['glasses']``);
+        attribute models only run when asked for, everything else is left as None.
+        ``roi_hint`` is a client-detected face box: detection then runs on a padded crop
+        around it (so only faces in that region are seen), falling back to the full
+        frame when the hint turns out wrong. Policies outside ROI_HINT_POLICIES ignore it.
         """
+        unknown = set(attributes) - set(FACE_ATTRIBUTES)
+        if unknown:
+            raise ValueError(f"Unknown face attributes: {sorted(unknown)}")
+        
+        if roi_hint is not None and policy not in ROI_HINT_POLICIES:
+            self._record_hint("policy")  # Single-face check needs the whole frame
+            roi_hint = None
+        
         try:
-            if self.app is None:
-                logger.error("InsightFace model not initialized")
-                return []
-            
             if self.development_mode:
                 # In development mode, create mock face data
+                logger.info("🚀 DEVELOPMENT MODE: Using mock face detection")
                 face_info = self._create_mock_face_data(image)
-                return [face_info]
+                face_info['index'] = 0
+                return FaceAnalysisResult(image.shape, [face_info])
             
-            # Detect faces using InsightFace
-            faces = self.app.get(image)
+            app = self.get_app(profile)
+            if app is None:
+                logger.error("InsightFace model not initialized")
+                return FaceAnalysisResult(image.shape, [])
+            
+            # Detect (adaptive input size), then run the per-face models once
+            with face_metrics.timed("detection"):
+                detected = self._detect_in_hint(app, image, roi_hint) if roi_hint is not None else None
+                bboxes, kpss = detected if detected is not None else self._detect_with_ladder(app, image, policy)
+            with face_metrics.timed("attributes" if not embed else "attributes_and_embedding"):
+                skip_tasks = set(ATTRIBUTE_TASKS) if embed else set(ATTRIBUTE_TASKS) | {'recognition'}
+                faces = app.build_faces(image, bboxes, kpss, skip_tasks=skip_tasks)
+                if attributes and faces:
+                    self._run_attribute_models(image, faces, app, attributes)
+                face_list = [self._build_face_data(face, i) for i, face in enumerate(faces)]
             
             if not faces:
                 logger.info("No faces detected in image")
-                return []
-            
-            # Convert face data to detailed format
-            face_list = []
-            for i, face in enumerate(faces):
-                face_data = {
-                    'index': i,
-                    'bbox': face.bbox.tolist(),  # [x1, y1, x2, y2]
-                    'confidence': float(face.det_score),
-                    'embedding': face.embedding.tolist(),
-                    'landmark_2d_106': face.landmark_2d_106.tolist() if hasattr(face, 'landmark_2d_106') else None,
-                    'age': int(face.age) if hasattr(face, 'age') else None,
-                    'gender': int(face.gender) if hasattr(face, 'gender') else None,
-                    'glasses': self._extract_glasses_attribute(image, face),  # NEW: Glasses detection
-                    'embedding_norm': float(np.linalg.norm(face.embedding)),
-                }
-                
-                # Calculate face area for quality assessment
-                bbox = face_data['bbox']
-                face_width = bbox[2] - bbox[0]
-                face_height = bbox[3] - bbox[1]
-                face_data['width'] = face_width
-                face_data['height'] = face_height
-                face_data['area'] = face_width * face_height
-                
-                face_list.append(face_data)
+                return FaceAnalysisResult(image.shape, [])
             
             # Sort by confidence score (highest first)
             face_list.sort(key=lambda x: x['confidence'], reverse=True)
@@ -485,19 +878,99 @@ class InsightFaceService:
             logger.info(f"✅ Detected {len(face_list)} faces with confidences: "
                        f"{[f'{f['confidence']:.3f}' for f in face_list]}")
             
-            return face_list
+            return FaceAnalysisResult(image.shape, face_list, dict(enumerate(faces)))
         
         except Exception as e:
-            logger.error(f"Error detecting faces: {str(e)}")
-            return []
+            logger.error(f"Error analyzing image: {str(e)}")
+            return FaceAnalysisResult(image.shape, [])
+    
+    def align_face(self, image: np.ndarray, analysis: FaceAnalysisResult, face_data: Dict[str, Any]) -> Optional[np.ndarray]:
+        """Return the aligned recognition crop (e.g. 112x112) for a detected face."""
+        raw = analysis.raw_face(face_data)
+        if raw is None or raw.get('kps') is None:
+            return None
+        rec_model = self.app.models['recognition']
+        with face_metrics.timed("alignment"):
+            return face_align.norm_crop(image, landmark=raw.kps, image_size=rec_model.input_size[0])
+    
+    def embed_aligned_batch(self, crops: List[np.ndarray]) -> np.ndarray:
+        """Run the recognition model once over a batch of aligned crops -> (N, 512)."""
+        rec_model = self.app.models['recognition']
+        with face_metrics.timed("embedding"):
+            return rec_model.get_feat(list(crops))
     
-    def validate_face_quality(self, image: np.ndarray, face_data: Dict[str, Any]) -> Tuple[bool, str]:
+    def embed_face(self, image: np.ndarray, analysis: FaceAnalysisResult, face_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Embed a face detected with embed=False on this thread (no micro-batching)."""
+        if face_data['embedding'] is None:
+            crop = self.align_face(image, analysis, face_data)
+            if crop is not None:
+                self.attach_embedding(face_data, self.embed_aligned_batch([crop])[0])
+        return face_data
+    
+    def gate_face(self, image: np.ndarray, face_data: Dict[str, Any], policy: str) -> Optional[str]:
+        """
+        Run the pre-embedding quality gate and the liveness stage (when the policy requires
+        it) on a face detected with embed=False. Returns the refusal message, or None when
+        the face may be embedded; the stage results are kept in ``face_data['quality']``
+        and ``face_data['liveness']``.
+        """
+        quality = face_quality_gate.check(image, face_data, policy)
+        if quality is not None:
+            face_data['quality'] = quality.as_dict()
+            if not quality.passed:
+                logger.info(f"🛑 Quality gate rejected ({quality.reason}), saved ~{quality.saved_ms:.1f}ms")
+                return quality.message
+        if liveness_required(policy):
+            liveness = liveness_service.check(image, face_data['bbox'])
+            face_data['liveness'] = liveness.as_dict()
+            if not liveness.is_live:
+                logger.info(f"🛑 Liveness rejected at '{liveness.stage}' stage (score: {liveness.score})")
+                return liveness.message
+        return None
+    
+    def gate_and_embed(self, image: np.ndarray, analysis: FaceAnalysisResult,
+                       face_data: Dict[str, Any], policy: str) -> Tuple[bool, str]:
+        """
+        Run gate_face(), then embed and validate the face only if it passed; a refused
+        face is never embedded. Returns (is_valid, message) like validate_face_quality().
+        """
+        if face_data['embedding'] is None:
+            refusal = self.gate_face(image, face_data, policy)
+            if refusal is not None:
+                return False, refusal
+            self.embed_face(image, analysis, face_data)
+        return self.validate_face_quality(image, face_data)
+    
+    @staticmethod
+    def attach_embedding(face_data: Dict[str, Any], embedding: np.ndarray) -> Dict[str, Any]:
+        """Fill in a deferred embedding on a face dict produced with embed=False."""
+        embedding = np.asarray(embedding).reshape(-1)
+        face_data['embedding'] = embedding.tolist()
+        face_data['embedding_norm'] = float(np.linalg.norm(embedding))
+        return face_data
+    
+    def detect_faces(self, image: np.ndarray, profile: str = RECOGNITION_PROFILE) -> List[Dict[str, Any]]:
+        """
+        Detect all faces in an image and return detailed information.
+        Returns list of face data including bounding boxes and confidence scores.
+        """
+        return self.analyze_image(image, profile).faces
+    
+    @staticmethod
+    def embedding_usable(face_data: Dict[str, Any]) -> bool:
+        """Whether the face's embedding norm is high enough to trust its features."""
+        return face_data['embedding_norm'] >= MIN_EMBEDDING_NORM
+    
+    def validate_face_quality(self, image: np.ndarray, face_data: Dict[str, Any],
+                              check_embedding: bool = True) -> Tuple[bool, str]:
         """
         Validate if a detected face meets quality requirements for registration.
         
         Args:
             image: Original image array
             face_data: Face data from detect_faces()
+            check_embedding: Also require a usable embedding norm; pass False for a
+                face detected with embed=False and check ``embedding_usable()`` later
             
         Returns:
             (is_valid, message): Validation result and description
@@ -539,8 +1012,8 @@ class InsightFaceService:
             
             # Check embedding quality
             embedding_norm = face_data['embedding_norm']
-            if embedding_norm < MIN_EMBEDDING_NORM:
-                return False, "Face features unclear. Please ensure good lighting and clear facial visibility."
+            if check_embedding and not self.embedding_usable(face_data):
+                return False, EMBEDDING_UNCLEAR_MESSAGE
             
             # Check if face is reasonably centered
             bbox = face_data['bbox']
@@ -566,13 +1039,13 @@ class InsightFaceService:
             logger.error(f"Error validating face quality: {str(e)}")
             return False, "Error validating face quality. Please try again."
     
-    def process_multi_image_face_registration(self, base64_images: List[str]) -> Dict[str, Any]:
+    def process_multi_image_face_registration(self, base64_images: List[Union[str, bytes]]) -> Dict[str, Any]:
         """
         Process multiple face images for registration - provides more robust face encoding.
         Analyzes all images, validates quality, and creates a composite face profile.
         
         Args:
-            base64_images: List of Base64 encoded images (typically 3: center, left, right)
+            base64_images: List of Base64 encoded images or raw image bytes (typically 3: center, left, right)
             
         Returns:
             Dictionary with registration result and composite face data
@@ -589,6 +1062,7 @@ class InsightFaceService:
                 }
             
             all_face_data = []
+            valid_area_percentages = []
             valid_encodings = []
             image_results = []
             
@@ -598,10 +1072,11 @@ class InsightFaceService:
                 
                 try:
                     # Decode image
-                    image = self.decode_base64_image(base64_image)
+                    image = self.decode_image(base64_image)
                     
-                    # Detect faces
-                    detected_faces = self.detect_faces(image)
+                    # Detect first; the recognition model only runs on faces that pass the quality gate
+                    analysis = self.analyze_image(image, embed=False, policy="registration")
+                    detected_faces = analysis.faces
                     
                     image_result = {
                         'image_index': i,
@@ -618,19 +1093,25 @@ class InsightFaceService:
                     else:
                         face_data = detected_faces[0]
                         
-                        # Validate face quality
-                        is_valid, validation_message = self.validate_face_quality(image, face_data)
+                        # Validate face quality (cheap checks before embedding)
+                        is_valid, validation_message = self.gate_and_embed(image, analysis, face_data, "registration")
+                        
+                        area_percentage = analysis.area_percentage(face_data)
                         
                         image_result['valid'] = is_valid
                         image_result['message'] = validation_message
                         image_result['face_data'] = {
                             'confidence': face_data['confidence'],
-                            'area_percentage': (face_data['area'] / (image.shape[0] * image.shape[1])) * 100,
+                            'area_percentage': area_percentage,
                             'bbox': face_data['bbox']
                         }
                         
+                        if face_data.get('liveness'):
+                            image_result['liveness'] = face_data['liveness']
+                        
                         if is_valid:
                             all_face_data.append(face_data)
+                            valid_area_percentages.append(area_percentage)
                             valid_encodings.append(face_data['embedding'])
                     
                     image_results.append(image_result)
@@ -660,7 +1141,7 @@ class InsightFaceService:
             # Create composite encoding from multiple valid images
             if valid_count == 1:
                 # Use single encoding
-                composite_encoding = valid_encodings[0]
+                composite_encoding = np.asarray(valid_encodings[0])
                 logger.info("📊 Using single valid encoding")
             else:
                 # Average multiple encodings for more robust representation
@@ -669,11 +1150,15 @@ class InsightFaceService:
                 composite_encoding = composite_encoding / np.linalg.norm(composite_encoding)
                 logger.info(f"📊 Created composite encoding from {valid_count} images")
             
+            # Keep the per-image embeddings as separate templates (best detections first)
+            # so matching can take the max over poses instead of relying on the average
+            max_templates = getattr(settings, 'face_max_templates', 5)
+            template_order = np.argsort([-fd['confidence'] for fd in all_face_data])[:max_templates]
+            templates = [valid_encodings[i] for i in template_order]
+            
             # Calculate quality metrics
             avg_confidence = np.mean([fd['confidence'] for fd in all_face_data])
-            avg_area_percentage = np.mean([(fd['area'] / (image.shape[0] * image.shape[1])) * 100 
-                                         for fd, image in zip(all_face_data, 
-                                         [self.decode_base64_image(img) for img in base64_images[:valid_count]])])
+            avg_area_percentage = np.mean(valid_area_percentages)
             
             success_message = f"Successfully processed {valid_count}/{len(base64_images)} images. "
             if valid_count >= 2:
@@ -691,9 +1176,11 @@ class InsightFaceService:
                     'avg_confidence': avg_confidence,
                     'avg_area_percentage': avg_area_percentage,
                     'embedding_dimensions': len(composite_encoding),
-                    'encoding_method': 'composite' if valid_count > 1 else 'single'
+                    'encoding_method': 'composite' if valid_count > 1 else 'single',
+                    'templates': len(templates)
                 },
-                'encoding': composite_encoding.tolist()  # Convert to list for JSON serialization
+                'encoding': composite_encoding.tolist(),  # Convert to list for JSON serialization
+                'templates': templates
             }
             
         except Exception as e:
@@ -705,7 +1192,7 @@ class InsightFaceService:
                 'encoding': None
             }
     
-    def process_face_registration(self, base64_image: str) -> Dict[str, Any]:
+    def process_face_registration(self, base64_image: Union[str, bytes]) -> Dict[str, Any]:
         """
         Complete face registration processing - detection, validation, and encoding extraction.
         This replaces all frontend MediaPipe functionality.
@@ -717,11 +1204,12 @@ class InsightFaceService:
             logger.info("🎯 Processing face registration with backend-only approach...")
             
             # 1. Decode the image
-            image = self.decode_base64_image(base64_image)
+            image = self.decode_image(base64_image)
             logger.info(f"📷 Image decoded - Shape: {image.shape}")
             
-            # 2. Detect all faces in the image
-            detected_faces = self.detect_faces(image)
+            # 2. Detect all faces in the image (embedding deferred until the face passes the quality gate)
+            analysis = self.analyze_image(image, embed=False, policy="registration")
+            detected_faces = analysis.faces
             
             if len(detected_faces) == 0:
                 return {
@@ -744,17 +1232,20 @@ class InsightFaceService:
             # 3. Get the single detected face
             face_data = detected_faces[0]
             
-            # 4. Validate face quality
-            is_valid, validation_message = self.validate_face_quality(image, face_data)
+            # 4. Validate face quality and liveness (a photo or screen is refused before embedding)
+            is_valid, validation_message = self.gate_and_embed(image, analysis, face_data, "registration")
             
             if not is_valid:
-                return {
+                result = {
                     'success': False,
                     'message': validation_message,
                     'faces_detected': 1,
                     'face_data': face_data,
                     'encoding': None
                 }
+                if face_data.get('liveness'):
+                    result['liveness'] = face_data['liveness']
+                return result
             
             # 5. Extract face encoding (already available in face_data)
             face_encoding = face_data['embedding']
@@ -769,7 +1260,7 @@ class InsightFaceService:
                     'confidence': face_data['confidence'],
                     'width': face_data['width'],
                     'height': face_data['height'],
-                    'area_percentage': (face_data['area'] / (image.shape[0] * image.shape[1])) * 100,
+                    'area_percentage': analysis.area_percentage(face_data),
                     'embedding_dimensions': len(face_encoding),
                     'embedding_norm': face_data['embedding_norm']
                 },
@@ -805,6 +1296,7 @@ class InsightFaceService:
 try:
     insightface_service = InsightFaceService()
     logger.info("🔥 InsightFace service initialized successfully!")
+    face_model_registry.log_memory_report()
 except Exception as e:
     logger.error(f"❌ Failed to initialize InsightFace service: {str(e)}")
     insightface_service = None
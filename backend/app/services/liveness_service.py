@@ -0,0 +1,244 @@
+"""
+CPU liveness (anti-spoofing) stage for face attendance.
+
+Runs between detection and embedding, on the detected face only, as a cascade:
+
+1. ``size``   - reject faces too small to carry usable skin texture
+2. ``glare``  - reject crops with a large clipped-white area (phone screens, glossy prints)
+3. ``model``  - MiniFASNetV2 (``models/anti_spoof_2.7.pth`` exported to ONNX by
+   ``scripts/export_anti_spoof_onnx.py``) on an 80x80 crop with 2.7x face context
+
+The cheap stages run in well under a millisecond and stop obvious failures before
+the network runs. Endpoints opt in through LIVENESS_POLICIES, so the live preview
+skips the stage entirely.
+
+The ONNX file is not in the repository (the Docker build exports it). Until it
+exists the model stage is skipped with a warning and the file is looked for again
+every MODEL_RECHECK_SECONDS; set ``face_liveness_require_model`` to reject faces
+instead. A file that exists but fails to load rejects every face (fail closed)
+unless ``face_liveness_fail_open`` is set.
+"""
+
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional, Sequence
+
+import cv2
+import numpy as np
+import onnxruntime as ort
+
+from app.core.config import settings
+from app.core.face_constants import (
+    LIVENESS_POLICIES,
+    LIVENESS_MIN_FACE_PX,
+    LIVENESS_MAX_GLARE_FRACTION,
+    LIVENESS_REAL_THRESHOLD,
+)
+from app.services.face_metrics import LatencyWindow, face_metrics
+from app.services.face_model_registry import build_session_options, face_model_registry
+
+logger = logging.getLogger(__name__)
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+MODEL_INPUT_SIZE = 80
+MODEL_CROP_SCALE = 2.7  # Face box is enlarged 2.7x for context, as the model was trained
+REAL_CLASS = 1  # Output classes: 0 print/replay attack, 1 real, 2 other attack
+GLARE_LEVEL = 250  # Grayscale value counted as clipped highlight
+MODEL_RECHECK_SECONDS = 60.0  # How often a missing model file is looked for again
+
+
+@dataclass
+class LivenessResult:
+    """Outcome of one liveness check; ``stage`` is where the cascade decided."""
+    is_live: bool
+    stage: str
+    message: str
+    score: Optional[float] = None  # "Real" probability when the model ran
+    timings_ms: Dict[str, float] = field(default_factory=dict)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "is_live": self.is_live,
+            "stage": self.stage,
+            "message": self.message,
+            "score": self.score,
+            "timings_ms": self.timings_ms,
+        }
+
+
+def liveness_required(policy: Optional[str]) -> bool:
+    """Whether an endpoint policy runs the liveness stage."""
+    return bool(getattr(settings, 'face_liveness_enabled', True) and LIVENESS_POLICIES.get(policy, False))
+
+
+def crop_with_context(image: np.ndarray, bbox: Sequence[float], scale: float = MODEL_CROP_SCALE,
+                      size: int = MODEL_INPUT_SIZE) -> np.ndarray:
+    """Square-ish crop of the face box enlarged by ``scale`` (shrunk to fit the frame), resized to ``size``."""
+    src_h, src_w = image.shape[:2]
+    x1, y1, x2, y2 = bbox
+    box_w, box_h = max(1.0, x2 - x1), max(1.0, y2 - y1)
+    scale = min((src_h - 1) / box_h, (src_w - 1) / box_w, scale)
+    new_w, new_h = box_w * scale, box_h * scale
+    center_x, center_y = x1 + box_w / 2, y1 + box_h / 2
+
+    left = max(0.0, center_x - new_w / 2)
+    top = max(0.0, center_y - new_h / 2)
+    right = min(src_w - 1.0, left + new_w)
+    bottom = min(src_h - 1.0, top + new_h)
+    # Shift back inside the frame instead of clipping the context away
+    left, top = max(0.0, right - new_w), max(0.0, bottom - new_h)
+
+    crop = image[int(top):int(bottom) + 1, int(left):int(right) + 1]
+    return cv2.resize(crop, (size, size))
+
+
+class LivenessService:
+    """Cascaded anti-spoofing check on one detected face."""
+
+    def __init__(self, model_path: str, threshold: float = LIVENESS_REAL_THRESHOLD, fail_open: bool = False,
+                 require_model: bool = False):
+        self.model_path = model_path if os.path.isabs(model_path) else os.path.join(BACKEND_DIR, model_path)
+        self.threshold = threshold
+        self.fail_open = fail_open
+        self.require_model = require_model
+        self._session: Optional[ort.InferenceSession] = None
+        self._input_name: Optional[str] = None
+        self._load_lock = threading.Lock()
+        self._load_attempted = False
+        self._model_missing = False
+        self._next_check = 0.0
+        self._stats_lock = threading.Lock()
+        self._decisions: Dict[str, int] = {}
+        self._timings = LatencyWindow()
+        face_model_registry.register_fork_reset(self._reset_after_fork)
+
+    def _reset_after_fork(self) -> None:
+        """Forget the parent's ORT session; the child loads its own on first use."""
+        self._load_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._session = None
+        self._input_name = None
+        self._load_attempted = False
+        self._model_missing = False
+
+    @property
+    def model_available(self) -> bool:
+        return self._get_session() is not None
+
+    def _get_session(self) -> Optional[ort.InferenceSession]:
+        if self._load_attempted and not self._recheck_due():
+            return self._session
+        with self._load_lock:
+            if not self._load_attempted or self._recheck_due():
+                self._load()
+        return self._session
+
+    def _recheck_due(self) -> bool:
+        return self._model_missing and time.monotonic() >= self._next_check
+
+    def _load(self) -> None:
+        self._load_attempted = True
+        self._model_missing = not os.path.exists(self.model_path)
+        if self._model_missing:
+            self._next_check = time.monotonic() + MODEL_RECHECK_SECONDS
+            logger.warning(f"⚠️ Liveness model not found at {self.model_path} - "
+                           f"run scripts/export_anti_spoof_onnx.py; "
+                           + ("faces on liveness-enforcing endpoints are rejected" if self.require_model
+                              else "anti-spoof model stage SKIPPED, only size/glare checks run"))
+            return
+        try:
+            self._session = ort.InferenceSession(
+                self.model_path, sess_options=build_session_options(),
+                providers=['CPUExecutionProvider'],
+            )
+            self._input_name = self._session.get_inputs()[0].name
+            logger.info(f"✅ Liveness model loaded from {self.model_path}")
+        except Exception as e:
+            logger.error(f"❌ Failed to load liveness model: {str(e)} - "
+                         + ("model stage skipped (fail open)" if self.fail_open
+                            else "faces on liveness-enforcing endpoints are rejected"))
+
+    def warm_up(self) -> None:
+        session = self._get_session()
+        if session is not None:
+            session.run(None, {self._input_name: np.zeros((1, 3, MODEL_INPUT_SIZE, MODEL_INPUT_SIZE), np.float32)})
+
+    def check(self, image: np.ndarray, bbox: Sequence[float]) -> LivenessResult:
+        """Run the cascade on one face box ([x1, y1, x2, y2] in image pixels)."""
+        timings: Dict[str, float] = {}
+        result = self._run_cascade(image, bbox, timings)
+        result.timings_ms = {stage: round(ms, 3) for stage, ms in timings.items()}
+        result.timings_ms["total"] = round(sum(timings.values()), 3)
+        face_metrics.record("liveness", result.timings_ms["total"])
+        self._record(result)
+        return result
+
+    def _run_cascade(self, image: np.ndarray, bbox: Sequence[float], timings: Dict[str, float]) -> LivenessResult:
+        # Stage 1: face size
+        start = time.perf_counter()
+        x1, y1, x2, y2 = bbox
+        short_side = min(x2 - x1, y2 - y1)
+        timings["size"] = (time.perf_counter() - start) * 1000
+        if short_side < LIVENESS_MIN_FACE_PX:
+            return LivenessResult(False, "size", "Face too small for liveness check. Please move closer.")
+
+        # Stage 2: clipped highlights on the face itself
+        start = time.perf_counter()
+        h, w = image.shape[:2]
+        face = image[max(0, int(y1)):min(h, int(y2)), max(0, int(x1)):min(w, int(x2))]
+        gray = cv2.cvtColor(cv2.resize(face, (64, 64)), cv2.COLOR_BGR2GRAY)
+        glare = float(np.count_nonzero(gray >= GLARE_LEVEL)) / gray.size
+        timings["glare"] = (time.perf_counter() - start) * 1000
+        if glare > LIVENESS_MAX_GLARE_FRACTION:
+            return LivenessResult(False, "glare", "Strong glare on the face. Avoid screens and direct light.")
+
+        # Stage 3: anti-spoof network
+        session = self._get_session()
+        if session is None:
+            skip = self.fail_open or (self._model_missing and not self.require_model)
+            if skip:
+                return LivenessResult(True, "unavailable", "Liveness model unavailable; check skipped.")
+            return LivenessResult(False, "unavailable", "Liveness check is unavailable right now. Please contact an administrator.")
+        start = time.perf_counter()
+        crop = crop_with_context(image, bbox)
+        blob = np.ascontiguousarray(crop.transpose(2, 0, 1)[None], dtype=np.float32)  # BGR, 0-255
+        probs = session.run(None, {self._input_name: blob})[0][0]
+        timings["model"] = (time.perf_counter() - start) * 1000
+        score = float(probs[REAL_CLASS])
+        if score < self.threshold:
+            return LivenessResult(False, "model", "Liveness check failed. Please use your live face, not a photo or screen.", score)
+        return LivenessResult(True, "model", "Live face confirmed.", score)
+
+    def _record(self, result: LivenessResult) -> None:
+        outcome = f"{result.stage}:{'pass' if result.is_live else 'reject'}"
+        with self._stats_lock:
+            self._decisions[outcome] = self._decisions.get(outcome, 0) + 1
+        self._timings.add(result.timings_ms)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            decisions = dict(self._decisions)
+        return {
+            "enabled": getattr(settings, 'face_liveness_enabled', True),
+            "model_available": self._session is not None,
+            "model_path": self.model_path,
+            "threshold": self.threshold,
+            "model_missing": self._model_missing,
+            "fail_open": self.fail_open,
+            "require_model": self.require_model,
+            "policies": dict(LIVENESS_POLICIES),
+            "decisions": decisions,
+            "latency": self._timings.snapshot(),
+        }
+
+
+# Global instance
+liveness_service = LivenessService(
+    getattr(settings, 'face_liveness_model_path', 'models/anti_spoof_2.7.onnx'),
+    threshold=getattr(settings, 'face_liveness_threshold', LIVENESS_REAL_THRESHOLD),
+    fail_open=getattr(settings, 'face_liveness_fail_open', False),
+    require_model=getattr(settings, 'face_liveness_require_model', False),
+)
@@ -0,0 +1,103 @@
+"""
+Per-student cache of normalized enrollment templates for 1:1 verification.
+
+``/mark-attendance`` and ``/verify-identity`` compare the probe with the logged-in
+student's own templates. Reading those from the Student row meant loading the
+face payload columns (legacy JSON included) on every request and rebuilding
+float arrays and norms for each comparison. Here each student's templates are
+kept as one L2-normalized float32 (n, 512) matrix, so verification is a single
+matrix-vector product against the unit-length probe.
+
+Entries are stamped with the row's ``updated_at`` and ``face_embedding_version``.
+Re-registration and the re-embedding switch both change the stamp, so a worker
+that did not handle the registration never serves the old templates; the worker
+that did also drops its entry right away.
+"""
+
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models import Student
+from app.services.face_embedding_store import EMBEDDING_DIM, face_embedding_store
+from app.services.face_gallery import normalize_templates
+
+# (updated_at, face_embedding_version) of the row the templates were read from
+Stamp = Tuple[Optional[datetime], Optional[str]]
+
+
+def student_stamp(student: Student) -> Stamp:
+    return (student.updated_at, student.face_embedding_version)
+
+
+class StudentEmbeddingCache:
+    """LRU of normalized template matrices keyed by student id."""
+
+    def __init__(self, max_students: int = 10000, max_templates: int = 5, enabled: bool = True):
+        self.max_students = max(1, max_students)
+        self.max_templates = max(1, max_templates)
+        self.enabled = enabled
+        self._entries: "OrderedDict[int, Tuple[Stamp, np.ndarray]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    async def get(self, db: AsyncSession, student: Student) -> Optional[np.ndarray]:
+        """Normalized (n, dim) templates of an enrolled student, or None if not registered."""
+        stamp = student_stamp(student)
+        if self.enabled:
+            with self._lock:
+                entry = self._entries.get(student.id)
+                if entry is not None and entry[0] == stamp:
+                    self._entries.move_to_end(student.id)
+                    self.hits += 1
+                    return entry[1]
+                self.misses += 1
+
+        templates_by_id = await face_embedding_store.load_templates(db, [student.id])
+        templates = normalize_templates(templates_by_id.get(student.id), EMBEDDING_DIM, self.max_templates)
+        if templates is None or not self.enabled:
+            return templates
+        templates.setflags(write=False)
+        with self._lock:
+            self._entries[student.id] = (stamp, templates)
+            self._entries.move_to_end(student.id)
+            while len(self._entries) > self.max_students:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return templates
+
+    def invalidate(self, student_id: int) -> None:
+        with self._lock:
+            self._entries.pop(student_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "students": len(self._entries),
+                "max_students": self.max_students,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "evictions": self.evictions,
+            }
+
+
+# Global instance
+student_embedding_cache = StudentEmbeddingCache(
+    max_students=getattr(settings, 'face_verification_cache_size', 10000),
+    max_templates=getattr(settings, 'face_max_templates', 5),
+    enabled=getattr(settings, 'face_verification_cache_enabled', True),
+)
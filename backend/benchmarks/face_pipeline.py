@@ -0,0 +1,289 @@
+"""
+Per-stage latency benchmark of the face pipeline, driven through InsightFaceService.
+
+Unlike /face-testing/batch-test (HTTP, wall-clock averages, at most 10 images)
+this runs in-process and times every stage of a request separately:
+
+* ``base64_decode``  - data URL / base64 string to encoded bytes
+* ``image_decode``   - encoded JPEG to BGR (with the reduced-scale decode)
+* ``detection``      - detector ladder and per-face attribute models (embed=False)
+* ``embedding``      - alignment plus one batched ArcFace call over the faces
+* ``gallery_search`` - one search per face in a synthetic gallery
+* ``total``          - the sum, per frame
+
+Scenes are generated for every ``--resolutions`` x ``--faces`` combination by
+tiling face crops from ``--fixtures`` (a directory of photos with one face each)
+onto a plain background, and every fixture is also run at its own resolution.
+Without fixtures the scenes contain no detectable faces; detection is still
+timed, and embedding is timed on blank crops (one per requested face) so its
+cost remains comparable.
+
+Each scenario reports p50/p95/p99 per stage and throughput per core (frames per
+second divided by the ORT intra-op threads, or the CPU count when left at 0).
+``--output`` writes the results as JSON; ``--compare`` prints p50/p95 deltas
+against an earlier JSON run, so regressions can be tracked across commits.
+
+Usage (from backend/):
+    python -m benchmarks.face_pipeline --fixtures path/to/faces --output bench.json
+    python -m benchmarks.face_pipeline --resolutions 640x480 --faces 1 --compare bench.json
+"""
+
+import argparse
+import base64
+import json
+import os
+import platform
+import subprocess
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from app.core.config import settings
+from app.services.face_gallery import EMBEDDING_DIM, FaceEmbeddingGallery
+from app.services.face_model_registry import session_config
+from app.services.frame_cache import encoded_image_bytes
+from app.services.insightface_service import insightface_service
+
+STAGES = ("base64_decode", "image_decode", "detection", "embedding", "gallery_search", "total")
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".webp")
+JPEG_QUALITY = 90
+BACKGROUND_GRAY = 128
+
+
+def load_fixtures(directory: Optional[str]) -> List[Tuple[str, np.ndarray]]:
+    if not directory:
+        return []
+    fixtures = []
+    for name in sorted(os.listdir(directory)):
+        if name.lower().endswith(IMAGE_EXTENSIONS):
+            image = cv2.imread(os.path.join(directory, name))
+            if image is not None:
+                fixtures.append((name, image))
+    return fixtures
+
+
+def face_crop(image: np.ndarray) -> np.ndarray:
+    """The fixture's most prominent face with generous context, or the whole image."""
+    analysis = insightface_service.analyze_image(image, embed=False)
+    face = analysis.largest_face()
+    if face is None:
+        return image
+    x1, y1, x2, y2 = face['bbox']
+    pad_w, pad_h = (x2 - x1) * 0.6, (y2 - y1) * 0.6
+    h, w = image.shape[:2]
+    return image[max(0, int(y1 - pad_h)):min(h, int(y2 + pad_h)), max(0, int(x1 - pad_w)):min(w, int(x2 + pad_w))]
+
+
+def compose_scene(width: int, height: int, faces: int, crops: List[np.ndarray]) -> np.ndarray:
+    """Plain background with ``faces`` fixture crops laid out on a grid."""
+    scene = np.full((height, width, 3), BACKGROUND_GRAY, dtype=np.uint8)
+    if faces == 0 or not crops:
+        return scene
+    cols = int(np.ceil(np.sqrt(faces)))
+    rows = int(np.ceil(faces / cols))
+    cell_w, cell_h = width // cols, height // rows
+    for i in range(faces):
+        crop = crops[i % len(crops)]
+        scale = min(cell_w / crop.shape[1], cell_h / crop.shape[0]) * 0.9
+        resized = cv2.resize(crop, (max(1, int(crop.shape[1] * scale)), max(1, int(crop.shape[0] * scale))))
+        row, col = divmod(i, cols)
+        top = row * cell_h + (cell_h - resized.shape[0]) // 2
+        left = col * cell_w + (cell_w - resized.shape[1]) // 2
+        scene[top:top + resized.shape[0], left:left + resized.shape[1]] = resized
+    return scene
+
+
+def synthetic_gallery(size: int, seed: int) -> FaceEmbeddingGallery:
+    gallery = FaceEmbeddingGallery(refresh_seconds=0, storage=getattr(settings, 'face_gallery_storage', 'float32'))
+    rng = np.random.default_rng(seed)
+    for student_id in range(1, size + 1):
+        gallery.upsert(student_id, str(student_id), rng.standard_normal((1, EMBEDDING_DIM)).astype(np.float32))
+    return gallery
+
+
+def run_frame(data_url: str, gallery: FaceEmbeddingGallery, policy: str, faces_requested: int,
+              blank_crop: np.ndarray) -> Tuple[Dict[str, float], int]:
+    """Time one frame through every stage; returns (stage timings in ms, faces detected)."""
+    timings = {}
+
+    start = time.perf_counter()
+    image_bytes = encoded_image_bytes(data_url)
+    timings["base64_decode"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    image = insightface_service.decode_image_bytes(image_bytes)
+    timings["image_decode"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    analysis = insightface_service.analyze_image(image, embed=False, policy=policy)
+    timings["detection"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    crops = [insightface_service.align_face(image, analysis, face) for face in analysis.faces]
+    crops = [crop for crop in crops if crop is not None] or [blank_crop] * faces_requested
+    embeddings = insightface_service.embed_aligned_batch(crops) if crops else []
+    timings["embedding"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for embedding in embeddings:
+        gallery.search(embedding, top_k=1)
+    timings["gallery_search"] = time.perf_counter() - start
+
+    timings = {stage: seconds * 1000 for stage, seconds in timings.items()}
+    timings["total"] = sum(timings.values())
+    return timings, analysis.face_count
+
+
+def summarize(samples: Dict[str, List[float]], cores: int) -> Dict[str, Any]:
+    stages = {}
+    for stage in STAGES:
+        values = np.asarray(samples[stage])
+        stages[stage] = {
+            "mean_ms": round(float(values.mean()), 3),
+            "p50_ms": round(float(np.percentile(values, 50)), 3),
+            "p95_ms": round(float(np.percentile(values, 95)), 3),
+            "p99_ms": round(float(np.percentile(values, 99)), 3),
+        }
+    fps = 1000.0 / stages["total"]["mean_ms"] if stages["total"]["mean_ms"] else 0.0
+    return {
+        "stages": stages,
+        "throughput_fps": round(fps, 2),
+        "throughput_fps_per_core": round(fps / cores, 2),
+    }
+
+
+def run_scenario(name: str, image: np.ndarray, faces_requested: int, gallery: FaceEmbeddingGallery,
+                 args, cores: int, blank_crop: np.ndarray) -> Dict[str, Any]:
+    ok, encoded = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY])
+    data_url = "data:image/jpeg;base64," + base64.b64encode(encoded.tobytes()).decode()
+    for _ in range(args.warmup):
+        run_frame(data_url, gallery, args.policy, faces_requested, blank_crop)
+
+    samples: Dict[str, List[float]] = {stage: [] for stage in STAGES}
+    faces_detected = 0
+    for _ in range(args.iterations):
+        timings, faces_detected = run_frame(data_url, gallery, args.policy, faces_requested, blank_crop)
+        for stage, ms in timings.items():
+            samples[stage].append(ms)
+
+    return {
+        "name": name,
+        "resolution": f"{image.shape[1]}x{image.shape[0]}",
+        "faces_requested": faces_requested,
+        "faces_detected": faces_detected,
+        "encoded_bytes": int(encoded.size),
+        "iterations": args.iterations,
+        **summarize(samples, cores),
+    }
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL,
+                                       cwd=os.path.dirname(os.path.abspath(__file__))).decode().strip()
+    except Exception:
+        return None
+
+
+def print_report(results: Dict[str, Any]):
+    header = f"{'scenario':<28}{'faces':>7}" + "".join(f"{stage[:10]:>12}" for stage in STAGES) + f"{'fps/core':>10}"
+    print(f"\np50 / p95 / p99 ms per stage (commit {results['meta']['commit']}, {results['meta']['cores']} cores)")
+    print(header)
+    print("-" * len(header))
+    for scenario in results["scenarios"]:
+        for percentile in ("p50_ms", "p95_ms", "p99_ms"):
+            label = scenario["name"] if percentile == "p50_ms" else f"  {percentile[:3]}"
+            faces = f"{scenario['faces_detected']}/{scenario['faces_requested']}" if percentile == "p50_ms" else ""
+            row = "".join(f"{scenario['stages'][stage][percentile]:>12.2f}" for stage in STAGES)
+            fps = f"{scenario['throughput_fps_per_core']:>10.2f}" if percentile == "p50_ms" else ""
+            print(f"{label:<28}{faces:>7}{row}{fps}")
+
+
+def print_comparison(results: Dict[str, Any], baseline_path: str):
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    previous = {scenario["name"]: scenario for scenario in baseline["scenarios"]}
+    print(f"\nChange vs {baseline_path} (commit {baseline['meta'].get('commit')}), p50 / p95 in %")
+    for scenario in results["scenarios"]:
+        before = previous.get(scenario["name"])
+        if before is None:
+            continue
+        deltas = []
+        for stage in STAGES:
+            cells = []
+            for percentile in ("p50_ms", "p95_ms"):
+                old, new = before["stages"][stage][percentile], scenario["stages"][stage][percentile]
+                cells.append(f"{(new - old) / old * 100:+.0f}" if old else "n/a")
+            deltas.append(f"{stage} {'/'.join(cells)}")
+        print(f"{scenario['name']:<28}" + "  ".join(deltas))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fixtures", default=None, help="Directory of face photos (one face each)")
+    parser.add_argument("--resolutions", default="640x480,1280x720,1920x1080")
+    parser.add_argument("--faces", default="0,1,4", help="Face counts per generated scene")
+    parser.add_argument("--policy", default="mark_attendance", help="Detection ladder (DETECTION_LADDERS key)")
+    parser.add_argument("--gallery-size", type=int, default=1000)
+    parser.add_argument("--iterations", type=int, default=30)
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help="Write results as JSON to this path")
+    parser.add_argument("--compare", default=None, help="Earlier JSON results to diff against")
+    args = parser.parse_args()
+
+    if insightface_service is None or insightface_service.app is None:
+        raise SystemExit("InsightFace models are not available")
+    if insightface_service.development_mode:
+        raise SystemExit("DEVELOPMENT_MODE uses mock detection; disable it to benchmark")
+
+    config = session_config()
+    cores = config["intra_op_threads"] or os.cpu_count() or 1
+    gallery = synthetic_gallery(args.gallery_size, args.seed)
+    rec_size = insightface_service.app.models['recognition'].input_size[0]
+    blank_crop = np.full((rec_size, rec_size, 3), BACKGROUND_GRAY, dtype=np.uint8)
+    fixtures = load_fixtures(args.fixtures)
+    crops = [face_crop(image) for _, image in fixtures]
+
+    scenarios = []
+    for resolution in args.resolutions.split(","):
+        width, height = (int(v) for v in resolution.lower().split("x"))
+        for faces in (int(v) for v in args.faces.split(",")):
+            name = f"synthetic-{width}x{height}-{faces}f"
+            print(f"Running {name}...")
+            scene = compose_scene(width, height, faces, crops)
+            scenarios.append(run_scenario(name, scene, faces, gallery, args, cores, blank_crop))
+    for name, image in fixtures:
+        print(f"Running fixture {name}...")
+        scenarios.append(run_scenario(f"fixture-{name}", image, 1, gallery, args, cores, blank_crop))
+
+    results = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "cores": cores,
+            "cpu_count": os.cpu_count(),
+            "onnx_runtime": config,
+            "policy": args.policy,
+            "gallery_size": args.gallery_size,
+            "gallery_storage": gallery.storage,
+            "fixtures": [name for name, _ in fixtures],
+        },
+        "scenarios": scenarios,
+    }
+    print_report(results)
+    if args.compare:
+        print_comparison(results, args.compare)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
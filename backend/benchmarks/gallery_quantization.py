@@ -0,0 +1,155 @@
+"""
+Recall@1 and latency of the quantized face gallery against exact float32 search.
+
+Builds one gallery per storage mode (float32, float16, int8) from the enrolled
+students in the database, or from synthetic identities with ``--synthetic N``,
+and probes each with a noisy copy of every enrolled template (a stand-in for a
+fresh capture at roughly ``--probe-similarity`` to its template).
+For each mode it reports:
+
+* recall@1 against the true identity
+* the delta to exact float32 search
+* agreement with float32's top-1
+* the mean absolute score error
+* search latency and gallery memory
+
+Quantized modes are measured with and without the float32 re-rank.
+
+Usage (from backend/):
+    python -m benchmarks.gallery_quantization
+    python -m benchmarks.gallery_quantization --synthetic 50000 --probes 2000
+"""
+
+import argparse
+import time
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from app.services.face_gallery import (
+    EMBEDDING_DIM, GALLERY_STORAGE_DTYPES, FaceEmbeddingGallery, normalize_templates
+)
+
+
+def load_enrolled(max_templates: int) -> Dict[int, np.ndarray]:
+    """Enrollment templates for every enrolled student, read through the sync engine."""
+    from sqlalchemy import or_, select
+    from sqlalchemy.orm import Session
+
+    from app.core.database import sync_engine
+    from app.models import Student
+    from app.services.face_embedding_store import resolve_templates
+
+    templates_by_id = {}
+    with Session(sync_engine) as session:
+        rows = session.execute(
+            select(Student.id, Student.face_templates, Student.face_embedding, Student.face_encoding)
+            .where(or_(Student.face_embedding.isnot(None), Student.face_encoding.isnot(None)))
+        )
+        for student_id, templates_blob, binary, encoding in rows:
+            templates = normalize_templates(
+                resolve_templates(templates_blob, binary, encoding), EMBEDDING_DIM, max_templates
+            )
+            if templates is not None:
+                templates_by_id[student_id] = templates
+    return templates_by_id
+
+
+def synthetic_enrolled(count: int, max_templates: int, seed: int) -> Dict[int, np.ndarray]:
+    """Random identities with 1..max_templates pose variations around a shared direction."""
+    rng = np.random.default_rng(seed)
+    templates_by_id = {}
+    for student_id in range(1, count + 1):
+        base = rng.standard_normal(EMBEDDING_DIM).astype(np.float32)
+        n = int(rng.integers(1, max_templates + 1))
+        variations = base + 0.6 * rng.standard_normal((n, EMBEDDING_DIM)).astype(np.float32)
+        templates_by_id[student_id] = normalize_templates(variations, EMBEDDING_DIM, max_templates)
+    return templates_by_id
+
+
+def make_probes(templates_by_id: Dict[int, np.ndarray], count: int, similarity: float,
+                seed: int) -> List[Tuple[int, np.ndarray]]:
+    """Noisy copies of random templates with an expected cosine similarity of ``similarity``."""
+    rng = np.random.default_rng(seed + 1)
+    ids = list(templates_by_id)
+    # For unit x and isotropic noise n of norm r: cos(x, x + n) ~= 1 / sqrt(1 + r^2)
+    radius = np.sqrt(1.0 / similarity ** 2 - 1.0)
+    probes = []
+    for student_id in rng.choice(ids, size=min(count, len(ids) * 4), replace=len(ids) < count):
+        templates = templates_by_id[int(student_id)]
+        template = templates[rng.integers(templates.shape[0])]
+        noise = rng.standard_normal(EMBEDDING_DIM).astype(np.float32)
+        probes.append((int(student_id), template + noise * (radius / np.linalg.norm(noise))))
+    return probes
+
+
+def build_gallery(storage: str, templates_by_id: Dict[int, np.ndarray], args) -> FaceEmbeddingGallery:
+    gallery = FaceEmbeddingGallery(max_templates=args.max_templates, shortlist_size=args.shortlist,
+                                   refresh_seconds=0, storage=storage, rerank_size=args.rerank)
+    for student_id, templates in templates_by_id.items():
+        gallery.upsert(student_id, str(student_id), templates)
+    return gallery
+
+
+def run_mode(gallery: FaceEmbeddingGallery, probes, templates_by_id, rerank: bool):
+    top1, scores, latencies = [], [], []
+    for _, probe in probes:
+        start = time.perf_counter()
+        if rerank:
+            candidates = gallery.search(probe, top_k=gallery.rerank_size)
+            matches = gallery.rescore(probe, candidates,
+                                      {m.student_id: templates_by_id[m.student_id] for m in candidates})
+        else:
+            matches = gallery.search(probe, top_k=1)
+        latencies.append((time.perf_counter() - start) * 1000)
+        top1.append(matches[0].student_id)
+        scores.append(matches[0].similarity)
+    return np.asarray(top1), np.asarray(scores), np.asarray(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--synthetic", type=int, default=0, help="Use N synthetic identities instead of the database")
+    parser.add_argument("--probes", type=int, default=1000)
+    parser.add_argument("--probe-similarity", type=float, default=0.6)
+    parser.add_argument("--max-templates", type=int, default=5)
+    parser.add_argument("--shortlist", type=int, default=64)
+    parser.add_argument("--rerank", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.synthetic:
+        templates_by_id = synthetic_enrolled(args.synthetic, args.max_templates, args.seed)
+        source = f"{args.synthetic} synthetic identities"
+    else:
+        templates_by_id = load_enrolled(args.max_templates)
+        source = f"{len(templates_by_id)} enrolled students"
+    if not templates_by_id:
+        raise SystemExit("No enrolled face embeddings found (use --synthetic N)")
+
+    probes = make_probes(templates_by_id, args.probes, args.probe_similarity, args.seed)
+    truth = np.asarray([student_id for student_id, _ in probes])
+    print(f"Gallery: {source}, {len(probes)} probes at ~{args.probe_similarity} similarity\n")
+
+    exact_top1, exact_scores, _ = None, None, None
+    header = f"{'mode':<18}{'recall@1':>10}{'delta':>9}{'agree':>9}{'score err':>11}{'p50 ms':>9}{'p95 ms':>9}{'memory MB':>11}"
+    print(header)
+    print("-" * len(header))
+    for storage in GALLERY_STORAGE_DTYPES:
+        gallery = build_gallery(storage, templates_by_id, args)
+        memory_mb = gallery.stats()["memory_bytes"] / 1e6
+        for rerank in ([False, True] if gallery.quantized else [False]):
+            top1, scores, latencies = run_mode(gallery, probes, templates_by_id, rerank)
+            recall = float((top1 == truth).mean())
+            if exact_top1 is None:
+                exact_top1, exact_scores, exact_recall = top1, scores, recall
+            label = storage + (" + rerank" if rerank else "")
+            print(f"{label:<18}{recall:>10.4f}{recall - exact_recall:>+9.4f}"
+                  f"{float((top1 == exact_top1).mean()):>9.4f}"
+                  f"{float(np.abs(scores - exact_scores).mean()):>11.5f}"
+                  f"{np.percentile(latencies, 50):>9.3f}{np.percentile(latencies, 95):>9.3f}"
+                  f"{memory_mb:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
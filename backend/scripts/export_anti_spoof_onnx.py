@@ -0,0 +1,137 @@
+"""
+Export models/anti_spoof_2.7.pth (MiniFASNetV2, 80x80 input, 2.7x face context)
+to ONNX for the CPU liveness stage in app/services/liveness_service.py.
+
+The checkpoint is a pruned MiniFASNetV2 state dict from Silent-Face-Anti-Spoofing
+(keys prefixed with ``module.``). Layer widths are read from the weights, so the
+network is rebuilt here without the original keep-list. The exported graph takes
+a (N, 3, 80, 80) float32 BGR crop in 0-255 and returns softmax probabilities over
+(print/replay attack, real, mask/other attack).
+
+Needs PyTorch, which the server itself does not:
+    pip install torch onnx
+    python scripts/export_anti_spoof_onnx.py
+    python scripts/export_anti_spoof_onnx.py --weights models/anti_spoof_2.7.pth --output models/anti_spoof_2.7.onnx
+"""
+
+import argparse
+import os
+from collections import OrderedDict
+
+import numpy as np
+import torch
+from torch import nn
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+INPUT_SIZE = 80
+
+
+class ConvBlock(nn.Module):
+    """Conv -> BatchNorm -> PReLU (PReLU dropped for MiniFASNet's linear blocks)."""
+
+    def __init__(self, weight: torch.Tensor, stride: int, activation: bool = True):
+        super().__init__()
+        out_c, in_per_group, kh, kw = weight.shape
+        groups = out_c if in_per_group == 1 and out_c > 1 else 1
+        self.conv = nn.Conv2d(in_per_group * groups, out_c, (kh, kw), stride=stride,
+                              padding=(kh // 2 if kh == 3 else 0), groups=groups, bias=False)
+        self.bn = nn.BatchNorm2d(out_c)
+        self.prelu = nn.PReLU(out_c) if activation else None
+
+    def forward(self, x):
+        x = self.bn(self.conv(x))
+        return self.prelu(x) if self.prelu is not None else x
+
+
+class DepthWise(nn.Module):
+    """1x1 expand -> 3x3 depthwise -> 1x1 linear projection (optionally residual)."""
+
+    def __init__(self, state: dict, prefix: str, stride: int, residual: bool):
+        super().__init__()
+        self.residual = residual
+        self.conv = ConvBlock(state[f"{prefix}.conv.conv.weight"], 1)
+        self.conv_dw = ConvBlock(state[f"{prefix}.conv_dw.conv.weight"], stride)
+        self.project = ConvBlock(state[f"{prefix}.project.conv.weight"], 1, activation=False)
+
+    def forward(self, x):
+        out = self.project(self.conv_dw(self.conv(x)))
+        return x + out if self.residual else out
+
+
+class Residual(nn.Module):
+    def __init__(self, state: dict, prefix: str):
+        super().__init__()
+        count = len({key.split(".")[2] for key in state if key.startswith(f"{prefix}.model.")})
+        self.model = nn.Sequential(*[
+            DepthWise(state, f"{prefix}.model.{i}", stride=1, residual=True) for i in range(count)
+        ])
+
+    def forward(self, x):
+        return self.model(x)
+
+
+class MiniFASNet(nn.Module):
+    """MiniFASNet rebuilt from a state dict, with softmax on the output."""
+
+    def __init__(self, state: dict):
+        super().__init__()
+        self.conv1 = ConvBlock(state["conv1.conv.weight"], 2)
+        self.conv2_dw = ConvBlock(state["conv2_dw.conv.weight"], 1)
+        self.conv_23 = DepthWise(state, "conv_23", stride=2, residual=False)
+        self.conv_3 = Residual(state, "conv_3")
+        self.conv_34 = DepthWise(state, "conv_34", stride=2, residual=False)
+        self.conv_4 = Residual(state, "conv_4")
+        self.conv_45 = DepthWise(state, "conv_45", stride=2, residual=False)
+        self.conv_5 = Residual(state, "conv_5")
+        self.conv_6_sep = ConvBlock(state["conv_6_sep.conv.weight"], 1)
+        self.conv_6_dw = ConvBlock(state["conv_6_dw.conv.weight"], 1, activation=False)
+        embedding, features = state["linear.weight"].shape
+        self.linear = nn.Linear(features, embedding, bias=False)
+        self.bn = nn.BatchNorm1d(embedding)
+        self.prob = nn.Linear(embedding, state["prob.weight"].shape[0], bias=False)
+
+    def forward(self, x):
+        for stage in (self.conv1, self.conv2_dw, self.conv_23, self.conv_3, self.conv_34,
+                      self.conv_4, self.conv_45, self.conv_5, self.conv_6_sep, self.conv_6_dw):
+            x = stage(x)
+        x = self.prob(self.bn(self.linear(torch.flatten(x, 1))))
+        return torch.softmax(x, dim=1)
+
+
+def load_state(weights: str) -> "OrderedDict[str, torch.Tensor]":
+    state = torch.load(weights, map_location="cpu")
+    return OrderedDict((key[len("module."):] if key.startswith("module.") else key, value)
+                       for key, value in state.items())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--weights", default=os.path.join(BACKEND_DIR, "models", "anti_spoof_2.7.pth"))
+    parser.add_argument("--output", default=os.path.join(BACKEND_DIR, "models", "anti_spoof_2.7.onnx"))
+    parser.add_argument("--opset", type=int, default=13)
+    args = parser.parse_args()
+
+    state = load_state(args.weights)
+    model = MiniFASNet(state)
+    model.load_state_dict(state)
+    model.eval()
+
+    dummy = torch.rand(1, 3, INPUT_SIZE, INPUT_SIZE) * 255
+    torch.onnx.export(
+        model, dummy, args.output,
+        input_names=["input"], output_names=["probs"],
+        dynamic_axes={"input": {0: "batch"}, "probs": {0: "batch"}},
+        opset_version=args.opset,
+    )
+
+    # Sanity check: ONNX Runtime must agree with PyTorch
+    import onnxruntime as ort
+    session = ort.InferenceSession(args.output, providers=["CPUExecutionProvider"])
+    with torch.no_grad():
+        expected = model(dummy).numpy()
+    actual = session.run(None, {"input": dummy.numpy()})[0]
+    print(f"Exported {args.output} (max abs diff vs PyTorch: {np.abs(expected - actual).max():.2e})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,246 @@
+"""
+Re-embed every enrolled student from their stored registration photos.
+
+Run this after changing the InsightFace model pack or ``insightface_det_size``:
+embeddings from different model setups cannot be compared, and without it every
+student would have to register again. Run it with the NEW settings, while the API
+keeps serving the old embeddings:
+
+1. Each student's photos under ``<upload_dir>/faces/<id>/`` are re-embedded on a
+   process pool, exactly as registration does it, into the ``face_*_staged``
+   columns tagged with the new model version (see ``embedding_model_version``).
+2. Staged rows are committed every ``--checkpoint-every`` students. Staged rows
+   are the checkpoint: after an interruption, a rerun skips students already
+   staged for this version and continues with the rest.
+3. ``--switch`` then copies all staged embeddings into the active columns in one
+   transaction, with the students table locked, so no request ever sees a mix of
+   versions. It refuses while any enrolled student is not staged, unless
+   ``--clear-missing`` is given; students that could not be re-embedded (no
+   stored photos, or no usable face in them) then lose their old embedding and
+   must register again.
+
+Restart the API servers on the new model settings after the switch (the face
+gallery also reloads on its own every ``face_gallery_refresh_seconds``).
+
+Usage (from backend/):
+    python scripts/reembed_faces.py --status
+    python scripts/reembed_faces.py --workers 4
+    python scripts/reembed_faces.py --switch
+    python scripts/reembed_faces.py --switch-only --clear-missing
+"""
+
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+from typing import Dict, List, Optional, Tuple
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from sqlalchemy import null, or_, select, text, update
+from sqlalchemy.orm import Session
+
+from app.core.database import sync_engine
+from app.models import Student
+from app.services.enrollment_images import enrolled_student_ids, load_enrollment_images
+from app.services.face_embedding_store import (
+    DELETE_TEMPLATE_VECTORS_SQL, HAS_VECTOR_TABLE_SQL, INSERT_TEMPLATE_VECTOR_SQL, TEMPLATE_TABLE,
+    decode_embedding, decode_templates, embedding_model_version, encode_embedding, encode_templates,
+    face_embedding_store, template_vector_rows,
+)
+
+# (student id, packed embedding, packed templates, error message)
+EmbedResult = Tuple[int, Optional[bytes], Optional[bytes], Optional[str]]
+
+_service = None  # Per-worker InsightFaceService
+
+
+def init_worker():
+    """Load the face models once per worker process."""
+    global _service
+    from app.services.insightface_service import insightface_service
+    # No raising here: a failing Pool initializer makes multiprocessing respawn workers forever
+    if insightface_service is not None and not insightface_service.development_mode:
+        _service = insightface_service
+
+
+def embed_student(student_id: int) -> EmbedResult:
+    """Run registration on a student's stored photos and return packed embeddings."""
+    if _service is None:
+        return student_id, None, None, "InsightFace models are not available (or DEVELOPMENT_MODE is on)"
+    try:
+        images = load_enrollment_images(student_id)
+        if not images:
+            return student_id, None, None, "no stored registration photos"
+        result = _service.process_multi_image_face_registration(images)
+        if not result.get('success') or not result.get('encoding'):
+            return student_id, None, None, result.get('message', 'registration failed')
+        return student_id, encode_embedding(result['encoding']), encode_templates(result.get('templates')), None
+    except Exception as e:
+        return student_id, None, None, str(e)
+
+
+def enrolled_rows(session: Session) -> List[Tuple[int, Optional[str], Optional[str]]]:
+    """(id, active version, staged version) of every student with an active embedding."""
+    return session.execute(
+        select(Student.id, Student.face_embedding_version, Student.face_embedding_staged_version)
+        .where(or_(Student.face_embedding.isnot(None), Student.face_encoding.isnot(None)))
+        .order_by(Student.id)
+    ).all()
+
+
+def pending_students(session: Session, version: str) -> List[int]:
+    """
+    Enrolled students with stored photos that are neither staged nor already active at
+    ``version``. Students whose embedding was cleared are skipped: stale photos must not
+    re-enroll them.
+    """
+    rows = enrolled_rows(session)
+    current = {student_id for student_id, active, staged in rows if version in (active, staged)}
+    enrolled = {student_id for student_id, _, _ in rows}
+    return [student_id for student_id in enrolled_student_ids()
+            if student_id in enrolled and student_id not in current]
+
+
+def print_status(session: Session, version: str):
+    rows = enrolled_rows(session)
+    photos = set(enrolled_student_ids())
+    active = sum(1 for _, active_version, _ in rows if active_version == version)
+    staged = sum(1 for _, _, staged_version in rows if staged_version == version)
+    no_photos = sum(1 for student_id, active_version, staged_version in rows
+                    if version not in (active_version, staged_version) and student_id not in photos)
+    versions: Dict[str, int] = {}
+    for _, active_version, _ in rows:
+        versions[active_version or "unknown"] = versions.get(active_version or "unknown", 0) + 1
+    print(f"Target version: {version}")
+    print(f"Enrolled students: {len(rows)} (active versions: {versions})")
+    print(f"  active at target: {active}")
+    print(f"  staged for target: {staged}")
+    print(f"  pending with photos: {len(pending_students(session, version))}")
+    print(f"  without stored photos: {no_photos}")
+
+
+def stage(session: Session, version: str, workers: int, checkpoint_every: int, limit: int) -> Dict[int, str]:
+    """Re-embed pending students into the staged columns; returns failures by student id."""
+    pending = pending_students(session, version)
+    if limit:
+        pending = pending[:limit]
+    if not pending:
+        print("Nothing to re-embed")
+        return {}
+
+    # Split the cores between workers instead of letting each ORT session take them all
+    os.environ.setdefault("FACE_ORT_INTRA_OP_THREADS", str(max(1, (os.cpu_count() or 1) // workers)))
+    print(f"Re-embedding {len(pending)} students for {version} on {workers} worker(s)...")
+
+    failures: Dict[int, str] = {}
+    done = uncommitted = 0
+    start = time.perf_counter()
+    # spawn: every worker loads its own ONNX sessions instead of inheriting forked ones
+    with multiprocessing.get_context("spawn").Pool(workers, initializer=init_worker) as pool:
+        for student_id, embedding, templates, error in pool.imap_unordered(embed_student, pending):
+            done += 1
+            if error:
+                failures[student_id] = error
+                print(f"  ⚠️ student {student_id}: {error}")
+            else:
+                session.execute(
+                    update(Student).where(Student.id == student_id).values(
+                        face_embedding_staged=embedding,
+                        face_templates_staged=templates,
+                        face_embedding_staged_version=version,
+                    )
+                )
+                uncommitted += 1
+            if uncommitted >= checkpoint_every:
+                session.commit()
+                uncommitted = 0
+                rate = done / (time.perf_counter() - start)
+                print(f"  {done}/{len(pending)} done ({rate:.1f} students/s, {len(failures)} failed)")
+    session.commit()
+    print(f"Staged {done - len(failures)}/{len(pending)} students in {time.perf_counter() - start:.1f}s")
+    return failures
+
+
+def switch(session: Session, version: str, clear_missing: bool) -> bool:
+    """Swap every staged embedding into the active columns in a single transaction."""
+    postgres = session.bind.dialect.name == "postgresql"
+    if postgres:
+        # Registrations wait for the switch instead of interleaving with it
+        session.execute(text("LOCK TABLE students IN SHARE ROW EXCLUSIVE MODE"))
+    missing = [student_id for student_id, active, staged in enrolled_rows(session)
+               if version not in (active, staged)]
+    if missing and not clear_missing:
+        session.rollback()
+        print(f"❌ {len(missing)} enrolled student(s) not staged for {version} "
+              f"(e.g. {missing[:10]}); rerun the job or pass --clear-missing")
+        return False
+
+    has_vector = postgres and session.execute(HAS_VECTOR_TABLE_SQL, {"table": TEMPLATE_TABLE}).first() is not None
+    staged_rows = session.execute(
+        select(Student.id, Student.face_embedding_staged, Student.face_templates_staged)
+        .where(Student.face_embedding_staged_version == version)
+        .where(or_(Student.face_embedding.isnot(None), Student.face_encoding.isnot(None)))
+    ).all()
+    for student_id, embedding, templates in staged_rows:
+        vec = decode_embedding(embedding)
+        session.execute(
+            update(Student).where(Student.id == student_id).values(
+                face_embedding=embedding,
+                face_templates=templates,
+                face_encoding=vec.tolist() if face_embedding_store.json_fallback else null(),
+                face_embedding_version=version,
+                face_embedding_staged=None,
+                face_templates_staged=None,
+                face_embedding_staged_version=None,
+            )
+        )
+        if has_vector:
+            session.execute(DELETE_TEMPLATE_VECTORS_SQL, {"ids": [student_id]})
+            rows = decode_templates(templates) if templates else vec
+            session.execute(INSERT_TEMPLATE_VECTOR_SQL,
+                            template_vector_rows(student_id, rows, face_embedding_store.max_templates))
+    if missing:
+        session.execute(
+            update(Student).where(Student.id.in_(missing)).values(
+                face_encoding=null(), face_embedding=None, face_templates=None, face_embedding_version=None,
+            )
+        )
+        if has_vector:
+            session.execute(DELETE_TEMPLATE_VECTORS_SQL, {"ids": missing})
+    session.commit()
+    print(f"✅ Switched {len(staged_rows)} students to {version}"
+          + (f"; cleared {len(missing)} not re-embedded (they must register again)" if missing else ""))
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 2) // 2))
+    parser.add_argument("--checkpoint-every", type=int, default=50, help="Commit staged rows every N students")
+    parser.add_argument("--limit", type=int, default=0, help="Re-embed at most N students this run")
+    parser.add_argument("--switch", action="store_true", help="Activate the new version once every student is staged")
+    parser.add_argument("--switch-only", action="store_true", help="Activate an already staged run")
+    parser.add_argument("--clear-missing", action="store_true",
+                        help="On switch, drop old embeddings of students that could not be re-embedded")
+    parser.add_argument("--status", action="store_true")
+    args = parser.parse_args()
+
+    version = embedding_model_version()
+    with Session(sync_engine) as session:
+        if args.status:
+            print_status(session, version)
+            return
+        if not args.switch_only:
+            failures = stage(session, version, max(1, args.workers), max(1, args.checkpoint_every), args.limit)
+            if failures:
+                print(f"⚠️ {len(failures)} student(s) failed; rerun to retry them")
+        if args.switch or args.switch_only:
+            if not switch(session, version, args.clear_missing):
+                sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+import json
+
+import numpy as np
+
+from benchmarks.face_pipeline import STAGES, compose_scene, print_comparison, summarize, synthetic_gallery
+
+
+def test_summarize_reports_percentiles_and_throughput():
+    samples = {stage: list(range(1, 101)) for stage in STAGES}
+    samples["total"] = [10.0] * 100
+
+    summary = summarize(samples, cores=4)
+
+    assert summary["stages"]["detection"]["p50_ms"] == 50.5
+    assert summary["stages"]["detection"]["p99_ms"] == 99.01
+    assert summary["throughput_fps"] == 100.0
+    assert summary["throughput_fps_per_core"] == 25.0
+
+
+def test_compose_scene_tiles_the_requested_faces():
+    crop = np.full((100, 80, 3), 255, dtype=np.uint8)
+
+    scene = compose_scene(640, 480, 4, [crop])
+    assert scene.shape == (480, 640, 3)
+    for top, left in ((0, 0), (0, 320), (240, 0), (240, 320)):
+        assert scene[top + 120, left + 160].tolist() == [255, 255, 255]
+    assert (compose_scene(640, 480, 0, [crop]) == 128).all()
+
+
+def test_synthetic_gallery_has_one_identity_per_student():
+    gallery = synthetic_gallery(25, seed=3)
+    assert gallery.stats()["identities"] == 25
+
+
+def test_comparison_prints_percent_change(tmp_path, capsys):
+    def run(p50):
+        stages = {stage: {"p50_ms": p50, "p95_ms": p50 * 2} for stage in STAGES}
+        return {"meta": {"commit": "abc123"}, "scenarios": [{"name": "640x480_1face", "stages": stages}]}
+
+    baseline = tmp_path / "baseline.json"
+    baseline.write_text(json.dumps(run(10.0)))
+    print_comparison(run(8.0), str(baseline))
+
+    out = capsys.readouterr().out
+    assert "abc123" in out
+    assert "detection -20/-20" in out
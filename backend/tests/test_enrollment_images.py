@@ -0,0 +1,37 @@
+import os
+
+from app.services import enrollment_images
+from app.services.enrollment_images import (
+    delete_all_enrollment_images, delete_enrollment_images, enrolled_student_ids,
+    enrollment_dir, load_enrollment_images, save_enrollment_images,
+)
+
+JPEG = b'\xff\xd8' + b'\x00' * 32
+
+
+def use_upload_dir(monkeypatch, tmp_path):
+    monkeypatch.setattr(enrollment_images.settings, "upload_dir", str(tmp_path))
+    monkeypatch.setattr(enrollment_images.settings, "face_keep_enrollment_images", True)
+
+
+def test_delete_enrollment_images_removes_only_that_student(monkeypatch, tmp_path):
+    use_upload_dir(monkeypatch, tmp_path)
+    save_enrollment_images(1, [JPEG, JPEG])
+    save_enrollment_images(2, [JPEG])
+
+    assert delete_enrollment_images(1) is True
+    assert not os.path.exists(enrollment_dir(1))
+    assert load_enrollment_images(1) == []
+    assert enrolled_student_ids() == [2]
+    assert delete_enrollment_images(1) is False
+
+
+def test_delete_all_enrollment_images(monkeypatch, tmp_path):
+    use_upload_dir(monkeypatch, tmp_path)
+    save_enrollment_images(1, [JPEG])
+    save_enrollment_images(2, [JPEG])
+    os.makedirs(enrollment_dir(3) + ".abc.tmp")  # Left behind by an interrupted swap
+
+    assert delete_all_enrollment_images() == 2
+    assert enrolled_student_ids() == []
+    assert os.listdir(enrollment_images.enrollment_root()) == []
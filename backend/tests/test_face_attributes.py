@@ -0,0 +1,72 @@
+import numpy as np
+import pytest
+
+from app.services.face_model_registry import SharedFaceAnalysis
+from app.services.insightface_service import ATTRIBUTES_PROFILE, RECOGNITION_PROFILE
+
+FRAME = np.zeros((480, 640, 3), dtype=np.uint8)
+
+
+class FakeDetector:
+    def detect(self, img, input_size=None, max_num=0, metric='default'):
+        kps = np.array([[[250, 150], [350, 150], [300, 200], [260, 250], [340, 250]]], dtype=np.float32)
+        return np.array([[200, 100, 400, 300, 0.95]], dtype=np.float32), kps
+
+
+class FakeModel:
+    def __init__(self, task):
+        self.task = task
+        self.calls = 0
+
+    def get(self, img, face):
+        self.calls += 1
+        if self.task == 'recognition':
+            face.embedding = np.ones(512, dtype=np.float32)
+        elif self.task == 'genderage':
+            face.gender, face.age = 1, 23
+            return [23, 1, 0.9]
+        elif self.task == 'landmark_2d_106':
+            face.landmark_2d_106 = np.zeros((106, 2), dtype=np.float32)
+
+
+@pytest.fixture
+def apps(face_service, monkeypatch):
+    models = {task: FakeModel(task) for task in ('recognition', 'genderage', 'landmark_2d_106')}
+    recognition = SharedFaceAnalysis({'detection': FakeDetector(), 'recognition': models['recognition']}, 640)
+    attributes = SharedFaceAnalysis({'detection': FakeDetector(), 'genderage': models['genderage'],
+                                     'landmark_2d_106': models['landmark_2d_106']}, 640)
+    loaded = []
+
+    def get_app(profile=RECOGNITION_PROFILE):
+        loaded.append(profile)
+        return {RECOGNITION_PROFILE: recognition, ATTRIBUTES_PROFILE: attributes}[profile]
+
+    monkeypatch.setattr(face_service, "get_app", get_app)
+    return models, loaded
+
+
+def test_attribute_models_do_not_run_unless_asked(face_service, apps):
+    models, loaded = apps
+
+    face = face_service.analyze_image(FRAME).faces[0]
+
+    assert face['embedding'] is not None
+    assert (face['age'], face['gender'], face['glasses'], face['landmark_2d_106']) == (None, None, None, None)
+    assert models['genderage'].calls == 0 and models['landmark_2d_106'].calls == 0
+    assert loaded == [RECOGNITION_PROFILE]
+
+
+def test_requested_attributes_run_only_their_model(face_service, apps):
+    models, loaded = apps
+
+    face = face_service.analyze_image(FRAME, attributes=['glasses', 'age']).faces[0]
+
+    assert (face['age'], face['gender'], face['glasses']) == (23, 1, 1)
+    assert face['landmark_2d_106'] is None
+    assert models['genderage'].calls == 1 and models['landmark_2d_106'].calls == 0
+    assert loaded == [RECOGNITION_PROFILE, ATTRIBUTES_PROFILE]
+
+
+def test_unknown_attributes_are_rejected(face_service):
+    with pytest.raises(ValueError, match="emotion"):
+        face_service.analyze_image(FRAME, attributes=['emotion'])
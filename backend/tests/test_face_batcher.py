@@ -0,0 +1,101 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from app.services.face_batcher import RecognitionBatcher
+from app.services.face_inference_executor import FaceInferenceExecutor
+
+
+def crop(value):
+    return np.full((112, 112, 3), value, dtype=np.uint8)
+
+
+class FakeModel:
+    """Embeds a crop as a vector filled with its pixel value; records batch sizes."""
+
+    def __init__(self, fail=False):
+        self.batches = []
+        self.fail = fail
+
+    def __call__(self, crops):
+        self.batches.append(len(crops))
+        if self.fail:
+            raise RuntimeError("model exploded")
+        return np.stack([np.full(4, float(c[0, 0, 0]), dtype=np.float32) for c in crops])
+
+
+@pytest.fixture
+def executor():
+    executor = FaceInferenceExecutor(max_workers=1, max_queue=64)
+    yield executor
+    executor.shutdown()
+
+
+def test_concurrent_requests_share_one_batch_and_get_their_own_embedding(executor):
+    model = FakeModel()
+    batcher = RecognitionBatcher(model, executor, max_batch_size=8, max_wait_ms=20)
+
+    async def scenario():
+        return await asyncio.gather(*(batcher.embed(crop(i)) for i in range(5)))
+
+    embeddings = asyncio.run(scenario())
+
+    assert model.batches == [5]
+    assert [float(e[0]) for e in embeddings] == [0.0, 1.0, 2.0, 3.0, 4.0]
+    stats = batcher.stats()
+    assert (stats["batches"], stats["items"], stats["batch_size_histogram"]) == (1, 5, {"5": 1})
+
+
+def test_full_batches_dispatch_without_waiting(executor):
+    model = FakeModel()
+    batcher = RecognitionBatcher(model, executor, max_batch_size=3, max_wait_ms=10_000)
+
+    async def scenario():
+        return await asyncio.wait_for(asyncio.gather(*(batcher.embed(crop(i)) for i in range(6))), timeout=2)
+
+    embeddings = asyncio.run(scenario())
+
+    assert model.batches == [3, 3]
+    assert [float(e[0]) for e in embeddings] == [0.0, 1.0, 2.0, 3.0, 4.0, 5.0]
+
+
+def test_disabled_batcher_embeds_each_crop_alone(executor):
+    model = FakeModel()
+    batcher = RecognitionBatcher(model, executor, max_batch_size=8, enabled=False)
+
+    async def scenario():
+        return await asyncio.gather(*(batcher.embed(crop(i)) for i in range(3)))
+
+    asyncio.run(scenario())
+
+    assert model.batches == [1, 1, 1]
+
+
+def test_batch_failure_reaches_every_waiting_request(executor):
+    batcher = RecognitionBatcher(FakeModel(fail=True), executor, max_batch_size=8, max_wait_ms=5)
+
+    async def scenario():
+        return await asyncio.gather(*(batcher.embed(crop(i)) for i in range(3)), return_exceptions=True)
+
+    results = asyncio.run(scenario())
+
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert batcher.stats()["failed_batches"] == 1
+
+
+def test_cancelled_requests_are_left_out_of_the_batch(executor):
+    model = FakeModel()
+    batcher = RecognitionBatcher(model, executor, max_batch_size=8, max_wait_ms=30)
+
+    async def scenario():
+        gone = asyncio.ensure_future(batcher.embed(crop(9)))
+        kept = asyncio.ensure_future(batcher.embed(crop(1)))
+        await asyncio.sleep(0)
+        gone.cancel()
+        return await kept
+
+    embedding = asyncio.run(scenario())
+
+    assert float(embedding[0]) == 1.0
+    assert model.batches == [1]
@@ -0,0 +1,121 @@
+import numpy as np
+import pytest
+
+from app.schemas import FaceBoxHint
+
+FRAME = np.zeros((480, 640, 3), dtype=np.uint8)
+NO_FACES = (np.zeros((0, 5), dtype=np.float32), np.zeros((0, 5, 2), dtype=np.float32))
+
+
+def faces(*boxes):
+    """Detector output for [x1, y1, x2, y2, score] boxes."""
+    bboxes = np.array(boxes, dtype=np.float32).reshape(-1, 5)
+    kpss = np.repeat(((bboxes[:, :2] + bboxes[:, 2:4]) / 2)[:, None, :], 5, axis=1)
+    return bboxes, kpss
+
+
+class FakeDetectorApp:
+    """SharedFaceAnalysis stand-in whose detector answers per input size."""
+
+    def __init__(self, results, dynamic_input=True, det_size=640):
+        self.results = results
+        self.dynamic_input = dynamic_input
+        self.det_size = (det_size, det_size)
+        self.calls = []
+
+    def detect(self, img, input_size=None, max_num=0):
+        self.calls.append((img.shape[:2], input_size))
+        bboxes, kpss = self.results.get(input_size, NO_FACES)
+        return bboxes.copy(), kpss.copy()
+
+    def build_faces(self, img, bboxes, kpss, skip_tasks=()):
+        return []
+
+
+def test_large_confident_face_stops_at_the_first_rung(face_service):
+    app = FakeDetectorApp({320: faces([200, 100, 400, 300, 0.95]), 640: faces([200, 100, 400, 300, 0.97])})
+
+    bboxes, _ = face_service._detect_with_ladder(app, FRAME, "mark_attendance")
+
+    assert [size for _, size in app.calls] == [320]
+    assert bboxes[0, 4] == np.float32(0.95)
+    assert face_service.detection_ladder_stats()["mark_attendance"]["rungs"] == {"320": 1}
+
+
+def test_small_missing_or_unsure_faces_escalate(face_service):
+    small = faces([300, 200, 360, 260, 0.95])  # 60 px -> 30 px as seen at 320
+    unsure = faces([200, 100, 400, 300, 0.4])
+    for first_rung in (small, NO_FACES, unsure):
+        app = FakeDetectorApp({320: first_rung, 640: faces([300, 200, 360, 260, 0.9])})
+        bboxes, _ = face_service._detect_with_ladder(app, FRAME, "mark_attendance")
+        assert [size for _, size in app.calls] == [320, 640]
+        assert bboxes[0, 4] == np.float32(0.9)
+
+    stats = face_service.detection_ladder_stats()["mark_attendance"]
+    assert stats["escalation_rate"] == 1.0 and stats["frames"] == 3
+
+
+def test_static_detector_and_unknown_policy_use_det_size_only(face_service):
+    result = {640: faces([200, 100, 400, 300, 0.95])}
+    for app, policy in ((FakeDetectorApp(result, dynamic_input=False), "mark_attendance"),
+                        (FakeDetectorApp(result), None)):
+        face_service._detect_with_ladder(app, FRAME, policy)
+        assert [size for _, size in app.calls] == [640]
+
+
+# Face at [200, 100, 400, 300] in the 640x480 frame; the padded crop is [120, 20, 480, 380]
+HINT = FaceBoxHint(x=200 / 640, y=100 / 480, width=200 / 640, height=200 / 480)
+FAST_HINT = FaceBoxHint(x=200 / 640, y=100 / 480, width=200 / 640, height=200 / 480, confidence=0.95)
+
+
+def test_hint_detects_in_the_crop_and_maps_back_to_the_frame(face_service):
+    app = FakeDetectorApp({256: faces([80, 80, 280, 280, 0.9]), 160: faces([80, 80, 280, 280, 0.9])})
+
+    bboxes, kpss = face_service._detect_in_hint(app, FRAME, HINT)
+    assert app.calls == [((360, 360), 256)]
+    np.testing.assert_allclose(bboxes[0, :4], [200, 100, 400, 300])
+    np.testing.assert_allclose(kpss[0, 0], [300, 200])
+
+    face_service._detect_in_hint(app, FRAME, FAST_HINT)
+    assert app.calls[-1] == ((360, 360), 160)
+    stats = face_service.roi_hint_stats()
+    assert (stats["used"], stats["used_fast"], stats["fallback_rate"]) == (2, 1, 0.0)
+
+
+@pytest.mark.parametrize("crop_result, outcome", [
+    (NO_FACES, "no_face"),
+    (faces([80, 80, 280, 280, 0.4]), "low_confidence"),
+    (faces([250, 10, 340, 100, 0.9]), "mismatch"),  # A different face in the crop
+    (faces([0, 80, 200, 280, 0.9]), "cut_off"),  # Runs into the crop's left edge
+])
+def test_wrong_hints_fall_back(face_service, crop_result, outcome):
+    app = FakeDetectorApp({256: crop_result})
+
+    assert face_service._detect_in_hint(app, FRAME, HINT) is None
+    assert face_service.roi_hint_stats()["fallbacks"] == {outcome: 1}
+
+
+def test_tiny_hint_is_not_cropped(face_service):
+    app = FakeDetectorApp({})
+    hint = FaceBoxHint(x=0.5, y=0.5, width=0.01, height=0.01)
+
+    assert face_service._detect_in_hint(app, FRAME, hint) is None
+    assert app.calls == []
+    assert face_service.roi_hint_stats()["fallbacks"] == {"too_small": 1}
+
+
+def test_analyze_image_falls_back_to_the_full_frame(face_service, monkeypatch):
+    app = FakeDetectorApp({256: NO_FACES, 320: faces([200, 100, 400, 300, 0.95])})
+    monkeypatch.setattr(face_service, "get_app", lambda profile=None: app)
+
+    face_service.analyze_image(FRAME, policy="mark_attendance", roi_hint=HINT)
+    assert app.calls == [((360, 360), 256), ((480, 640), 320)]
+
+
+def test_policies_that_need_the_whole_frame_ignore_the_hint(face_service, monkeypatch):
+    app = FakeDetectorApp({256: faces([200, 100, 400, 300, 0.95])})
+    monkeypatch.setattr(face_service, "get_app", lambda profile=None: app)
+
+    face_service.analyze_image(FRAME, policy="live_recognition", roi_hint=HINT)
+    assert app.calls == [((480, 640), 256)]
+    assert face_service.roi_hint_stats()["fallbacks"] == {"policy": 1}
@@ -0,0 +1,72 @@
+import asyncio
+from types import SimpleNamespace
+
+import numpy as np
+
+from app.services.face_embedding_store import (
+    FaceEmbeddingStore, decode_embedding, decode_templates, embedding_model_version, encode_embedding,
+    encode_templates, resolve_templates, student_embedding, student_embedding_list, student_templates,
+    to_vector_literal,
+)
+
+
+def test_embedding_round_trips_as_packed_float32():
+    vec = np.linspace(-1, 1, 512, dtype=np.float32)
+    blob = encode_embedding(vec.tolist())
+
+    assert len(blob) == 512 * 4
+    np.testing.assert_array_equal(decode_embedding(blob), vec)
+    assert encode_embedding([]) is None and encode_embedding(None) is None
+    assert decode_embedding(None) is None
+    assert decode_embedding(b"\x00" * 7) is None  # Not a whole number of floats
+
+
+def test_templates_round_trip_and_reject_partial_rows():
+    templates = np.arange(3 * 512, dtype=np.float32).reshape(3, 512)
+    blob = encode_templates(templates)
+
+    np.testing.assert_array_equal(decode_templates(blob), templates)
+    assert decode_templates(blob[:-4]) is None
+    assert encode_templates([]) is None
+
+
+def test_binary_columns_win_over_legacy_json():
+    legacy = [0.5] * 512
+    binary = encode_embedding([0.25] * 512)
+    templates = encode_templates(np.ones((2, 512), dtype=np.float32))
+
+    assert resolve_templates(templates, binary, legacy).shape == (2, 512)
+    assert float(resolve_templates(None, binary, legacy)[0, 0]) == 0.25
+    assert float(resolve_templates(None, None, legacy)[0, 0]) == 0.5
+    assert resolve_templates(None, None, None) is None
+
+
+def test_student_helpers_read_legacy_rows():
+    student = SimpleNamespace(face_encoding=[1.0] * 512, face_embedding=None, face_templates=None)
+
+    assert student_embedding(student).dtype == np.float32
+    assert student_templates(student).shape == (1, 512)
+    assert student_embedding_list(student) == [1.0] * 512
+
+
+def test_vector_literal_is_pgvector_text():
+    assert to_vector_literal([1, 0.5, -2]) == "[1,0.5,-2]"
+
+
+def test_save_writes_binary_templates_and_version():
+    class NoVectorDb:
+        async def execute(self, *args, **kwargs):
+            raise RuntimeError("information_schema not available")
+
+    store = FaceEmbeddingStore(json_fallback=False)
+    student = SimpleNamespace(id=1, face_embedding_staged=b"old", face_templates_staged=b"old",
+                              face_embedding_staged_version="old")
+    templates = [[0.1] * 512, [0.2] * 512]
+
+    asyncio.run(store.save(NoVectorDb(), student, [0.15] * 512, templates=templates))
+
+    assert decode_embedding(student.face_embedding).shape == (512,)
+    assert decode_templates(student.face_templates).shape == (2, 512)
+    assert student.face_encoding is None
+    assert student.face_embedding_version == embedding_model_version()
+    assert student.face_embedding_staged is None and student.face_embedding_staged_version is None
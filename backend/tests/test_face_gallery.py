@@ -0,0 +1,118 @@
+import numpy as np
+import pytest
+
+from app.services.face_gallery import FaceEmbeddingGallery, cohort_key
+
+DIM = 512
+
+
+def unit_vectors(count, seed=0):
+    vectors = np.random.default_rng(seed).normal(size=(count, DIM)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def test_cohort_search_sees_own_cohort_and_unassigned_students():
+    vectors = unit_vectors(3)
+    gallery = FaceEmbeddingGallery()
+    gallery.upsert(1, "A", vectors[0], cohort=cohort_key(1, 3))
+    gallery.upsert(2, "B", vectors[1], cohort=cohort_key(2, 1))
+    gallery.upsert(3, "C", vectors[2], cohort=cohort_key(None, 3))
+
+    assert {m.student_id for m in gallery.search(vectors[1], top_k=3, cohort=(1, 3))} == {1, 3}
+    assert {m.student_id for m in gallery.search(vectors[0], top_k=3, cohort=(2, 1))} == {2, 3}
+    # Nobody enrolled in this cohort yet: the whole gallery is searched
+    assert {m.student_id for m in gallery.search(vectors[0], top_k=3, cohort=(5, 5))} == {1, 2, 3}
+
+
+def test_relabel_moves_a_student_to_the_new_cohort_shard():
+    vectors = unit_vectors(2)
+    gallery = FaceEmbeddingGallery()
+    gallery.upsert(1, "A", vectors[0], cohort=(1, 3))
+    gallery.upsert(2, "B", vectors[1], cohort=(2, 1))
+    gallery.search(vectors[0], cohort=(1, 3))  # Builds the shard index
+
+    assert gallery.relabel(1, "A. Renamed", cohort=(2, 1)) is True
+    best = gallery.search(vectors[0], cohort=(2, 1))[0]
+    assert (best.student_id, best.student_name) == (1, "A. Renamed")
+    assert [m.student_id for m in gallery.search(vectors[0], top_k=2, cohort=(2, 1))] == [1, 2]
+    assert gallery.relabel(99, "Nobody") is False
+
+
+def test_search_scores_the_best_template_not_the_centroid():
+    vectors = unit_vectors(4, seed=1)
+    gallery = FaceEmbeddingGallery(max_templates=3)
+    gallery.upsert(1, "A", vectors[:3])
+    gallery.upsert(2, "B", vectors[3])
+
+    best = gallery.search(vectors[2])[0]
+    assert (best.student_id, best.templates) == (1, 3)
+    assert abs(best.similarity - 1.0) < 1e-5
+    assert gallery.template_count(1) == 3 and gallery.template_count(2) == 1
+    assert gallery.stats()["templates"] == 4
+
+
+def test_shortlist_search_matches_a_full_scan():
+    templates = unit_vectors(300 * 3, seed=2).reshape(300, 3, DIM)
+    probes = templates[::37, 1] + 0.05 * unit_vectors(len(templates[::37]), seed=3)
+    full = FaceEmbeddingGallery(max_templates=3, shortlist_size=1000)
+    short = FaceEmbeddingGallery(max_templates=3, shortlist_size=16)
+    for student_id, rows in enumerate(templates):
+        full.upsert(student_id, str(student_id), rows)
+        short.upsert(student_id, str(student_id), rows)
+
+    for probe in probes:
+        expected = full.search(probe)[0]
+        best = short.search(probe)[0]
+        assert best.student_id == expected.student_id
+        assert abs(best.similarity - expected.similarity) < 1e-6
+
+
+def test_remove_drops_the_identity():
+    vectors = unit_vectors(2, seed=4)
+    gallery = FaceEmbeddingGallery()
+    gallery.upsert(1, "A", vectors[0])
+    gallery.upsert(2, "B", vectors[1])
+    gallery.remove(1)
+
+    assert [m.student_id for m in gallery.search(vectors[0], top_k=2)] == [2]
+    assert gallery.template_count(1) == 0
+
+
+def test_quantized_storage_keeps_the_ranking_and_rescore_is_exact():
+    templates = unit_vectors(50 * 2, seed=5).reshape(50, 2, DIM)
+    probe = templates[17, 0] + 0.1 * unit_vectors(1, seed=6)[0]
+    galleries = {storage: FaceEmbeddingGallery(max_templates=2, storage=storage)
+                 for storage in ("float32", "float16", "int8")}
+    for gallery in galleries.values():
+        for student_id, rows in enumerate(templates):
+            gallery.upsert(student_id, str(student_id), rows)
+    expected = galleries.pop("float32").search(probe)[0]
+
+    for gallery in galleries.values():
+        matches = gallery.search(probe, top_k=gallery.rerank_size)
+        assert matches[0].student_id == expected.student_id
+        assert abs(matches[0].similarity - expected.similarity) < 0.02
+        best = gallery.rescore(probe, matches, dict(enumerate(templates)))[0]
+        assert best.student_id == expected.student_id
+        assert abs(best.similarity - expected.similarity) < 1e-5
+
+
+def test_memory_bytes_shrink_with_storage_dtype():
+    vectors = unit_vectors(10, seed=7)
+    memory = {}
+    for storage in ("float32", "float16", "int8"):
+        gallery = FaceEmbeddingGallery(max_templates=1, storage=storage)
+        for student_id, vec in enumerate(vectors):
+            gallery.upsert(student_id, str(student_id), vec)
+        stats = gallery.stats()
+        assert stats["storage"] == storage and stats["identities"] == 10
+        assert stats["memory_bytes"] <= stats["allocated_bytes"]
+        memory[storage] = stats["memory_bytes"]
+
+    assert memory["float32"] > 1.9 * memory["float16"]
+    assert memory["float32"] > 3.6 * memory["int8"]
+
+
+def test_unknown_storage_is_rejected():
+    with pytest.raises(ValueError, match="bfloat16"):
+        FaceEmbeddingGallery(storage="bfloat16")
@@ -0,0 +1,59 @@
+import asyncio
+import threading
+
+from app.services.face_inference_executor import FaceInferenceBusyError, FaceInferenceExecutor
+
+
+def test_cancelled_queued_jobs_release_their_queue_slot():
+    executor = FaceInferenceExecutor(max_workers=1, max_queue=3)
+    release = threading.Event()
+
+    async def scenario():
+        blocker = asyncio.ensure_future(executor.run(release.wait, 5))
+        await asyncio.sleep(0.05)  # Blocker now occupies the only worker
+        queued = [asyncio.ensure_future(executor.run(lambda: "never")) for _ in range(3)]
+        await asyncio.sleep(0.05)
+        assert executor.queue_depth == 3
+
+        for task in queued:
+            task.cancel()
+        await asyncio.gather(*queued, return_exceptions=True)
+        await asyncio.sleep(0.05)
+        assert executor.queue_depth == 0
+
+        release.set()
+        assert await blocker is True
+        # Slots are free again: a new job is accepted and runs
+        assert await executor.run(lambda: 42) == 42
+        assert executor.queue_depth == 0
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        release.set()
+        executor.shutdown()
+
+
+def test_full_queue_rejects_new_jobs():
+    executor = FaceInferenceExecutor(max_workers=1, max_queue=1)
+    release = threading.Event()
+
+    async def scenario():
+        blocker = asyncio.ensure_future(executor.run(release.wait, 5))
+        await asyncio.sleep(0.05)
+        waiting = asyncio.ensure_future(executor.run(lambda: 1))
+        await asyncio.sleep(0.05)
+        try:
+            await executor.run(lambda: 2)
+            raise AssertionError("queue should be full")
+        except FaceInferenceBusyError:
+            pass
+        release.set()
+        assert await waiting == 1
+        await blocker
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        release.set()
+        executor.shutdown()
@@ -0,0 +1,115 @@
+import asyncio
+import os
+import uuid
+
+import numpy as np
+import pytest
+
+from app.services.face_embedding_store import (
+    FaceEmbeddingStore, INSERT_TEMPLATE_VECTOR_SQL, TEMPLATE_TABLE, nearest_vector_params, template_vector_rows,
+)
+from app.services.face_gallery import FaceEmbeddingGallery, cohort_key
+
+PGVECTOR_URL = os.environ.get("TEST_PGVECTOR_DATABASE_URL")  # postgresql+asyncpg://... with pgvector installed
+DIM = 512
+
+
+def unit(vec):
+    vec = np.asarray(vec, dtype=np.float32)
+    return vec / np.linalg.norm(vec)
+
+
+def fixture_students():
+    """
+    {student_id: (name, templates, (faculty_id, semester))}. Student 1 has one template
+    equal to the probe but an averaged vector pointing away from it; student 2's single
+    template is close to the probe, so an averaged-vector search would pick student 2.
+    """
+    rng = np.random.default_rng(7)
+    e1, e2 = np.eye(DIM, dtype=np.float32)[:2]
+    students = {
+        1: ("Asha", np.stack([e1, e2]), (1, 3)),
+        2: ("Bikash", np.stack([unit(0.9 * e1 + 0.436 * e2)]), (1, 3)),
+    }
+    for student_id in range(3, 9):
+        templates = np.stack([unit(rng.normal(size=DIM)) for _ in range(3)])
+        students[student_id] = (f"Student {student_id}", templates, (2, 1) if student_id % 2 else (1, 3))
+    return students, e1
+
+
+def gallery_top1(students, probe, cohort=None):
+    gallery = FaceEmbeddingGallery(max_templates=5)
+    for student_id, (name, templates, (faculty_id, semester)) in students.items():
+        gallery.upsert(student_id, name, templates, cohort=cohort_key(faculty_id, semester))
+    return gallery.search(probe, top_k=1, cohort=cohort)[0]
+
+
+def test_gallery_matches_the_best_template_not_the_average():
+    students, probe = fixture_students()
+    best = gallery_top1(students, probe)
+    assert best.student_id == 1
+    assert best.similarity == pytest.approx(1.0, abs=1e-5)
+
+
+def test_template_rows_and_candidate_count_follow_max_templates():
+    templates = np.stack([unit(np.arange(DIM) + i) for i in range(7)])
+    rows = template_vector_rows(9, templates, max_templates=5)
+    assert [row["template_index"] for row in rows] == [0, 1, 2, 3, 4]
+    assert all(row["student_id"] == 9 for row in rows)
+    assert template_vector_rows(9, templates[0], max_templates=5)[0]["template_index"] == 0
+
+    params = nearest_vector_params(templates[0], limit=3, max_templates=5, cohort=(1, 3))
+    assert params["candidates"] == 15
+    assert (params["faculty_id"], params["semester"]) == (1, 3)
+
+
+@pytest.mark.skipif(not PGVECTOR_URL, reason="TEST_PGVECTOR_DATABASE_URL not set")
+def test_pgvector_and_gallery_agree_on_top1():
+    from sqlalchemy import text
+    from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+    students, probe = fixture_students()
+    schema = f"face_search_{uuid.uuid4().hex[:8]}"
+
+    async def scenario():
+        admin = create_async_engine(PGVECTOR_URL)
+        async with admin.begin() as conn:
+            await conn.execute(text(f"CREATE SCHEMA {schema}"))
+        engine = create_async_engine(PGVECTOR_URL, connect_args={"server_settings": {"search_path": f"{schema},public"}})
+        try:
+            async with engine.begin() as conn:
+                await conn.execute(text("CREATE TABLE users (id INTEGER PRIMARY KEY, full_name TEXT)"))
+                await conn.execute(text(
+                    "CREATE TABLE students (id INTEGER PRIMARY KEY, user_id INTEGER, faculty_id INTEGER, semester INTEGER)"
+                ))
+                await conn.execute(text(f"""
+                    CREATE TABLE {TEMPLATE_TABLE} (
+                        student_id INTEGER NOT NULL REFERENCES students(id) ON DELETE CASCADE,
+                        template_index SMALLINT NOT NULL,
+                        embedding vector({DIM}) NOT NULL,
+                        PRIMARY KEY (student_id, template_index)
+                    )
+                """))
+                for student_id, (name, templates, (faculty_id, semester)) in students.items():
+                    await conn.execute(text("INSERT INTO users VALUES (:id, :name)"), {"id": student_id, "name": name})
+                    await conn.execute(text("INSERT INTO students VALUES (:id, :id, :faculty_id, :semester)"),
+                                       {"id": student_id, "faculty_id": faculty_id, "semester": semester})
+                    await conn.execute(INSERT_TEMPLATE_VECTOR_SQL, template_vector_rows(student_id, templates, 5))
+
+            store = FaceEmbeddingStore(max_templates=5)
+            async with AsyncSession(engine) as db:
+                unscoped = await store.nearest(db, probe, limit=1)
+                scoped = await store.nearest(db, probe, limit=1, cohort=(1, 3))
+            return unscoped, scoped
+        finally:
+            await engine.dispose()
+            async with admin.begin() as conn:
+                await conn.execute(text(f"DROP SCHEMA {schema} CASCADE"))
+            await admin.dispose()
+
+    unscoped, scoped = asyncio.run(scenario())
+    for rows, cohort in ((unscoped, None), (scoped, (1, 3))):
+        expected = gallery_top1(students, probe, cohort=cohort)
+        student_id, _, similarity = rows[0]
+        assert student_id == expected.student_id
+        assert similarity == pytest.approx(expected.similarity, abs=1e-4)
@@ -0,0 +1,13 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api.routes import face_recognition as routes
+
+
+def test_face_stats_endpoints_require_a_login():
+    app = FastAPI()
+    app.include_router(routes.router, prefix="/api")
+    client = TestClient(app)
+
+    for path in ("/api/face-recognition/inference-stats", "/api/face-recognition/timing-stats"):
+        assert client.get(path).status_code in (401, 403)
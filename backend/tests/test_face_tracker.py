@@ -0,0 +1,58 @@
+from app.services import face_tracker as face_tracker_module
+from app.services.face_tracker import FaceTracker, box_iou
+
+BOX = [100, 100, 200, 200]
+NUDGED = [104, 102, 204, 202]
+
+
+def test_box_iou():
+    assert box_iou(BOX, BOX) == 1.0
+    assert box_iou(BOX, [300, 300, 400, 400]) == 0.0
+    assert box_iou([0, 0, 10, 10], [5, 0, 15, 10]) == 5 * 10 / (2 * 100 - 50)
+
+
+def test_confident_track_is_reused_until_the_reembed_interval():
+    tracker = FaceTracker(reembed_frames=3)
+
+    assert tracker.lookup("s1", "live", BOX) is None
+    tracker.update("s1", "live", BOX, {"student_id": 7}, similarity=0.9)
+
+    assert tracker.lookup("s1", "live", NUDGED) == {"student_id": 7}
+    assert tracker.lookup("s1", "live", NUDGED) == {"student_id": 7}
+    assert tracker.lookup("s1", "live", NUDGED) is None  # Every third frame after an embed re-embeds
+    stats = tracker.stats()
+    assert (stats["frames_reused"], stats["frames_embedded"]) == (2, 2)
+    assert stats["reembed_reasons"] == {"new": 1, "interval": 1}
+
+
+def test_moved_box_and_expired_track_re_embed(monkeypatch):
+    now = [50.0]
+    monkeypatch.setattr(face_tracker_module.time, "monotonic", lambda: now[0])
+    tracker = FaceTracker(ttl_seconds=3.0)
+    tracker.update("s1", "live", BOX, "asha", similarity=0.9)
+
+    assert tracker.lookup("s1", "live", [300, 300, 400, 400]) is None
+    now[0] += 5
+    assert tracker.lookup("s1", "live", BOX) is None
+    assert tracker.stats()["reembed_reasons"] == {"moved": 1, "expired": 1}
+
+
+def test_weak_matches_and_drops_do_not_leave_a_track():
+    tracker = FaceTracker(min_similarity=0.7)
+    tracker.update("s1", "live", BOX, "asha", similarity=0.9)
+    tracker.update("s1", "live", BOX, "bikash", similarity=0.5)
+    assert tracker.lookup("s1", "live", BOX) is None
+
+    tracker.update("s1", "live", BOX, "asha", similarity=0.9)
+    tracker.drop("s1", "live")
+    assert tracker.lookup("s1", "live", BOX) is None
+
+
+def test_tracks_are_per_session_and_forgotten_with_it():
+    tracker = FaceTracker()
+    tracker.update("s1", "live", BOX, "asha", similarity=0.9)
+
+    assert tracker.lookup("s2", "live", BOX) is None
+    assert tracker.lookup(None, "live", BOX) is None
+    tracker.forget("s1")
+    assert tracker.stats()["active_tracks"] == 0
@@ -0,0 +1,91 @@
+import base64
+
+import cv2
+import numpy as np
+
+from app.services import frame_cache as frame_cache_module
+from app.services.frame_cache import FrameResultCache, encoded_image_bytes, frame_hash, hamming_distance
+
+
+def jpeg(image):
+    ok, buf = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, 95])
+    assert ok
+    return buf.tobytes()
+
+
+def scene(seed=0, noise=0):
+    rng = np.random.default_rng(seed)
+    image = np.full((480, 640, 3), 128, dtype=np.uint8)
+    for _ in range(12):
+        x, y = rng.integers(0, 560), rng.integers(0, 400)
+        cv2.rectangle(image, (int(x), int(y)), (int(x) + 80, int(y) + 80), rng.integers(0, 255, 3).tolist(), -1)
+    if noise:
+        jitter = np.random.default_rng(seed + 100).integers(-noise, noise + 1, image.shape)
+        image = np.clip(image.astype(np.int16) + jitter, 0, 255).astype(np.uint8)
+    return image
+
+
+def test_encoded_image_bytes_accepts_uploads_and_data_urls():
+    raw = b"\xff\xd8jpeg"
+    assert encoded_image_bytes(raw) == raw
+    assert encoded_image_bytes("data:image/jpeg;base64," + base64.b64encode(raw).decode()) == raw
+
+
+def test_sensor_noise_stays_close_and_a_different_scene_does_not():
+    still = frame_hash(jpeg(scene()))
+    noisy = frame_hash(jpeg(scene(noise=3)))
+    other = frame_hash(jpeg(scene(seed=1)))
+
+    assert still.size == 2 * 32 * 32 // 8
+    assert hamming_distance(still, still) == 0
+    assert hamming_distance(still, noisy) <= 16
+    assert hamming_distance(still, other) > 16
+    assert frame_hash(b"not an image") is None
+
+
+def test_lookup_hits_near_frames_and_misses_far_ones():
+    cache = FrameResultCache(ttl_seconds=10, max_distance=16)
+    still, other = frame_hash(jpeg(scene())), frame_hash(jpeg(scene(seed=1)))
+
+    assert cache.lookup("s1", "detect", still) is None
+    cache.store("s1", "detect", still, {"faces": 1})
+
+    assert cache.lookup("s1", "detect", frame_hash(jpeg(scene(noise=3)))) == {"faces": 1}
+    assert cache.lookup("s1", "detect", other) is None
+    assert cache.lookup("s1", "live", still) is None  # Kinds are cached separately
+    assert cache.lookup("s2", "detect", still) is None  # So are sessions
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"]) == (1, 4)
+
+
+def test_entries_expire_after_the_ttl(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(frame_cache_module.time, "monotonic", lambda: now[0])
+    cache = FrameResultCache(ttl_seconds=1.0)
+    frame = frame_hash(jpeg(scene()))
+    cache.store("s1", "detect", frame, "result")
+
+    now[0] += 0.5
+    assert cache.lookup("s1", "detect", frame) == "result"
+    now[0] += 1.0
+    assert cache.lookup("s1", "detect", frame) is None
+
+
+def test_forget_and_session_limit_evict_entries():
+    cache = FrameResultCache(ttl_seconds=10, max_sessions=2)
+    frame = frame_hash(jpeg(scene()))
+    for session in ("a", "b", "c"):
+        cache.store(session, "detect", frame, session)
+
+    assert cache.lookup("a", "detect", frame) is None
+    assert cache.stats()["evictions"] == 1
+    cache.forget("b")
+    assert cache.lookup("b", "detect", frame) is None
+    assert cache.lookup("c", "detect", frame) == "c"
+
+
+def test_disabled_cache_never_hits():
+    cache = FrameResultCache(enabled=False)
+    frame = frame_hash(jpeg(scene()))
+    cache.store("s1", "detect", frame, "result")
+    assert cache.lookup("s1", "detect", frame) is None
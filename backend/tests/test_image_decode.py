@@ -0,0 +1,48 @@
+import base64
+
+import cv2
+import numpy as np
+import pytest
+
+from app.core.face_constants import MAX_DECODE_DIMENSION
+
+
+def encode(image, ext=".jpg"):
+    ok, buf = cv2.imencode(ext, image)
+    assert ok
+    return buf.tobytes()
+
+
+def gradient(width, height):
+    x = np.linspace(0, 255, width, dtype=np.uint8)
+    return np.dstack([np.tile(x, (height, 1))] * 3)
+
+
+def test_large_jpeg_is_decoded_at_reduced_dct_scale(face_service):
+    image = face_service.decode_image_bytes(encode(gradient(4000, 3000)))
+
+    assert image.shape == (960, MAX_DECODE_DIMENSION, 3)
+    assert face_service.decode_stats()["dct_reductions"] == {"1/2": 1}
+
+
+def test_small_and_non_jpeg_images_decode_at_full_size(face_service):
+    assert face_service.decode_image_bytes(encode(gradient(640, 480))).shape == (480, 640, 3)
+    assert face_service.decode_image_bytes(encode(gradient(2000, 1000), ".png")).shape == (640, 1280, 3)
+    stats = face_service.decode_stats()
+    assert stats["decoded_images"] == 2
+    assert stats["dct_reductions"] == {"1/1": 2}
+
+
+def test_reduced_decode_keeps_the_picture(face_service):
+    source = gradient(2560, 1920)
+    image = face_service.decode_image_bytes(encode(source))
+    expected = cv2.resize(source, (image.shape[1], image.shape[0]), interpolation=cv2.INTER_AREA)
+
+    assert np.abs(image.astype(np.int16) - expected).mean() < 3
+
+
+def test_base64_data_urls_and_garbage(face_service):
+    data_url = "data:image/jpeg;base64," + base64.b64encode(encode(gradient(64, 48))).decode()
+    assert face_service.decode_base64_image(data_url).shape == (48, 64, 3)
+    with pytest.raises(ValueError):
+        face_service.decode_image_bytes(b"not an image")
@@ -0,0 +1,59 @@
+import asyncio
+
+import numpy as np
+
+from app.api.routes import face_recognition as routes
+from app.services.face_gallery import GalleryMatch
+from app.services.insightface_service import FaceAnalysisResult
+
+
+def single_face(image_shape, embedding=None):
+    height, width = image_shape[:2]
+    x1, y1, x2, y2 = width * 0.3, height * 0.25, width * 0.7, height * 0.75
+    return {
+        'index': 0,
+        'bbox': [x1, y1, x2, y2],
+        'confidence': 0.95,
+        'embedding': embedding,
+        'embedding_norm': 0.0 if embedding is None else float(np.linalg.norm(embedding)),
+        'width': x2 - x1,
+        'height': y2 - y1,
+        'area': (x2 - x1) * (y2 - y1),
+    }
+
+
+def stub_pipeline(monkeypatch, face_service, embedding):
+    monkeypatch.setattr(routes, "insightface_service", face_service)
+
+    async def embed_probe_face(image, analysis, face_info):
+        return face_service.attach_embedding(face_info, embedding)
+
+    async def search_gallery(db, probe, top_k=1, cohort=None):
+        return [GalleryMatch(student_id=7, student_name="Asha", similarity=0.9, templates=1)]
+
+    monkeypatch.setattr(routes, "embed_probe_face", embed_probe_face)
+    monkeypatch.setattr(routes, "search_gallery", search_gallery)
+
+
+def test_single_face_frame_detected_without_embedding_is_recognized(monkeypatch, face_service):
+    stub_pipeline(monkeypatch, face_service, np.full(512, 0.05, dtype=np.float32))
+    image = np.zeros((480, 640, 3), dtype=np.uint8)
+    analysis = FaceAnalysisResult(image.shape, [single_face(image.shape)])
+
+    result = asyncio.run(routes.recognize_live_frame(None, image, analysis=analysis))
+
+    assert result.success is True
+    assert result.student_id == 7
+    assert result.faces_detected == 1
+
+
+def test_embedding_norm_is_checked_after_embedding(monkeypatch, face_service):
+    stub_pipeline(monkeypatch, face_service, np.zeros(512, dtype=np.float32))
+    image = np.zeros((480, 640, 3), dtype=np.uint8)
+    analysis = FaceAnalysisResult(image.shape, [single_face(image.shape)])
+
+    result = asyncio.run(routes.recognize_live_frame(None, image, analysis=analysis))
+
+    assert result.success is False
+    assert result.message == routes.EMBEDDING_UNCLEAR_MESSAGE
+    assert result.recognition_quality == "poor"
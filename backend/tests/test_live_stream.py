@@ -0,0 +1,42 @@
+import asyncio
+
+from app.api.routes import face_recognition as routes
+
+
+class FakeWebSocket:
+    def __init__(self):
+        self.sent = []
+
+    async def send_json(self, data):
+        self.sent.append(data)
+
+
+def test_inference_errors_are_reported_and_the_stream_keeps_running(monkeypatch):
+    calls = []
+
+    async def process_live_frame(image_bytes, mode, cohort=None, session=None):
+        calls.append(image_bytes)
+        if image_bytes == b"bad":
+            raise RuntimeError("onnxruntime exploded")
+        return {"faces": [], "recognition": None}
+
+    monkeypatch.setattr(routes, "process_live_frame", process_live_frame)
+    websocket = FakeWebSocket()
+    state = {"mode": "detect", "cohort": None, "session": "ws:test"}
+
+    async def scenario():
+        slot = routes.LatestFrameSlot()
+        worker = asyncio.create_task(routes.run_live_stream_inference(websocket, slot, state))
+        slot.put(1, b"bad")
+        await asyncio.sleep(0.05)
+        slot.put(2, b"good")
+        await asyncio.sleep(0.05)
+        slot.close()
+        await asyncio.wait_for(worker, timeout=1)
+
+    asyncio.run(scenario())
+
+    assert calls == [b"bad", b"good"]
+    assert websocket.sent[0] == {"type": "error", "frame": 1, "message": "Frame processing failed"}
+    assert websocket.sent[1]["type"] == "result"
+    assert websocket.sent[1]["frame"] == 2
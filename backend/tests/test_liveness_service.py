@@ -0,0 +1,57 @@
+import numpy as np
+
+from app.services import liveness_service as liveness_module
+from app.services.liveness_service import LivenessService
+
+BBOX = [200.0, 120.0, 440.0, 400.0]  # Big enough for the size stage
+
+
+def face_image():
+    return np.full((480, 640, 3), 120, dtype=np.uint8)  # No glare
+
+
+def test_missing_model_skips_the_model_stage_by_default(tmp_path):
+    service = LivenessService(str(tmp_path / "missing.onnx"))
+
+    result = service.check(face_image(), BBOX)
+
+    assert result.is_live is True
+    assert result.stage == "unavailable"
+    assert service.stats()["model_missing"] is True
+
+
+def test_missing_model_rejects_when_required(tmp_path):
+    service = LivenessService(str(tmp_path / "missing.onnx"), require_model=True)
+
+    result = service.check(face_image(), BBOX)
+
+    assert result.is_live is False
+    assert result.stage == "unavailable"
+
+
+def test_cheap_stages_still_run_without_the_model(tmp_path):
+    service = LivenessService(str(tmp_path / "missing.onnx"))
+
+    assert service.check(face_image(), [0.0, 0.0, 30.0, 30.0]).stage == "size"
+    glare = np.full((480, 640, 3), 255, dtype=np.uint8)
+    assert service.check(glare, BBOX).stage == "glare"
+
+
+def test_unloadable_model_fails_closed(tmp_path):
+    model_path = tmp_path / "broken.onnx"
+    model_path.write_bytes(b"not an onnx graph")
+
+    assert LivenessService(str(model_path)).check(face_image(), BBOX).is_live is False
+    assert LivenessService(str(model_path), fail_open=True).check(face_image(), BBOX).is_live is True
+
+
+def test_missing_model_is_looked_for_again(tmp_path, monkeypatch):
+    monkeypatch.setattr(liveness_module, "MODEL_RECHECK_SECONDS", 0.0)
+    model_path = tmp_path / "later.onnx"
+    service = LivenessService(str(model_path))
+    assert service.model_available is False
+
+    model_path.write_bytes(b"not an onnx graph")  # Now present (but broken): loading is retried
+    assert service.model_available is False
+    assert service.stats()["model_missing"] is False
+    assert service.check(face_image(), BBOX).is_live is False
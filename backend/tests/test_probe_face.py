@@ -0,0 +1,50 @@
+import asyncio
+
+import numpy as np
+
+from app.api.routes import face_recognition as routes
+from app.services.insightface_service import FaceAnalysisResult
+
+BBOX = [200.0, 120.0, 440.0, 400.0]
+
+
+def detected_face():
+    x1, y1, x2, y2 = BBOX
+    return {'index': 0, 'bbox': list(BBOX), 'confidence': 0.95, 'embedding': None, 'embedding_norm': 0.0,
+            'width': x2 - x1, 'height': y2 - y1, 'area': (x2 - x1) * (y2 - y1)}
+
+
+def run_probe(monkeypatch, face_service, image):
+    embedded = []
+
+    async def run_inference(fn, *args, **kwargs):
+        if fn == face_service.analyze_image:
+            return FaceAnalysisResult(image.shape, [detected_face()])
+        return fn(*args, **kwargs)
+
+    async def embed_probe_face(image, analysis, face_info):
+        embedded.append(face_info['index'])
+        return face_service.attach_embedding(face_info, np.ones(512, dtype=np.float32))
+
+    monkeypatch.setattr(routes, "insightface_service", face_service)
+    monkeypatch.setattr(routes, "run_inference", run_inference)
+    monkeypatch.setattr(routes, "embed_probe_face", embed_probe_face)
+    return asyncio.run(routes.extract_probe_face(image, policy="mark_attendance")), embedded
+
+
+def test_blurry_probe_is_refused_before_embedding(monkeypatch, face_service):
+    face_info, embedded = run_probe(monkeypatch, face_service, np.full((480, 640, 3), 120, dtype=np.uint8))
+
+    assert face_info['quality']['passed'] is False
+    assert face_info['quality']['reason'] == "blur"
+    assert face_info['embedding'] is None
+    assert embedded == []
+
+
+def test_sharp_probe_passes_the_gate_and_is_embedded(monkeypatch, face_service):
+    image = np.random.default_rng(0).integers(60, 200, size=(480, 640, 3), dtype=np.uint8)
+    face_info, embedded = run_probe(monkeypatch, face_service, image)
+
+    assert face_info['quality']['passed'] is True
+    assert face_info['liveness']['is_live'] is True
+    assert embedded == [0]
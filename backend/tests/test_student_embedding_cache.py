@@ -0,0 +1,90 @@
+import asyncio
+from datetime import datetime
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from app.services import student_embedding_cache as cache_module
+from app.services.student_embedding_cache import StudentEmbeddingCache
+
+DIM = 512
+
+
+@pytest.fixture
+def stored(monkeypatch):
+    """Templates "in the database" per student id, and the ids each load asked for."""
+    rows = {}
+    loads = []
+
+    async def load_templates(db, student_ids):
+        loads.append(list(student_ids))
+        return {sid: rows[sid] for sid in student_ids if sid in rows}
+
+    monkeypatch.setattr(cache_module.face_embedding_store, "load_templates", load_templates)
+    return rows, loads
+
+
+def student(student_id, updated_at=datetime(2025, 1, 1), version="buffalo_l"):
+    return SimpleNamespace(id=student_id, updated_at=updated_at, face_embedding_version=version)
+
+
+def get(cache, row):
+    return asyncio.run(cache.get(None, row))
+
+
+def test_templates_are_normalized_and_served_from_cache(stored):
+    rows, loads = stored
+    rows[1] = np.full((2, DIM), 3.0, dtype=np.float32)
+    cache = StudentEmbeddingCache()
+
+    templates = get(cache, student(1))
+    assert templates.shape == (2, DIM)
+    np.testing.assert_allclose(np.linalg.norm(templates, axis=1), 1.0, rtol=1e-6)
+    assert not templates.flags.writeable
+    assert get(cache, student(1)) is templates
+    assert loads == [[1]]
+    assert (cache.stats()["hits"], cache.stats()["misses"]) == (1, 1)
+
+
+def test_changed_stamp_or_invalidate_reloads(stored):
+    rows, loads = stored
+    rows[1] = np.ones((1, DIM), dtype=np.float32)
+    cache = StudentEmbeddingCache()
+    get(cache, student(1))
+
+    get(cache, student(1, updated_at=datetime(2025, 2, 1)))  # Re-registered
+    get(cache, student(1, updated_at=datetime(2025, 2, 1), version="antelopev2"))  # Re-embedded
+    cache.invalidate(1)
+    get(cache, student(1, updated_at=datetime(2025, 2, 1), version="antelopev2"))
+    assert len(loads) == 4
+
+
+def test_least_recently_used_student_is_evicted(stored):
+    rows, loads = stored
+    for sid in (1, 2, 3):
+        rows[sid] = np.ones((1, DIM), dtype=np.float32)
+    cache = StudentEmbeddingCache(max_students=2)
+    get(cache, student(1))
+    get(cache, student(2))
+    get(cache, student(1))  # 2 is now the oldest
+    get(cache, student(3))
+
+    get(cache, student(1))
+    get(cache, student(2))
+    assert loads == [[1], [2], [3], [2]]
+    assert cache.stats()["evictions"] == 2
+
+
+def test_unregistered_students_and_disabled_cache_are_not_cached(stored):
+    rows, loads = stored
+    cache = StudentEmbeddingCache()
+    assert get(cache, student(9)) is None
+    assert get(cache, student(9)) is None
+    assert cache.stats()["students"] == 0
+
+    rows[1] = np.ones((1, DIM), dtype=np.float32)
+    disabled = StudentEmbeddingCache(enabled=False)
+    get(disabled, student(1))
+    get(disabled, student(1))
+    assert loads.count([1]) == 2